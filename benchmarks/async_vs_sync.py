@@ -0,0 +1,160 @@
+"""Cuántos clientes lentos aguanta cada modo: gunicorn (WSGI, workers sync) contra uvicorn (asgi.py).
+
+Siembra una base SQLite temporal, levanta el servidor y, para cada cantidad de
+--slow, abre esa cantidad de conexiones que mandan el request de a un byte por
+segundo (como un celular con mala señal). Mientras tanto otros --concurrency
+hilos hacen GET /people?limit=20 y se mide cuántos responden antes de
+--timeout segundos y con qué latencia.
+
+Con workers sync cada conexión lenta ocupa un worker entero: al llegar a
+--workers conexiones lentas el resto de los clientes espera. Con ASGI las
+conexiones lentas solo son sockets abiertos en el event loop.
+
+    python benchmarks/async_vs_sync.py --workers 4 --slow 0,4,64,500
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else 0.0
+
+
+def seed(database_url, args):
+    #La misma siembra que suite.py, en otro proceso para no cargar la app aquí.
+    code = """
+import argparse, suite
+args = argparse.Namespace(database_url={url!r}, people={people}, planets=100, vehicles=100, users=10,
+                          favorites_per_user=5, seed=42, bcrypt_rounds=4, concurrency=1, reset=False)
+suite.seed(suite.load_app(args), args)
+""".format(url=database_url, people=args.people)
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.join(ROOT, "benchmarks"), check=True)
+
+
+def server_command(mode, port, args):
+    if mode == "wsgi":
+        return [sys.executable, "-m", "gunicorn", "wsgi", "--chdir", SRC, "-w", str(args.workers),
+                "-b", "127.0.0.1:%d" % port, "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", "asgi:app", "--app-dir", SRC, "--port", str(port),
+            "--log-level", "warning", "--no-access-log"]
+
+
+def get(url, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as resp:
+            resp.read()
+            return time.perf_counter() - start, resp.status
+    except urllib.error.HTTPError as error:
+        return time.perf_counter() - start, error.code
+    except OSError:
+        return time.perf_counter() - start, None
+
+
+class SlowClients:
+    """Conexiones que nunca terminan de mandar el request: un byte de header por segundo."""
+
+    def __init__(self, port, count):
+        self.sockets = []
+        self.stop = threading.Event()
+        for _ in range(count):
+            sock = socket.create_connection(("127.0.0.1", port))
+            sock.sendall(b"GET /people?limit=20 HTTP/1.1\r\nHost: bench\r\n")
+            self.sockets.append(sock)
+        self.thread = threading.Thread(target=self._trickle, daemon=True)
+        self.thread.start()
+
+    def _trickle(self):
+        while not self.stop.wait(1.0):
+            for sock in self.sockets:
+                try:
+                    sock.send(b"X")
+                except OSError:
+                    pass
+
+    def close(self):
+        self.stop.set()
+        self.thread.join()
+        for sock in self.sockets:
+            sock.close()
+
+
+def measure(base, slow, args):
+    port = int(base.rsplit(":", 1)[1])
+    clients = SlowClients(port, slow)
+    try:
+        time.sleep(0.5)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(lambda i: get(base + "/people?limit=20", args.timeout), range(args.requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        clients.close()
+    ok = [latency for latency, status in results if status == 200]
+    return {
+        "slow_clients": slow,
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "rps": round(len(ok) / elapsed, 1),
+        "p50_ms": round(percentile(ok, 50), 2),
+        "p99_ms": round(percentile(ok, 99), 2),
+    }
+
+
+def run(mode, database_url, args):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, FLASK_APP_KEY="bench", METRICS_DIR=tempfile.mkdtemp())
+    server = subprocess.Popen(server_command(mode, port, args), env=env)
+    base = "http://127.0.0.1:%d" % port
+    try:
+        for _ in range(100):
+            if get(base + "/people?limit=1", 1)[1] == 200:
+                break
+            time.sleep(0.1)
+        for slow in args.slow:
+            print(json.dumps(dict(mode=mode, **measure(base, slow, args))), flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="workers sync de gunicorn (uvicorn usa un solo proceso)")
+    parser.add_argument("--slow", default="0,4,64,500", help="cantidades de clientes lentos, separadas por coma")
+    parser.add_argument("--requests", type=int, default=400, help="requests rápidos por medición")
+    parser.add_argument("--concurrency", type=int, default=8, help="hilos haciendo los requests rápidos")
+    parser.add_argument("--timeout", type=float, default=5.0, help="segundos antes de contar un request como fallido")
+    parser.add_argument("--people", type=int, default=2000)
+    parser.add_argument("--mode", choices=("wsgi", "asgi", "both"), default="both")
+    args = parser.parse_args()
+    args.slow = [int(value) for value in args.slow.split(",")]
+
+    database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "async-vs-sync.db")
+    seed(database_url, args)
+    for mode in (("wsgi", "asgi") if args.mode == "both" else (args.mode,)):
+        run(mode, database_url, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Latencia de GET /people durante una ráfaga de logins.
+
+Levanta gunicorn (workers sync) sobre una base SQLite temporal, mide la latencia
+de GET /people sin carga y luego mientras varios hilos hacen POST /login sin
+parar. Se corre dos veces: con bcrypt en el worker (PASSWORD_POOL_SIZE=0) y con
+el pool de procesos acotado, para comparar.
+
+    python benchmarks/login_storm.py --workers 4 --storm 16 --seconds 10
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(env, people=200):
+    #Se crea el esquema y un usuario con el mismo proceso de registro que usa la API.
+    code = """
+from app import create_app
+from models import db, People
+app = create_app()
+with app.app_context():
+    db.create_all()
+    db.session.add_all([People(name="P%d" % i, url="u", height=1, mass=1, hair_color="c", skin_color="c",
+                               eyes_color="c", birth_year=1, gender="g") for i in range({people})])
+    db.session.commit()
+client = app.test_client()
+client.post("/register", json=dict(email="storm@example.com", first_name="a", last_name="b", password="secret",
+                                    is_active=True, subscription_date="2023", birth_date=1, country="cr"))
+""".format(people=people)
+    subprocess.run([sys.executable, "-c", code], cwd=SRC, env=env, check=True)
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return time.perf_counter() - start, status
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+def measure_gets(base, seconds):
+    latencies = []
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        latencies.append(request(base + "/people?limit=20")[0])
+    return latencies
+
+
+def run(pool_size, args):
+    db_path = tempfile.mktemp(suffix=".db")
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + db_path, FLASK_APP_KEY="bench",
+               PASSWORD_POOL_SIZE=str(pool_size), PASSWORD_QUEUE_LIMIT=str(args.queue_limit if pool_size else args.workers),
+               PASSWORD_SLOTS_DIR=tempfile.mkdtemp(), BCRYPT_LOG_ROUNDS=str(args.rounds))
+    seed(env)
+    #Sin pool (bcrypt en el worker) el cupo es igual al número de workers: es el comportamiento anterior.
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "wsgi", "--chdir", SRC, "-w", str(args.workers), "-b", "127.0.0.1:%d" % port, "--log-level", "warning"],
+        env=env,
+    )
+    base = "http://127.0.0.1:%d" % port
+    try:
+        for _ in range(100):
+            try:
+                request(base + "/people?limit=1")
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        idle = measure_gets(base, args.seconds / 2)
+
+        stop = threading.Event()
+        statuses = []
+
+        def storm():
+            while not stop.is_set():
+                statuses.append(request(base + "/login", {"email": "storm@example.com", "password": "secret"})[1])
+
+        threads = [threading.Thread(target=storm, daemon=True) for _ in range(args.storm)]
+        for thread in threads:
+            thread.start()
+        loaded = measure_gets(base, args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(db_path)
+
+    return {
+        "pool_size": pool_size,
+        "idle_p50_ms": percentile(idle, 50),
+        "idle_p99_ms": percentile(idle, 99),
+        "storm_p50_ms": percentile(loaded, 50),
+        "storm_p99_ms": percentile(loaded, 99),
+        "storm_mean_ms": statistics.mean(loaded) * 1000,
+        "logins_ok": statuses.count(200),
+        "logins_429": statuses.count(429),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--storm", type=int, default=16, help="hilos haciendo login al mismo tiempo")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--queue-limit", type=int, default=2)
+    args = parser.parse_args()
+
+    for pool_size in (0, args.pool_size):
+        print(json.dumps(run(pool_size, args)))
+
+
+if __name__ == "__main__":
+    main()
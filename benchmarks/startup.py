@@ -0,0 +1,108 @@
+"""Tiempo desde que arranca el proceso hasta la primera respuesta.
+
+Dos mediciones, cada una repetida --runs veces (se reporta la mediana):
+
+- "proceso": un intérprete nuevo que importa app.py, llama a create_app() y
+  hace GET /people?limit=1 con el test client. Separa import, create_app y
+  primer request, y el total incluye el arranque del intérprete.
+- "servidor": gunicorn con gunicorn.conf.py, desde el Popen hasta el primer
+  200 por HTTP (lo que ve el balanceador al escalar).
+
+Cada una se corre con la configuración por defecto y con los subsistemas
+opcionales encendidos (ADMIN_ENABLED=1, MIGRATIONS_ENABLED=1), que es como
+arrancaba la app antes de create_app().
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from async_vs_sync import free_port, get, seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+VARIANTS = {
+    "por defecto": {},
+    "admin + migraciones": {"ADMIN_ENABLED": "1", "MIGRATIONS_ENABLED": "1"},
+}
+
+PROCESS_CODE = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+status = app.test_client().get("/people?limit=1").status_code
+done = time.perf_counter()
+print(json.dumps({"import": imported - start, "create_app": created - imported, "first_request": done - created, "status": status}))
+"""
+
+
+def measure_process(env):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", PROCESS_CODE], cwd=SRC, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["total"] = time.perf_counter() - start
+    return result
+
+
+def measure_server(env, args):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", os.path.join(ROOT, "gunicorn.conf.py"), "wsgi", "--chdir", SRC,
+         "-w", str(args.workers), "-b", "127.0.0.1:%d" % port, "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        while get("http://127.0.0.1:%d/people?limit=1" % port, 1)[1] != 200:
+            if server.poll() is not None:
+                raise RuntimeError("gunicorn terminó antes de responder")
+            time.sleep(0.01)
+        return {"total": time.perf_counter() - start}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def median_ms(results, key):
+    return round(statistics.median(result[key] for result in results) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--people", type=int, default=2000)
+    args = parser.parse_args()
+
+    database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.db")
+    seed(database_url, args)
+    base_env = dict(os.environ, DATABASE_URL=database_url, FLASK_APP_KEY="bench", METRICS_DIR=tempfile.mkdtemp())
+    base_env.pop("FLASK_RUN_FROM_CLI", None)
+
+    for name, extra in VARIANTS.items():
+        env = dict(base_env, **extra)
+        process = [measure_process(env) for _ in range(args.runs)]
+        server = [measure_server(env, args) for _ in range(args.runs)]
+        print(json.dumps({
+            "variante": name,
+            "import_ms": median_ms(process, "import"),
+            "create_app_ms": median_ms(process, "create_app"),
+            "first_request_ms": median_ms(process, "first_request"),
+            "process_total_ms": median_ms(process, "total"),
+            "gunicorn_first_200_ms": median_ms(server, "total"),
+        }, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Benchmark de todos los endpoints a través de la app WSGI.
+
+Siembra un catálogo sintético (tamaños configurables) en un SQLite temporal o en
+la base que se indique con --database-url (si ya tiene tablas, solo con --reset,
+que las borra), recorre cada escenario con N requests a la
+concurrencia indicada y reporta p50/p95/p99, throughput y consultas SQL por
+request. Con --save-baseline guarda el resultado; con --baseline lo compara y
+termina con código 1 si hay regresiones.
+
+    python benchmarks/suite.py --people 5000 --planets 5000 --vehicles 5000 --concurrency 8
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+PASSWORD = "bench-password"
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000 if values else 0.0
+
+
+def load_app(args):
+    #La app lee su configuración al importarse: el entorno se arma antes.
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("FLASK_APP_KEY", "bench")
+    os.environ["BCRYPT_LOG_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ["PASSWORD_POOL_SIZE"] = "0"
+    os.environ["PASSWORD_QUEUE_LIMIT"] = str(max(args.concurrency, 1))
+    os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp())
+    sys.path.insert(0, SRC)
+    from app import create_app
+    return create_app()
+
+
+def seed(app, args):
+    from sqlalchemy import insert, inspect
+    from models import db, People, Planets, Vehicles, User, FavoritePeople, FavoritePlanets, FavoriteVehicles
+    from passwords import password_hasher
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        #LA SIEMBRA BORRA TODAS LAS TABLAS: UNA BASE CON DATOS SOLO SE TOCA SI SE PIDE CON --reset.
+        tables = inspect(db.engine).get_table_names()
+        if tables and not args.reset:
+            raise SystemExit("%s ya tiene tablas (%s); usa --reset para borrarlas y sembrar de nuevo"
+                             % (db.engine.url.render_as_string(hide_password=True), ", ".join(sorted(tables))))
+        db.drop_all()
+        db.create_all()
+        #SE USA executemany DIRECTO: SEMBRAR NO ES PARTE DE LO QUE SE MIDE.
+        db.session.execute(insert(People), [dict(
+            name="Person %d" % i, url="https://swapi.tech/api/people/%d" % i, height=rng.uniform(60, 250),
+            mass=rng.uniform(20, 200), hair_color=rng.choice(["black", "brown", "blond", "none"]),
+            skin_color=rng.choice(["fair", "gold", "green"]), eyes_color=rng.choice(["blue", "yellow", "red"]),
+            birth_year=rng.uniform(0, 900), gender=rng.choice(["male", "female", "n/a"])) for i in range(args.people)])
+        db.session.execute(insert(Planets), [dict(
+            name="Planet %d" % i, url="https://swapi.tech/api/planets/%d" % i, diameter=rng.uniform(1000, 20000),
+            rotation_period=rng.uniform(10, 40), orbital_period=rng.randint(100, 5000), gravity=rng.uniform(0.5, 2),
+            population=rng.uniform(0, 1e12), climate=rng.choice(["arid", "temperate", "frozen", "murky"])) for i in range(args.planets)])
+        db.session.execute(insert(Vehicles), [dict(
+            name="Vehicle %d" % i, url="https://swapi.tech/api/vehicles/%d" % i, model="Model %d" % i,
+            vehicle_class=rng.choice(["wheeled", "repulsorcraft", "starfighter"]), manufacturer=rng.choice(["Incom", "Kuat", "Sienar"]),
+            cost_in_credits=rng.uniform(1000, 1e6), passengers=rng.randint(0, 50), cargo_capacity=rng.uniform(0, 1e5)) for i in range(args.vehicles)])
+        password = password_hasher.hash(PASSWORD)
+        db.session.execute(insert(User), [dict(
+            email="user%d@bench.local" % i, password=password, is_active=True, first_name="User", last_name=str(i),
+            subscription_date="2023-01-01", birth_date=1990, country="CR") for i in range(args.users)])
+        favorites = args.favorites_per_user
+        for model, column, total in ((FavoritePeople, "people_uid", args.people), (FavoritePlanets, "planet_uid", args.planets), (FavoriteVehicles, "vehicle_uid", args.vehicles)):
+            #Los primeros "favorites" de cada catálogo; el escenario de agregar usa los siguientes.
+            db.session.execute(insert(model), [{"user_id": user, column: uid}
+                                               for user in range(1, args.users + 1) for uid in range(1, min(favorites, total) + 1)])
+        #Se registra como una importación para que los índices en memoria (/search, /<tipo>/all) vean la siembra.
+        from versions import bump_imported
+        for table, total in (("people", args.people), ("planets", args.planets), ("vehicles", args.vehicles)):
+            if total:
+                bump_imported(table, 1, total)
+        db.session.commit()
+
+
+#Prefijo corto, prefijo largo, prefijo de otra palabra y búsqueda por trigramas.
+SEARCH_TERMS = ("p", "planet 1", "veh", "12", "erson 4")
+
+
+class Scenarios:
+    def __init__(self, app, args):
+        self.app = app
+        self.args = args
+        client = app.test_client()
+        response = client.post("/login", json={"email": "user0@bench.local", "password": PASSWORD})
+        self.auth = {"Authorization": "Bearer " + response.get_json()["token"]}
+        self.first_free_planet = min(args.favorites_per_user, args.planets) + 1
+
+    def _planet(self, i):
+        return i % self.args.planets + 1
+
+    def _favorite_pair(self, i):
+        #Pares (usuario, planeta) que no están en favoritos: uno distinto por iteración.
+        users = self.args.users
+        return i % users + 1, self.first_free_planet + (i // users) % (self.args.planets - self.first_free_planet + 1)
+
+    def _batch(self, i):
+        #Iteraciones pares agregan 50 favoritos (planetas y personajes) y las impares los quitan.
+        op = "add" if i % 2 == 0 else "remove"
+        first = self.first_free_planet
+        operations = [{"op": op, "kind": kind, "uid": first + n} for kind in ("planet", "people") for n in range(25)]
+        return {"user_id": (i // 2) % self.args.users + 1, "operations": operations}
+
+    def all(self):
+        planet_body = dict(name="Bench", url="u", diameter=1.0, rotation_period=1.0, orbital_period=1, gravity=1.0, population=1.0, climate="arid")
+        return [
+            ("GET /people", lambda c, i: c.get("/people?limit=50")),
+            ("GET /people (page 2)", lambda c, i: c.get("/people?limit=50&after=50")),
+            ("GET /people (gzip)", lambda c, i: c.get("/people?limit=50", headers={"Accept-Encoding": "gzip"})),
+            ("GET /people (br)", lambda c, i: c.get("/people?limit=50", headers={"Accept-Encoding": "br"})),
+            ("GET /planets", lambda c, i: c.get("/planets?limit=50")),
+            ("GET /vehicles", lambda c, i: c.get("/vehicles?limit=50")),
+            ("GET /user", lambda c, i: c.get("/user?limit=50")),
+            ("GET /people/<uid>", lambda c, i: c.get("/people/%d" % (i % self.args.people + 1))),
+            ("GET /planets/<uid>", lambda c, i: c.get("/planets/%d" % self._planet(i))),
+            ("GET /vehicles/<uid>", lambda c, i: c.get("/vehicles/%d" % (i % self.args.vehicles + 1))),
+            ("GET /search", lambda c, i: c.get("/search?q=%s" % SEARCH_TERMS[i % len(SEARCH_TERMS)])),
+            ("GET /user/<id>", lambda c, i: c.get("/user/%d" % (i % self.args.users + 1))),
+            ("POST /favorites", lambda c, i: c.post("/favorites", json={"user_id": i % self.args.users + 1})),
+            ("POST /favorites?expand=", lambda c, i: c.post("/favorites?expand=people,planets,vehicles,user", json={"user_id": i % self.args.users + 1})),
+            ("POST /favorites?expand= (gzip)", lambda c, i: c.post("/favorites?expand=people,planets,vehicles,user", json={"user_id": i % self.args.users + 1}, headers={"Accept-Encoding": "gzip"})),
+            ("POST /favorite/planet/<id>", lambda c, i: c.post("/favorite/planet/%d" % self._favorite_pair(i)[1], json={"user_id": self._favorite_pair(i)[0]})),
+            ("DELETE /favorite/planet/<id>", lambda c, i: c.delete("/favorite/planet/%d" % self._favorite_pair(i)[1], json={"user_id": self._favorite_pair(i)[0]})),
+            ("POST /favorites/batch (50)", lambda c, i: c.post("/favorites/batch", json=self._batch(i))),
+            ("POST /login", lambda c, i: c.post("/login", json={"email": "user%d@bench.local" % (i % self.args.users), "password": PASSWORD})),
+            ("GET /protected", lambda c, i: c.get("/protected", headers=self.auth)),
+            ("POST /add/planet", lambda c, i: c.post("/add/planet", json=planet_body, headers=self.auth)),
+            ("PUT /update/planet", lambda c, i: c.put("/update/planet", json=dict(planet_body, uid=self._planet(i)), headers=self.auth)),
+        ]
+
+
+def run_scenario(app, name, action, args, query_counter):
+    local = threading.local()
+    latencies = [None] * args.requests
+    queries = [0] * args.requests
+    errors = []
+
+    def one(i):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        query_counter.reset()
+        start = time.perf_counter()
+        response = action(client, i)
+        latencies[i] = time.perf_counter() - start
+        queries[i] = query_counter.value()
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "throughput_rps": args.requests / elapsed,
+        "queries_per_request": sum(queries) / len(queries),
+        "errors": len(errors),
+    }
+
+
+class QueryCounter:
+    #Cuenta las consultas del hilo actual: cada request del test client corre en el hilo que lo hace.
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    def value(self):
+        return getattr(self._local, "count", 0)
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        #Se ignoran diferencias de menos de 1 ms: en requests tan cortos son ruido.
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance) and current["p95_ms"] - previous["p95_ms"] > 1.0:
+            regressions.append("%s: p95 %.2f ms -> %.2f ms" % (name, previous["p95_ms"], current["p95_ms"]))
+        if current["queries_per_request"] > previous["queries_per_request"] + 0.01:
+            regressions.append("%s: consultas por request %.2f -> %.2f" % (name, previous["queries_per_request"], current["queries_per_request"]))
+        if current["errors"] > previous["errors"]:
+            regressions.append("%s: errores %d -> %d" % (name, previous["errors"], current["errors"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="por defecto un SQLite nuevo en un directorio temporal")
+    parser.add_argument("--reset", action="store_true", help="borra las tablas de --database-url si ya existen")
+    parser.add_argument("--people", type=int, default=2000)
+    parser.add_argument("--planets", type=int, default=2000)
+    parser.add_argument("--vehicles", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--favorites-per-user", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="requests por escenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="solo los escenarios cuyo nombre contenga este texto")
+    parser.add_argument("--baseline", help="archivo con el que se comparan los resultados")
+    parser.add_argument("--save-baseline", help="guarda los resultados en este archivo")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="aumento de p95 permitido (0.25 = 25%%)")
+    args = parser.parse_args()
+    if args.database_url is None:
+        args.database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "api-bench.db")
+
+    app = load_app(args)
+    seed(app, args)
+
+    counter = QueryCounter()
+    counter.install()
+
+    results = {}
+    print("%-32s %9s %9s %9s %10s %8s %6s" % ("escenario", "p50 ms", "p95 ms", "p99 ms", "req/s", "sql/req", "err"))
+    for name, action in Scenarios(app, args).all():
+        if args.only and args.only not in name:
+            continue
+        result = results[name] = run_scenario(app, name, action, args, counter)
+        print("%-32s %9.2f %9.2f %9.2f %10.1f %8.2f %6d" % (
+            name, result["p50_ms"], result["p95_ms"], result["p99_ms"], result["throughput_rps"], result["queries_per_request"], result["errors"]))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as handle:
+            json.dump(results, handle, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            print("\nREGRESIONES:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("\nSin regresiones contra %s" % args.baseline)
+
+
+if __name__ == "__main__":
+    main()
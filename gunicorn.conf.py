@@ -0,0 +1,43 @@
+"""Configuración de gunicorn para producción (la usa el Procfile).
+
+    gunicorn --config gunicorn.conf.py wsgi --chdir ./src/
+
+- preload_app: la app se importa y se calienta una sola vez en el master
+  (ver src/warmup.py); los workers nacen por fork con todo listo, así que un
+  worker nuevo (deploy o max_requests) no arranca en frío.
+- Antes del fork el master cierra sus conexiones y cada worker descarta las
+  que hubiera heredado: dos procesos nunca comparten un socket de la base.
+- El número de workers y el puerto salen de WEB_CONCURRENCY y PORT, como
+  siempre en Heroku. GUNICORN_PRELOAD=0 vuelve a importar la app en cada
+  worker (por ejemplo para usar --reload).
+"""
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() not in ("0", "false", "no")
+
+#RECICLAR WORKERS DE VEZ EN CUANDO; CON PRELOAD UN WORKER NUEVO YA NACE CALIENTE.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from warmup import dispose_engines, warm_up
+
+    app = server.app.wsgi()
+    statuses, seconds = warm_up(app)
+    errors = {path: status for path, status in statuses.items() if status >= 500}
+    server.log.info("Warm-up: %d requests en %.2f s%s", len(statuses), seconds, " (errores: %s)" % errors if errors else "")
+    dispose_engines(app)
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from warmup import dispose_engines
+        dispose_engines(server.app.wsgi(), close=False)
+
+
+def post_worker_init(worker):
+    from warmup import warm_worker
+    warm_worker(worker.wsgi)
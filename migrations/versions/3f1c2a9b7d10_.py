@@ -0,0 +1,35 @@
+"""catalog version counters
+
+Revision ID: 3f1c2a9b7d10
+Revises: 85e7aa60d4dd
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = '85e7aa60d4dd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('table_name', sa.String(length=30), nullable=False),
+    sa.Column('uid', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name', 'uid')
+    )
+    # Los contadores de tabla se crean de una vez para que el primer bump no compita por el INSERT.
+    op.bulk_insert(catalog_version, [
+        {'table_name': 'people', 'uid': 0, 'version': 0},
+        {'table_name': 'planets', 'uid': 0, 'version': 0},
+        {'table_name': 'vehicles', 'uid': 0, 'version': 0},
+    ])
+
+
+def downgrade():
+    op.drop_table('catalog_version')
@@ -0,0 +1,40 @@
+"""catalog filter indexes
+
+Revision ID: 6d2e8b4f1a93
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-18 11:40:05.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2e8b4f1a93'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+# (tabla, columna): cada índice termina en uid para paginar por cursor sin ordenar.
+INDEXES = [
+    ('people', 'gender'),
+    ('people', 'hair_color'),
+    ('people', 'height'),
+    ('people', 'mass'),
+    ('planets', 'climate'),
+    ('planets', 'population'),
+    ('planets', 'diameter'),
+    ('vehicles', 'vehicle_class'),
+    ('vehicles', 'manufacturer'),
+    ('vehicles', 'cost_in_credits'),
+]
+
+
+def upgrade():
+    for table, column in INDEXES:
+        op.create_index('ix_%s_%s_uid' % (table, column), table, [column, 'uid'], unique=False)
+
+
+def downgrade():
+    for table, column in reversed(INDEXES):
+        op.drop_index('ix_%s_%s_uid' % (table, column), table_name=table)
@@ -0,0 +1,33 @@
+"""catalog import ranges
+
+Revision ID: 9b4d6e2a7c15
+Revises: e5b19c7a3f08
+Create Date: 2026-10-18 17:05:41.204517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4d6e2a7c15'
+down_revision = 'e5b19c7a3f08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('catalog_import',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=30), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('first_uid', sa.Integer(), nullable=False),
+    sa.Column('last_uid', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_catalog_import_table_name_version', 'catalog_import', ['table_name', 'version'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_catalog_import_table_name_version', table_name='catalog_import')
+    op.drop_table('catalog_import')
@@ -0,0 +1,41 @@
+"""unique favorites per user
+
+Revision ID: a47c3e9d2b56
+Revises: 6d2e8b4f1a93
+Create Date: 2026-10-18 13:05:47.560291
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a47c3e9d2b56'
+down_revision = '6d2e8b4f1a93'
+branch_labels = None
+depends_on = None
+
+FAVORITES = [
+    ('favorite_people', 'people_uid'),
+    ('favorite_planets', 'planet_uid'),
+    ('favorite_vehicles', 'vehicle_uid'),
+]
+
+
+def upgrade():
+    for table, column in FAVORITES:
+        # Antes de la restricción se borran los duplicados que ya existan (se queda el más antiguo).
+        op.execute(
+            'DELETE FROM {table} WHERE id NOT IN ('
+            'SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM {table} GROUP BY user_id, {column}) AS keep)'
+            .format(table=table, column=column)
+        )
+        # batch_alter_table: sqlite no soporta ALTER TABLE ADD CONSTRAINT, se recrea la tabla.
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint('uq_%s_user_id_%s' % (table, column), ['user_id', column])
+
+
+def downgrade():
+    for table, column in reversed(FAVORITES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint('uq_%s_user_id_%s' % (table, column), type_='unique')
@@ -0,0 +1,39 @@
+"""favorite counters
+
+Revision ID: c81f5a2e7d34
+Revises: a47c3e9d2b56
+Create Date: 2026-10-18 14:22:09.871345
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f5a2e7d34'
+down_revision = 'a47c3e9d2b56'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('favorite_count',
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('uid', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('kind', 'uid')
+    )
+    op.create_index('ix_favorite_count_kind_count_uid', 'favorite_count', ['kind', 'count', 'uid'], unique=False)
+    # Se llenan con los favoritos que ya existen.
+    for kind, table, column in (('people', 'favorite_people', 'people_uid'),
+                                ('planets', 'favorite_planets', 'planet_uid'),
+                                ('vehicles', 'favorite_vehicles', 'vehicle_uid')):
+        op.execute(
+            "INSERT INTO favorite_count (kind, uid, count) SELECT '{kind}', {column}, COUNT(*) FROM {table} GROUP BY {column}"
+            .format(kind=kind, table=table, column=column)
+        )
+
+
+def downgrade():
+    op.drop_index('ix_favorite_count_kind_count_uid', table_name='favorite_count')
+    op.drop_table('favorite_count')
@@ -0,0 +1,64 @@
+"""token blocklist with expiry
+
+Revision ID: e5b19c7a3f08
+Revises: c81f5a2e7d34
+Create Date: 2026-10-18 15:40:12.318904
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b19c7a3f08'
+down_revision = 'c81f5a2e7d34'
+branch_labels = None
+depends_on = None
+
+# Las filas viejas no saben cuándo expira su token. Los tokens duran 15 minutos
+# (JWT_ACCESS_TOKEN_EXPIRES por defecto): con un día de margen, lo anterior ya
+# expiró y a lo demás se le da un día más antes de que la purga lo borre.
+MARGIN = timedelta(days=1)
+
+token_bloked_list = sa.table('token_bloked_list',
+    sa.column('email', sa.String), sa.column('user_id', sa.Integer),
+    sa.column('create_at', sa.DateTime), sa.column('expires_at', sa.DateTime))
+user = sa.table('user', sa.column('id', sa.Integer), sa.column('email', sa.String))
+
+
+def upgrade():
+    now = datetime.utcnow()
+    with op.batch_alter_table('token_bloked_list', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+    op.execute(token_bloked_list.delete().where(token_bloked_list.c.create_at < now - MARGIN))
+    op.execute(token_bloked_list.update().values(
+        expires_at=now + MARGIN,
+        user_id=sa.select(user.c.id).where(user.c.email == token_bloked_list.c.email).scalar_subquery(),
+    ))
+
+    # Los jti son UUID: 36 caracteres fijos.
+    with op.batch_alter_table('token_bloked_list', schema=None) as batch_op:
+        batch_op.alter_column('token', existing_type=sa.String(length=250), type_=sa.CHAR(length=36), existing_nullable=False)
+        batch_op.drop_column('email')
+        batch_op.create_index('ix_token_bloked_list_expires_at', ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('token_bloked_list', schema=None) as batch_op:
+        batch_op.drop_index('ix_token_bloked_list_expires_at')
+        batch_op.add_column(sa.Column('email', sa.String(length=120), nullable=True))
+        batch_op.alter_column('token', existing_type=sa.CHAR(length=36), type_=sa.String(length=250), existing_nullable=False)
+
+    op.execute(token_bloked_list.update().values(
+        email=sa.select(user.c.email).where(user.c.id == token_bloked_list.c.user_id).scalar_subquery(),
+    ))
+    op.execute(token_bloked_list.update().where(token_bloked_list.c.email.is_(None)).values(email=''))
+
+    with op.batch_alter_table('token_bloked_list', schema=None) as batch_op:
+        batch_op.alter_column('email', existing_type=sa.String(length=120), nullable=False)
+        batch_op.drop_column('expires_at')
+        batch_op.drop_column('user_id')
@@ -2,6 +2,17 @@ import os
 from flask_admin import Admin
 from models import db, User, People, Planets, Vehicles, FavoritePeople, FavoritePlanets, FavoriteVehicles, TokenBlokedList
 from flask_admin.contrib.sqla import ModelView
+from versions import bump_version
+
+
+#LAS EDICIONES DESDE EL ADMIN TAMBIÉN DEBEN CAMBIAR LA VERSIÓN (ETAG) DEL CATÁLOGO.
+class CatalogModelView(ModelView):
+    def on_model_change(self, form, model, is_created):
+        self.session.flush()
+        bump_version(model.__tablename__, model.uid)
+
+    def on_model_delete(self, model):
+        bump_version(model.__tablename__, model.uid)
 
 def setup_admin(app):
     app.secret_key = os.environ.get('FLASK_APP_KEY', 'sample key')
@@ -11,9 +22,9 @@ def setup_admin(app):
     
     # Add your models here, for example this is how we add a the User model to the admin
     admin.add_view(ModelView(User, db.session))
-    admin.add_view(ModelView(People, db.session))
-    admin.add_view(ModelView(Planets, db.session))
-    admin.add_view(ModelView(Vehicles, db.session))
+    admin.add_view(CatalogModelView(People, db.session))
+    admin.add_view(CatalogModelView(Planets, db.session))
+    admin.add_view(CatalogModelView(Vehicles, db.session))
     admin.add_view(ModelView(FavoritePeople, db.session))
     admin.add_view(ModelView(FavoritePlanets, db.session))
     admin.add_view(ModelView(FavoriteVehicles, db.session))
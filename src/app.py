@@ -1,14 +1,27 @@
 """This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, url_for
-from flask_migrate import Migrate
-from flask_swagger import swagger
+from flask import Blueprint, Flask, current_app, request, jsonify, url_for, g
 from flask_cors import CORS
-from utils import APIException, generate_sitemap
-from admin import setup_admin
+from utils import APIException, generate_sitemap, read_page_args, keyset_page
 from models import db, User, People, Planets, Vehicles, FavoritePeople, FavoritePlanets, FavoriteVehicles, TokenBlokedList
+from revocation import expiry_datetime, purge_expired, revocation_cache
+from versions import conditional, bump_version
+from importer import BulkImporter, iter_records
+from streaming import stream_collection
+from metrics import metrics, render as render_metrics
+from serializers import serializer_for
+from cache import entity_cache
+from engine import load_profile, engine_options, configure_engine
+from replicas import replica_set, replica_read
+from favorites import FAVORITE_LISTS, FavoritesPayload, add_favorite, apply_batch, favorites_query, read_id
+from popularity import decrement, reconcile, top
+from snapshot import catalog_snapshots
+from compress import response_compressor
+from search import name_index
 import json
+from time import sleep
+import click
 
 #PARA MANEJAR LA ENCRIPTACIÓN DE LA INFORMACIÓN. ADICIONAL SE REQUIERE, FLASK, REQUEST, JSONIFY, SIN EMBARGO ESOS YA FUERON INSTALADOS ARRIBA.
 from flask_jwt_extended import create_access_token
@@ -20,103 +33,274 @@ from flask_jwt_extended import JWTManager
 #PARA OPERACIONES CON FECHAS Y HORAS.
 from datetime import date, time, datetime, timezone, timedelta #timedelta, es para hacer resta de horas.
 
-#PARA ENCRIPTAR EL PASSWORD
-from flask_bcrypt import Bcrypt
+#PARA ENCRIPTAR EL PASSWORD (bcrypt EN UN POOL DE PROCESOS, VER passwords.py)
+from passwords import password_hasher
 
-#INSTANCIA DE FLASK
-app = Flask(__name__)
-app.url_map.strict_slashes = False
+#RUTAS DE LA API; create_app() LAS REGISTRA EN LA APP.
+api = Blueprint("api", __name__, cli_group=None)
+jwt = JWTManager()
 
-# Setup the Flask-JWT-Extended extension - relacionado con la encripción.
-app.config["JWT_SECRET_KEY"] = os.getenv("FLASK_APP_KEY") # recuerda que debes tener la variable de ambiente "FLASK_APP_KEY" en tu archivo .env
-jwt = JWTManager(app)  
+#FÁBRICA DE LA APP: wsgi.py, asgi.py, "flask ..." (FLASK_APP=src/app.py) Y LOS BENCHMARKS LLAMAN A create_app().
+def create_app():
+    app = Flask(__name__)
+    app.url_map.strict_slashes = False
 
-#ENCRIPTAMOS LA INSTANCIA APP
-bcrypt = Bcrypt(app)
-db_url = os.getenv("DATABASE_URL")
-if db_url is not None:
-    app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
-else:
-    app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Setup the Flask-JWT-Extended extension - relacionado con la encripción.
+    app.config["JWT_SECRET_KEY"] = os.getenv("FLASK_APP_KEY") # recuerda que debes tener la variable de ambiente "FLASK_APP_KEY" en tu archivo .env
+    jwt.init_app(app)
 
-MIGRATE = Migrate(app, db)
-db.init_app(app)
-CORS(app)
-setup_admin(app)
+    #CONFIGURACIÓN DEL HASH DE CONTRASEÑAS: COSTO DE BCRYPT, PROCESOS DEL POOL Y LÍMITE DE LA COLA (429 AL LLENARSE).
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv("BCRYPT_LOG_ROUNDS", 10))
+    app.config['PASSWORD_POOL_SIZE'] = int(os.getenv("PASSWORD_POOL_SIZE", 2))
+    app.config['PASSWORD_QUEUE_LIMIT'] = int(os.getenv("PASSWORD_QUEUE_LIMIT", 4))
+    app.config['PASSWORD_SLOTS_DIR'] = os.getenv("PASSWORD_SLOTS_DIR")
+    password_hasher.init_app(app)
+
+    db_url = os.getenv("DATABASE_URL")
+    if db_url is not None:
+        app.config['SQLALCHEMY_DATABASE_URI'] = db_url.replace("postgres://", "postgresql://")
+    else:
+        app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    #RÉPLICAS DE LECTURA OPCIONALES (URLS SEPARADAS POR COMA) PARA LAS RUTAS @replica_read. VER replicas.py.
+    app.config['DATABASE_REPLICA_URLS'] = os.getenv("DATABASE_REPLICA_URLS")
+    app.config['REPLICA_SELECTION'] = os.getenv("REPLICA_SELECTION", "round_robin")
+    app.config['REPLICA_PIN_SECONDS'] = float(os.getenv("REPLICA_PIN_SECONDS", 5))
+
+    #PERFIL DEL ENGINE (POOL, TIMEOUTS, PRAGMAS DE SQLITE): "web", "worker" O "dev". VER engine.py.
+    app.config['DATABASE_PROFILE'] = load_profile(os.getenv("DATABASE_PROFILE", "web"))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config['DATABASE_PROFILE'])
+
+    #TAMAÑO DE PÁGINA POR DEFECTO Y MÁXIMO PARA LAS COLECCIONES (?limit=&after=).
+    app.config['PAGE_SIZE'] = int(os.getenv("PAGE_SIZE", 50))
+    app.config['PAGE_SIZE_MAX'] = int(os.getenv("PAGE_SIZE_MAX", 200))
+
+    #CADA CUANTOS SEGUNDOS EL WORKER TRAE LOS NUEVOS TOKENS BLOQUEADOS DE LA BASE DE DATOS.
+    app.config['REVOCATION_SYNC_SECONDS'] = float(os.getenv("REVOCATION_SYNC_SECONDS", 5))
+    #VENTANA QUE SE VUELVE A LEER EN CADA SINCRONIZACIÓN (COMMITS FUERA DE ORDEN) Y CADA CUÁNTO SE RELEE TODO. VER revocation.py.
+    app.config['REVOCATION_SYNC_OVERLAP_SECONDS'] = float(os.getenv("REVOCATION_SYNC_OVERLAP_SECONDS", 60))
+    app.config['REVOCATION_FULL_SYNC_SECONDS'] = float(os.getenv("REVOCATION_FULL_SYNC_SECONDS", 300))
+
+    #SEGUNDOS QUE UN CLIENTE PUEDE USAR SU COPIA DEL CATÁLOGO ANTES DE REVALIDAR CON If-None-Match.
+    app.config['CATALOG_MAX_AGE'] = int(os.getenv("CATALOG_MAX_AGE", 0))
+
+    #COMPRESIÓN DE RESPUESTAS SEGÚN Accept-Encoding: ORDEN DE PREFERENCIA, NIVELES, TAMAÑO MÍNIMO Y CUÁNTAS
+    #RESPUESTAS COMPRIMIDAS SE GUARDAN POR ETAG. VER compress.py (SNAPSHOT_GZIP_LEVEL SIGUE VALIENDO PARA gzip).
+    app.config['COMPRESS_ENABLED'] = os.getenv("COMPRESS_ENABLED", "1").lower() in ("1", "true", "yes")
+    app.config['COMPRESS_ALGORITHMS'] = os.getenv("COMPRESS_ALGORITHMS", "br,zstd,gzip")
+    app.config['COMPRESS_GZIP_LEVEL'] = int(os.getenv("COMPRESS_GZIP_LEVEL", os.getenv("SNAPSHOT_GZIP_LEVEL", 6)))
+    app.config['COMPRESS_BR_LEVEL'] = int(os.getenv("COMPRESS_BR_LEVEL", 5))
+    app.config['COMPRESS_ZSTD_LEVEL'] = int(os.getenv("COMPRESS_ZSTD_LEVEL", 3))
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+    app.config['COMPRESS_MIMETYPES'] = os.getenv("COMPRESS_MIMETYPES", "application/json,text/plain")
+    app.config['COMPRESS_CACHE_SIZE'] = int(os.getenv("COMPRESS_CACHE_SIZE", 512))
+
+    #IMPORTACIÓN MASIVA: FILAS POR executemany Y FILAS POR TRANSACCIÓN.
+    app.config['IMPORT_BATCH_SIZE'] = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+    app.config['IMPORT_COMMIT_ROWS'] = int(os.getenv("IMPORT_COMMIT_ROWS", 50000))
+
+    #MÉTRICAS: CARPETA COMPARTIDA POR LOS WORKERS Y CADA CUÁNTO ESCRIBE CADA UNO SUS NÚMEROS.
+    app.config['METRICS_DIR'] = os.getenv("METRICS_DIR")
+    app.config['METRICS_FLUSH_SECONDS'] = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+
+    #CACHE DE ENTIDADES PARA LOS DETALLES: "memory" (LRU POR WORKER), "sqlite" (ARCHIVO LOCAL COMPARTIDO) O "none".
+    #LOS USUARIOS NO TIENEN VERSIÓN: SOLO SE GUARDAN CON "sqlite" (VER cache.py).
+    app.config['ENTITY_CACHE_BACKEND'] = os.getenv("ENTITY_CACHE_BACKEND", "memory")
+    app.config['ENTITY_CACHE_PATH'] = os.getenv("ENTITY_CACHE_PATH")
+    app.config['ENTITY_CACHE_SIZE'] = int(os.getenv("ENTITY_CACHE_SIZE", 10000))
+    app.config['ENTITY_CACHE_TTL'] = float(os.getenv("ENTITY_CACHE_TTL", 60))
+    app.config['ENTITY_CACHE_NEGATIVE_TTL'] = float(os.getenv("ENTITY_CACHE_NEGATIVE_TTL", 10))
+
+    #AUTOCOMPLETAR: CADA CUÁNTO UN WORKER REVISA LAS ESCRITURAS DE LOS DEMÁS, PARECIDO MÍNIMO POR TRIGRAMAS (0 A 1)
+    #Y CUÁNTAS ENTRADAS REVISA COMO MÁXIMO LA BÚSQUEDA POR TRIGRAMAS.
+    app.config['SEARCH_SYNC_SECONDS'] = float(os.getenv("SEARCH_SYNC_SECONDS", 2))
+    app.config['SEARCH_MIN_SIMILARITY'] = float(os.getenv("SEARCH_MIN_SIMILARITY", 0.5))
+    app.config['SEARCH_MAX_CANDIDATES'] = int(os.getenv("SEARCH_MAX_CANDIDATES", 1000))
+    app.config['SEARCH_LIMIT_MAX'] = int(os.getenv("SEARCH_LIMIT_MAX", 50))
+
+    #MÁXIMO DE OPERACIONES POR LOTE EN /favorites/batch.
+    app.config['FAVORITES_BATCH_MAX'] = int(os.getenv("FAVORITES_BATCH_MAX", 500))
+
+    #SUBSISTEMAS OPCIONALES: EL ADMIN (/admin) Y LOS COMANDOS "flask db" (SE ACTIVAN SOLOS AL USAR EL CLI DE FLASK).
+    app.config['ADMIN_ENABLED'] = os.getenv("ADMIN_ENABLED", "0").lower() in ("1", "true", "yes")
+    app.config['MIGRATIONS_ENABLED'] = os.getenv("MIGRATIONS_ENABLED", os.getenv("FLASK_RUN_FROM_CLI", "false")).lower() in ("1", "true", "yes")
+
+    #LAS MIGRACIONES (flask db ...) SOLO HACEN FALTA DESDE EL CLI; alembic ES LO MÁS PESADO DE IMPORTAR.
+    if app.config['MIGRATIONS_ENABLED']:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine, "primary", app.config['DATABASE_PROFILE'])
+    replica_set.init_app(app)
+    entity_cache.init_app(app)
+    metrics.init_app(app)
+    revocation_cache.init_app(app)
+    name_index.init_app(app)
+    response_compressor.init_app(app)
+    CORS(app)
+    #EL PANEL DE ADMINISTRACIÓN ES OPCIONAL (ADMIN_ENABLED=1): flask_admin TARDA EN IMPORTARSE Y LA API NO LO NECESITA.
+    if app.config['ADMIN_ENABLED']:
+        from admin import setup_admin
+        setup_admin(app)
+    app.register_blueprint(api)
+    return app
 
 # Handle/serialize errors like a JSON object
-@app.errorhandler(APIException)
+@api.app_errorhandler(APIException)
 def handle_invalid_usage(error):
     return jsonify(error.to_dict()), error.status_code
 
 # generate sitemap with all your endpoints
-@app.route('/')
+@api.route('/')
 def sitemap():
-    return generate_sitemap(app)
+    return generate_sitemap(current_app)
+
+#Especificación swagger de la API: se arma la primera vez que se pide y queda guardada ya codificada.
+@api.route('/swagger.json', methods=['GET'])
+def swagger_spec():
+    body = current_app.extensions.get("swagger_spec")
+    if body is None:
+        from flask_swagger import swagger
+        spec = swagger(current_app)
+        spec["info"] = {"title": "Star Wars API", "version": "1.0"}
+        body = current_app.extensions["swagger_spec"] = current_app.json.dumps(spec)
+    return current_app.response_class(body, mimetype="application/json")
+
+# métricas de todos los workers en formato de texto de Prometheus
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    return current_app.response_class(render_metrics(metrics.collect()), mimetype="text/plain; version=0.0.4")
 
 #Verificación de token:
 def verificacionToken(identity):
     jti = identity["jti"]
-    token = TokenBlokedList.query.filter_by(token=jti, is_blocked=True).first()
+    #SE CONSULTA EL CACHE DEL WORKER; SOLO SE VA A LA BASE DE DATOS CUANDO TOCA SINCRONIZAR.
+    token = revocation_cache.is_revoked(jti)
     
     if token:
         return True  # Token bloqueado
     else:
         return False  # Token no bloqueado
+
+#Respuesta paginada de una colección: {"results": [...], "next": cursor o null}
+#Con ?stream=1 se devuelve la tabla completa como un arreglo JSON en streaming.
+#Con ?fields=name,height solo se consultan esas columnas (más la llave primaria).
+#Filtros: ?climate=arid (igualdad) y ?population_min=&population_max= (rango), ver serializers.py.
+def paginated_response(model):
+    serializer = serializer_for(model)
+    fields = serializer.parse_fields(request.args.get("fields"))
+    query = serializer.filter(serializer.query(db.session, fields), request.args)
+
+    if request.args.get("stream") in ("1", "true"):
+        return stream_collection(query, serializer.key_column, lambda row: serializer.from_row(row, fields))
+
+    limit, after = read_page_args(request.args, current_app.config['PAGE_SIZE'], current_app.config['PAGE_SIZE_MAX'])
+    rows, next_cursor = keyset_page(query, serializer.key_column, limit, after)
+
+    return jsonify({"results": [serializer.from_row(row, fields) for row in rows], "next": next_cursor}), 200
+
+#Respuesta de un solo registro, también con ?fields=. Se lee del cache de entidades;
+#la proyección de campos se aplica sobre el registro completo guardado en el cache.
+def detail_response(model, pk, not_found):
+    serializer = serializer_for(model)
+    fields = serializer.parse_fields(request.args.get("fields"))
+    item = entity_cache.get_or_load(model.__tablename__, pk, lambda: serializer.get(db.session, pk), g.get("row_version"))
+
+    if item is None:
+        raise APIException(not_found, 404)
+
+    if fields != serializer.fields:
+        item = {field: item[field] for field in fields}
+
+    return jsonify(item), 200
     
 
+#Catálogo completo en un solo arreglo JSON, ya codificado y comprimido (ver snapshot.py).
+#Tiene su propio ETag por versión de la tabla y por codificación (gzip o no).
+@api.route('/<any(people, planets, vehicles):kind>/all', methods=['GET'])
+@replica_read
+def get_catalog_snapshot(kind):
+    return catalog_snapshots[kind].response()
+
+#Autocompletar: /search?q=sky&limit=10&kind=people (kind se puede repetir).
+#Responde desde el índice en memoria del worker (ver search.py), sin consultar las tablas.
+@api.route('/search', methods=['GET'])
+@replica_read
+def search_names():
+    text = request.args.get("q", "")
+    if not text.strip():
+        raise APIException({"message":"necesitas especificar q"}, status_code=400)
+    kinds = request.args.getlist("kind")
+    unknown = [kind for kind in kinds if kind not in ("people", "planets", "vehicles")]
+    if unknown:
+        raise APIException({"message":"tipos desconocidos: %s" % ", ".join(unknown)}, status_code=400)
+    limit, _ = read_page_args(request.args, 10, current_app.config['SEARCH_LIMIT_MAX'])
+
+    return jsonify({"results": name_index.search(text, limit, kinds)}), 200
+
 #1 - [GET] /people Listar todos los registros de people en la base de datos
 
-@app.route('/people', methods=['GET'])
+@api.route('/people', methods=['GET'])
+@replica_read
+@conditional("people")
 def get_people():
 
-    people = People.query.all()
-    people = list(map(lambda item: item.serialize(), people))
-    print(people)
-
-    return jsonify(people), 200
+    return paginated_response(People)
 
 #2 - [GET] /people/<int:people_id> Listar la información de una sola people
-@app.route('/people/<int:uid>', methods=['GET'])
+@api.route('/people/<int:uid>', methods=['GET'])
+@replica_read
+@conditional("people")
 def get_specific_character(uid):
 
-    character = People.query.get(uid)
-
-    return jsonify(character.serialize()), 200
+    return detail_response(People, uid, "Personaje no encontrado")
 
 #3 - [GET] /planets Listar los registros de planets en la base de datos
-@app.route('/planets', methods=['GET'])
+@api.route('/planets', methods=['GET'])
+@replica_read
+@conditional("planets")
 def get_planets():
 
-    planets = Planets.query.all()
-    planets = list(map(lambda item: item.serialize(), planets))
-    print(planets)
-
-    return jsonify(planets), 200
+    return paginated_response(Planets)
 
 #4 - [GET] /planets/<int:planet_id> Listar la información de un solo planet
-@app.route('/planets/<int:uid>', methods=['GET'])
+@api.route('/planets/<int:uid>', methods=['GET'])
+@replica_read
+@conditional("planets")
 def get_specific_planet(uid):
 
-    planet = Planets.query.get(uid)
+    return detail_response(Planets, uid, "Planeta no encontrado")
+
+#4.b - [GET] /vehicles Listar los registros de vehicles en la base de datos
+@api.route('/vehicles', methods=['GET'])
+@replica_read
+@conditional("vehicles")
+def get_vehicles():
 
-    return jsonify(planet.serialize()), 200
+    return paginated_response(Vehicles)
+
+#4.c - [GET] /vehicles/<int:uid> Listar la información de un solo vehicle
+@api.route('/vehicles/<int:uid>', methods=['GET'])
+@replica_read
+@conditional("vehicles")
+def get_specific_vehicle(uid):
+
+    return detail_response(Vehicles, uid, "Vehículo no encontrado")
 
 #5 - [GET] /users Listar todos los usuarios del blog
-@app.route('/user', methods=['GET'])
+@api.route('/user', methods=['GET'])
+@replica_read
 def handle_hello():
 
-    users = User.query.all()
-    users = list(map(lambda item: item.serialize(), users))
-    print(users)
-
-    return jsonify(users), 200
+    return paginated_response(User)
 
 #6 - [GET] /users/favorites Listar todos los favoritos que pertenecen al usuario actual.
 
 #OBTENER TODOS LOS FAVORITOS
-@app.route('/favorites', methods=['POST'])
+@api.route('/favorites', methods=['POST'])
+@replica_read
 def list_favorites():
     body = request.get_json()
     user_id = body["user_id"]
@@ -129,90 +313,55 @@ def list_favorites():
     if not user:
         raise APIException("Usuario no encontrado", 404)
 
-    # AGREGAR LOS PERSONAJES FAVORITOS
-    user_favorites_people = FavoritePeople.query.filter_by(user_id=user.id).all()
-    user_favorites_people = list(map(lambda item:item.serialize(), user_favorites_people))
-
-    # AGREGAR LOS VEHICULOS FAVORITOS
+    #CADA FAVORITO SOLO CON SUS IDS; ?expand= AGREGA LAS ENTIDADES UNA VEZ EN "included".
+    payload = FavoritesPayload(request.args)
 
-    user_favorites_vehicles = FavoriteVehicles.query.filter_by(user_id=user.id).all()
-    user_favorites_vehicles = list(map(lambda item:item.serialize(), user_favorites_vehicles))
+    # PERSONAJES, VEHICULOS Y PLANETAS FAVORITOS: UNA CONSULTA POR TABLA
+    for model, column in FAVORITE_LISTS:
+        for favorite in db.session.execute(favorites_query(model, column, user.id)).mappings():
+            payload.add(dict(favorite))
 
+    payload.load(db.session)
 
-    # AGREGAR LOS PLANETAS FAVORITOS
-
-    user_favorites_planets = FavoritePlanets.query.filter_by(user_id=user.id).all()
-    user_favorites_planets = list(map(lambda item:item.serialize(), user_favorites_planets))
-
-    #UNA OPCION PARA SUMAR FAVORITOS CON .APPEND()
-    # user_favorites = user_favorites_people.append(user_favorites_vehicles)
-    # user_favorites = user_favorites.append(user_favorites_planets)
-    
-    #OPCION RECOMENDADA PARA SUMAR LOS FAVORITOS  
-    user_favorites = user_favorites_people + user_favorites_vehicles + user_favorites_planets
-    
-    
-    return jsonify(user_favorites), 200 
+    return jsonify(payload.body()), 200 
 
 #7 - [POST] /favorite/planet/<int:planet_id> Añade un nuevo planet favorito al usuario actual con el planet id = planet_id
-# @app.route('/aplanets/<int:planet_id>', methods=['POST'])
-@app.route('/favorite/planet/<int:planet_id>', methods=['POST'])
+# @api.route('/aplanets/<int:planet_id>', methods=['POST'])
+@api.route('/favorite/planet/<int:planet_id>', methods=['POST'])
 def add_favorite_planet(planet_id):
-    body = request.get_json()
-    user_id = body["user_id"]
+    user_id = read_id(request.get_json(silent=True), "user_id")
+    payload = FavoritesPayload(request.args)
 
-    planet = Planets.query.get(planet_id) #Se filtra el planeta actual.
+    #UN SOLO INSERT: LA BASE DE DATOS VALIDA EL PLANETA, EL USUARIO Y LOS DUPLICADOS (VER favorites.py).
+    favorite_id = add_favorite(FavoritePlanets, "planet_uid", user_id, planet_id, Planets, {
+        "parent": "Planeta no encontrado",
+        "user": "Usuario no encontrado",
+        "duplicate": "El usuario ya ha agregado este planeta como favorito",
+    })
+    payload.add(FavoritePlanets(id=favorite_id, user_id=user_id, planet_uid=planet_id).serialize())
+    payload.load(db.session)
 
-    if not planet:
-        raise APIException("Planeta no encontrado", 404)
-
-    user = User.query.get(user_id) # se filtra el usuario al que se le desea agregar el planeta.
-
-    if not user:
-        raise APIException("Usuario no encontrado", 404)
-
-    #Básicamente, estamos buscando si hay una coincidencia en la tabla FavoritePlanets que tenga el mismo user_id y planet_uid.
-    fav_exist = FavoritePlanets.query.filter_by(user_id=user.id, planet_uid=planet.uid).first() is not None
-
-    if fav_exist:
-        raise APIException("El usuario ya ha agregado este planeta como favorito", 404)
-
-    favorite_planet = FavoritePlanets(user_id=user.id, planet_uid=planet.uid)
-    db.session.add(favorite_planet)
-    db.session.commit()
-
-    return jsonify(favorite_planet.serialize()), 200
+    return jsonify(payload.single()), 200
 
 #8 - [POST] /favorite/people/<int:people_id> Añade una nueva people favorita al usuario actual con el people.id = people_id.
-@app.route('/favorite/people/<int:people_id>', methods=['POST'])
+@api.route('/favorite/people/<int:people_id>', methods=['POST'])
 def add_favorite_people(people_id):
-    body = request.get_json()
-    user_id = body["user_id"]
+    user_id = read_id(request.get_json(silent=True), "user_id")
+    payload = FavoritesPayload(request.args)
 
-    character = People.query.get(people_id)
+    favorite_id = add_favorite(FavoritePeople, "people_uid", user_id, people_id, People, {
+        "parent": "Personaje no encontrado",
+        "user": "Usuario no encontrado",
+        "duplicate": "El usuario ya ha agregado este personaje como favorito",
+    })
+    payload.add(FavoritePeople(id=favorite_id, user_id=user_id, people_uid=people_id).serialize())
+    payload.load(db.session)
 
-    if not character:
-        raise APIException("Planeta no encontrado", 404)
-
-    user = User.query.get(user_id)
-
-    if not user:
-        raise APIException("Usuario no encontrado", 404)
-
-    fav_exist = FavoritePeople.query.filter_by(user_id=user.id, people_uid=character.uid).first() is not None
-
-    if fav_exist:
-        raise APIException("El usuario ya ha agregado este planeta como favorito", 404)
-
-    favorite_people = FavoritePeople(user_id=user.id, people_uid=character.uid)
-    db.session.add(favorite_people)
-    db.session.commit()
-
-    return jsonify(favorite_people.serialize()), 200
+    return jsonify(payload.single()), 200
 
 #9 - [DELETE] /favorite/planet/<int:planet_id> Elimina un planet favorito con el id = planet_id
 
-@app.route('/favorite/planet/<int:planet_id>', methods=['DELETE'])
+@api.route('/favorite/planet/<int:planet_id>', methods=['DELETE'])
 def delete_favorite_planet(planet_id):
     body = request.get_json()
     user_id = body["user_id"]
@@ -233,13 +382,14 @@ def delete_favorite_planet(planet_id):
         raise APIException("Planeta no encontrado en los favoritos del usuario", 404)
 
     db.session.delete(favorite_planet)
+    decrement("planets", [planet.uid]) #CONTADOR DE POPULARIDAD, EN LA MISMA TRANSACCIÓN
     db.session.commit()
 
     return jsonify({"message": "Planeta eliminado de favoritos correctamente"}), 200
 
 #10 - [DELETE] /favorite/people/<int:people_id> Elimina una people favorita con el id = people_id.
 
-@app.route('/favorite/people/<int:people_id>', methods=['DELETE'])
+@api.route('/favorite/people/<int:people_id>', methods=['DELETE'])
 def delete_favorite_people(people_id):
     body = request.get_json()
     user_id = body["user_id"]
@@ -260,6 +410,7 @@ def delete_favorite_people(people_id):
         raise APIException("Personaje no encontrado en los favoritos del usuario", 404)
 
     db.session.delete(favorite_people)
+    decrement("people", [character.uid]) #CONTADOR DE POPULARIDAD, EN LA MISMA TRANSACCIÓN
     db.session.commit()
 
     return jsonify({"message": "Planeta eliminado de favoritos correctamente"}), 200
@@ -270,7 +421,7 @@ def delete_favorite_people(people_id):
 # 11.a - AGREGAR PLANETA:
 #Solo usurios registrados pueden crear nuevos planetas.
 
-@app.route('/add/planet', methods=['POST'])
+@api.route('/add/planet', methods=['POST'])
 @jwt_required()
 def add_planet():
     body = request.get_json() #tambien con .json()
@@ -301,6 +452,8 @@ def add_planet():
   
     new_planet = Planets(name=name, url=url, diameter=diameter, rotation_period=rotation_period, orbital_period=orbital_period, gravity=gravity, population=population, climate=climate)
     db.session.add(new_planet)
+    db.session.flush()
+    bump_version("planets", new_planet.uid) #CAMBIA EL ETAG DE /planets
     db.session.commit()
  
     return jsonify({"message":"Planeta creado correctamente user"}), 201
@@ -308,7 +461,7 @@ def add_planet():
 # 11.b - AGREGAR PEOPLE:
 #Solo usurios registrados pueden crear nuevos personajes.
 
-@app.route('/add/people', methods=['POST'])
+@api.route('/add/people', methods=['POST'])
 @jwt_required()
 def add_people():
     body = request.get_json() #tambien con .json()
@@ -338,17 +491,19 @@ def add_people():
     if "name" not in body:
         raise APIException({"message":"necesitas especificar el name"}, status_code=400)
   
-    new_people = Planets(name=name, url=url, height=height, mass=mass, hair_color=hair_color, skin_color=skin_color, eyes_color=eyes_color, birth_year=birth_year, gender=gender)
-    db.session.add(new_planet)
+    new_people = People(name=name, url=url, height=height, mass=mass, hair_color=hair_color, skin_color=skin_color, eyes_color=eyes_color, birth_year=birth_year, gender=gender)
+    db.session.add(new_people)
+    db.session.flush()
+    bump_version("people", new_people.uid)
     db.session.commit()
  
-    return jsonify({"message":"Planeta creado correctamente user"}), 201
+    return jsonify({"message":"Personaje creado correctamente user"}), 201
 
 # 11.c - AGREGAR VEHICULO:
 #Solo usurios registrados pueden crear nuevos vehículos.
 
 
-@app.route('/add/vehiculo', methods=['POST'])
+@api.route('/add/vehiculo', methods=['POST'])
 @jwt_required()
 def add_vehiculo():
     body = request.get_json() #tambien con .json()
@@ -377,14 +532,16 @@ def add_vehiculo():
     if "name" not in body:
         raise APIException({"message":"necesitas especificar el name"}, status_code=400)
   
-    new_people = Planets(name=name, url=url, model=model, vehicle_class=vehicle_class, manufacturer=manufacturer, cost_in_credits=cost_in_credits, passengers=passengers, cargo_capacity=cargo_capacity)
-    db.session.add(new_planet)
+    new_vehicle = Vehicles(name=name, url=url, model=model, vehicle_class=vehicle_class, manufacturer=manufacturer, cost_in_credits=cost_in_credits, passengers=passengers, cargo_capacity=cargo_capacity)
+    db.session.add(new_vehicle)
+    db.session.flush()
+    bump_version("vehicles", new_vehicle.uid)
     db.session.commit()
  
-    return jsonify({"message":"Planeta creado correctamente user"}), 201
+    return jsonify({"message":"Vehículo creado correctamente user"}), 201
 
 #11-d - EDITAR PLANET
-@app.route('/update/planet', methods=['PUT'])
+@api.route('/update/planet', methods=['PUT'])
 @jwt_required()
 def update_planet():
     body = request.get_json() #tambien con .json()
@@ -425,13 +582,14 @@ def update_planet():
     planet.population = population
     planet.climate = climate
 
+    bump_version("planets", uid)
     db.session.commit()
   
     return jsonify({"message":"Planeta editado correctamente user"}), 201
 
 
 #11.e - actualizar un personaje
-@app.route('/update/people', methods=['PUT'])
+@api.route('/update/people', methods=['PUT'])
 @jwt_required()
 def update_people():
     
@@ -470,10 +628,12 @@ def update_people():
     people.height = height
     people.mass = mass
     people.hair_color = hair_color
+    people.skin_color = skin_color
     people.eyes_color = eyes_color
     people.birth_year = birth_year
     people.gender = gender
  
+    bump_version("people", uid)
     db.session.commit()
 
     return jsonify({"message":"Personaje editado correctamente user"}), 201
@@ -482,7 +642,7 @@ def update_people():
 #Solo usurios registrados pueden crear nuevos vehículos.
 
 
-@app.route('/update/vehiculo', methods=['POST'])
+@api.route('/update/vehiculo', methods=['POST'])
 @jwt_required()
 def update_vehiculo():
     body = request.get_json() #tambien con .json()
@@ -493,6 +653,7 @@ def update_vehiculo():
     if token:
         raise APIException({"message":"Inicia sesión para crear nuevos vehículos"})
 
+    uid = body["uid"]
     name = body["name"]
     url = body["url"]
     model = body["model"]
@@ -522,12 +683,13 @@ def update_vehiculo():
     vehicle.cost_in_credits = cost_in_credits
     vehicle.passengers = passengers
     vehicle.cargo_capacity = cargo_capacity
+    bump_version("vehicles", uid)
     db.session.commit()
 
     return jsonify({"message":"Vehículo editado correctamente user"}), 201
 
 #11-g - ELIMINAR UN PLANETA
-@app.route('/delete/planet', methods=['DELETE'])
+@api.route('/delete/planet', methods=['DELETE'])
 @jwt_required()
 def delete_specific_planet():
 
@@ -548,13 +710,14 @@ def delete_specific_planet():
     planet = Planets.query.get(uid)
 
     db.session.delete(planet)
+    bump_version("planets", uid)
     db.session.commit()
 
     return jsonify({"message":"Planeta eliminado exitosamente"}), 200
 
 
 #11-h - ELIMINAR UN PERSONAJE
-@app.route('/delete/people', methods=['DELETE'])
+@api.route('/delete/people', methods=['DELETE'])
 @jwt_required()
 def delete_specific_people():
 
@@ -575,13 +738,14 @@ def delete_specific_people():
     people = People.query.get(uid)
 
     db.session.delete(people)
+    bump_version("people", uid)
     db.session.commit()
 
     return jsonify({"message":"Personaje eliminado exitosamente"}), 200
 
 
 #11-i - ELIMINAR UN VEHICULO
-@app.route('/delete/vehicle', methods=['DELETE'])
+@api.route('/delete/vehicle', methods=['DELETE'])
 @jwt_required()
 def delete_specific_vehicle():
 
@@ -602,14 +766,40 @@ def delete_specific_vehicle():
     vehicles = Vehicles.query.get(uid)
 
     db.session.delete(vehicles)
+    bump_version("vehicles", uid)
     db.session.commit()
 
     return jsonify({"message":"Vehículo eliminado exitosamente"}), 200
 
+#11-j - IMPORTACIÓN MASIVA DE PLANETAS, PERSONAJES O VEHÍCULOS (NDJSON O ARREGLO JSON)
+IMPORT_MODELS = {"people": People, "planets": Planets, "vehicles": Vehicles}
+
+@api.route('/import/<kind>', methods=['POST'])
+@jwt_required()
+def bulk_import(kind):
+
+    token = verificacionToken(get_jwt())
+    if token:
+        raise APIException({"message":"Inicia sesión para importar registros"})
+
+    model = IMPORT_MODELS.get(kind)
+    if model is None:
+        raise APIException({"message":"tipo desconocido, usa people, planets o vehicles"}, status_code=404)
+
+    batch_size = request.args.get("batch_size", current_app.config['IMPORT_BATCH_SIZE'], type=int)
+    if batch_size < 1:
+        raise APIException({"message":"batch_size debe ser mayor que cero"}, status_code=400)
+
+    #EL BODY SE LEE COMO STREAM, NUNCA SE CARGA COMPLETO EN MEMORIA.
+    importer = BulkImporter(model, batch_size=batch_size, commit_rows=current_app.config['IMPORT_COMMIT_ROWS'])
+    report = importer.run(iter_records(request.stream, request.content_type))
+
+    return jsonify(report), 200
+
 #OTRAS SOLICITUDES
 
 #1 - Registrar un usuario
-@app.route('/register', methods=['POST'])
+@api.route('/register', methods=['POST'])
 def register_user():
     body = request.get_json() #tambien con .json()
   
@@ -632,25 +822,27 @@ def register_user():
         raise APIException({"message":"necesitas especificar el password"}, status_code=400)
   
     #ENCRIPTAMOS LA CONTRASEÑA DEL USUARIO ANTES DE ALMACENARLA EN BASE DE DATOS.
-    password_escrypted = bcrypt.generate_password_hash(password, 10).decode('utf-8')
+    password_escrypted = password_hasher.hash(password)
 
     new_user = User(email=email, first_name=first_name, last_name=last_name, password=password_escrypted, is_active=is_active, subscription_date=subscription_date,birth_date=birth_date, country=country)
     db.session.add(new_user)
     db.session.commit()
+
+    #PUEDE HABER UN "NO ENCONTRADO" GUARDADO PARA ESTE ID.
+    entity_cache.invalidate("user", [new_user.id])
  
     return jsonify({"message":"Correct created user"}), 201
 
 #2 - Obtener un usuario específico usando GET
-@app.route('/user/<int:id>', methods=['GET'])
+@api.route('/user/<int:id>', methods=['GET'])
+@replica_read
 def get_specific_user_using_GET(id):
 
-    user = User.query.get(id)
-
-    return jsonify(user.serialize()), 200
+    return detail_response(User, id, "Usuario no encontrado")
 
 
 #3 - Obtener un usuario específico usando POST
-@app.route('/user', methods=['POST'])
+@api.route('/user', methods=['POST'])
 def get_specific_user_using_POST():
 
     body = request.get_json()
@@ -663,7 +855,7 @@ def get_specific_user_using_POST():
 
 
 #4 - Elimina un usuario
-@app.route('/user/delete', methods=['DELETE'])
+@api.route('/user/delete', methods=['DELETE'])
 def delete_specific_user():
 
     body = request.get_json()
@@ -674,12 +866,13 @@ def delete_specific_user():
 
     db.session.delete(user)
     db.session.commit()
+    entity_cache.invalidate("user", [id])
 
     return jsonify({"message":"usuario borrado"}), 200
 
 
 #5 - actualizar un usuario
-@app.route('/user/update', methods=['PUT'])
+@api.route('/user/update', methods=['PUT'])
 def edit_user():
     body = request.get_json()
     
@@ -714,6 +907,7 @@ def edit_user():
     user.country = country
 
     db.session.commit()
+    entity_cache.invalidate("user", [id])
     # user = User(email=email, name=name, password=password, is_active=is_active)
     # db.session.commit()
 
@@ -721,67 +915,42 @@ def edit_user():
 
 
 #6 - agregar favoritos usando POST.
-@app.route('/add-favorite/people', methods=['POST'])
+@api.route('/add-favorite/people', methods=['POST'])
 def add_favorite_people_any_user():
-    body = request.get_json()
-    user_id = body["user_id"]
-    people_uid = body["people_uid"]
-
-    character = People.query.get(people_uid)
-
-    if not character:
-        raise APIException("Personaje no encontrado", 404)
-    
-    user = User.query.get(user_id)
-
-    if not user:
-        raise APIException("Usuario no encontrado", 404)
-
-
-    #SI NO EXISTE EL FAVORITO aregarlo, SI NO 
-
-    fav_exist = FavoritePeople.query.filter_by(user_id=user.id, people_uid=character.uid).first() is not None
-
-    if fav_exist:
-        raise APIException("El usuario ya lo tienes agregado a favoritos", 404)
-
-    favorite_people = FavoritePeople(user_id = user.id, people_uid = character.uid)
-    db.session.add(favorite_people)
-    db.session.commit()
-
-    return jsonify(favorite_people.serialize()), 200
-
+    body = request.get_json(silent=True)
+    user_id = read_id(body, "user_id")
+    people_uid = read_id(body, "people_uid")
+    payload = FavoritesPayload(request.args)
+
+    #SI NO EXISTE EL FAVORITO SE AGREGA; SI YA EXISTE EL INSERT NO HACE NADA Y SE RESPONDE 404.
+    favorite_id = add_favorite(FavoritePeople, "people_uid", user_id, people_uid, People, {
+        "parent": "Personaje no encontrado",
+        "user": "Usuario no encontrado",
+        "duplicate": "El usuario ya lo tienes agregado a favoritos",
+    })
+    payload.add(FavoritePeople(id=favorite_id, user_id=user_id, people_uid=people_uid).serialize())
+    payload.load(db.session)
+
+    return jsonify(payload.single()), 200
 
 #7 - [POST] /favorite/vehicle/<int:vehicle_id> Añade un nuevo vehículo al usuario actual con el vehicle.id = vehicle_id.
-@app.route('/favorite/vehicle/<int:vehicle_id>', methods=['POST'])
+@api.route('/favorite/vehicle/<int:vehicle_id>', methods=['POST'])
 def add_favorite_vehicle(vehicle_id):
-    body = request.get_json()
-    user_id = body["user_id"]
+    user_id = read_id(request.get_json(silent=True), "user_id")
+    payload = FavoritesPayload(request.args)
 
-    vehicle = Vehicles.query.get(vehicle_id)
-
-    if not vehicle:
-        raise APIException("Vehículo no encontrado", 404)
-
-    user = User.query.get(user_id)
-
-    if not user:
-        raise APIException("Usuario no encontrado", 404)
-
-    fav_exist = FavoriteVehicles.query.filter_by(user_id=user.id, vehicle_id=vehicle.uid).first() is not None
-
-    if fav_exist:
-        raise APIException("El usuario ya ha agregado este vehículo como favorito", 404)
-
-    favorite_vehicle = FavoriteVehicles(user_id=user.id, vehicle_id=vehicle.uid)
-    db.session.add(favorite_vehicle)
-    db.session.commit()
-
-    return jsonify(favorite_vehicle.serialize()), 200
+    favorite_id = add_favorite(FavoriteVehicles, "vehicle_uid", user_id, vehicle_id, Vehicles, {
+        "parent": "Vehículo no encontrado",
+        "user": "Usuario no encontrado",
+        "duplicate": "El usuario ya ha agregado este vehículo como favorito",
+    })
+    payload.add(FavoriteVehicles(id=favorite_id, user_id=user_id, vehicle_uid=vehicle_id).serialize())
+    payload.load(db.session)
 
+    return jsonify(payload.single()), 200
 
 #8 - [DELETE] /favorite/vehicle/<int:vehicle_id> Elimina un vehículo favorito con el id = planet_id
-@app.route('/favorite/vehicle/<int:vehicle_id>', methods=['DELETE'])
+@api.route('/favorite/vehicle/<int:vehicle_id>', methods=['DELETE'])
 def delete_favorite_vehicle(vehicle_id):
     body = request.get_json()
     user_id = body["user_id"]
@@ -796,19 +965,69 @@ def delete_favorite_vehicle(vehicle_id):
     if not user:
         raise APIException("Usuario no encontrado", 404)
 
-    favorite_vehicle = FavoriteVehicles.query.filter_by(user_id=user.id, vehicle_id=vehicle.uid).first()
+    favorite_vehicle = FavoriteVehicles.query.filter_by(user_id=user.id, vehicle_uid=vehicle.uid).first()
 
     if not favorite_vehicle:
         raise APIException("Vehículo no encontrado en los favoritos del usuario", 404)
 
     db.session.delete(favorite_vehicle)
+    decrement("vehicles", [vehicle.uid]) #CONTADOR DE POPULARIDAD, EN LA MISMA TRANSACCIÓN
     db.session.commit()
 
     return jsonify({"message": "Planeta eliminado de favoritos correctamente"}), 200
 
 
+#8.b - [POST] /favorites/batch Varias altas y bajas de favoritos en una sola transacción.
+#Body: {"user_id": 1, "operations": [{"op": "add", "kind": "planet", "uid": 3}, {"op": "remove", "kind": "people", "uid": 5}]}
+@api.route('/favorites/batch', methods=['POST'])
+def batch_favorites():
+    body = request.get_json()
+
+    if body is None or "user_id" not in body:
+        raise APIException({"message":"necesitas especificar el user_id"}, status_code=400)
+
+    results = apply_batch(body["user_id"], body.get("operations"), current_app.config['FAVORITES_BATCH_MAX'])
+
+    return jsonify({"results": results}), 200
+
+
+#8.c - [GET] /favorites/top/<tipo>?limit=10 Los más favoritos, desde los contadores de favorite_count.
+@api.route('/favorites/top/<any(people, planets, vehicles):kind>', methods=['GET'])
+@replica_read
+def favorites_leaderboard(kind):
+    limit, _ = read_page_args(request.args, 10, current_app.config['PAGE_SIZE_MAX'])
+
+    return jsonify({"results": top(kind, limit)}), 200
+
+#Recalcula los contadores desde las tablas de favoritos: "flask reconcile-favorites" (una vez)
+#o "flask reconcile-favorites --every 3600" (en un proceso aparte, cada hora).
+@api.cli.command("reconcile-favorites")
+@click.option("--every", type=float, default=None, help="segundos entre ejecuciones; sin esto corre una sola vez")
+def reconcile_favorites_command(every):
+    while True:
+        click.echo("contadores corregidos: %d" % reconcile())
+        metrics.flush() #este proceso no atiende requests, se escriben sus métricas aquí
+        if every is None:
+            break
+        db.session.remove()
+        sleep(every)
+
+#Borra de TokenBlokedList los tokens que ya expiraron: "flask purge-revoked-tokens" (una vez)
+#o "flask purge-revoked-tokens --every 3600" (en un proceso aparte, cada hora).
+@api.cli.command("purge-revoked-tokens")
+@click.option("--every", type=float, default=None, help="segundos entre ejecuciones; sin esto corre una sola vez")
+def purge_revoked_tokens_command(every):
+    while True:
+        click.echo("tokens expirados borrados: %d" % purge_expired())
+        metrics.flush() #este proceso no atiende requests, se escriben sus métricas aquí
+        if every is None:
+            break
+        db.session.remove()
+        sleep(every)
+
+
 #9 - ENDPOINT LOGIN.
-@app.route('/login', methods=["POST"])  # Corrected the methods parameter
+@api.route('/login', methods=["POST"])  # Corrected the methods parameter
 def login():
     email = request.get_json()["email"]
     password = request.get_json()["password"]
@@ -822,9 +1041,14 @@ def login():
     # if password != user.password:
     #     return jsonify({"message": "usuario o contraseña incorrecta"})
 
-    if not bcrypt.check_password_hash(user.password, password): #se compara la contrese encriptada, contra la contraseña encrytada que llega desde el usuario.
+    if not password_hasher.check(user.password, password): #se compara la contrese encriptada, contra la contraseña encrytada que llega desde el usuario.
         return jsonify({"message": "usuario o contraseña incorrecta"})
 
+    #SI CAMBIÓ EL COSTO DE BCRYPT, SE VUELVE A ENCRIPTAR LA CONTRASEÑA AHORA QUE LA TENEMOS EN TEXTO PLANO.
+    if password_hasher.needs_rehash(user.password):
+        user.password = password_hasher.hash(password)
+        db.session.commit()
+
     # Validación del email.    
     if email != user.email:
         return jsonify({"message": "usuario o contraseña incorrecta"})
@@ -835,7 +1059,7 @@ def login():
 #10 - ENDPOINT PROTEGIDO
 # Protect a route with jwt_required, which will kick out requests
 # without a valid JWT present.
-@app.route("/protected", methods=["GET"])
+@api.route("/protected", methods=["GET"])
 @jwt_required()
 def protected():
     # Access the identity of the current user with get_jwt_identity
@@ -848,41 +1072,42 @@ def protected():
 
     #VALIDAR si el token existe como bloqueado, con una función previamente definiada.
     token = verificacionToken(get_jwt())
-    print(token)
 
     if token:
         raise APIException({"message":"Inicia sesión para ir a esta rura protegida"}, status_code=404)    
 
-    print("El usuario actual es: ", user.first_name)
-    # print("El usuario actual es: ", current_user)
     return jsonify({"message":"Estas en una ruta protegida", "first_name":user.first_name}), 200
 
 #11 - LOGOUT DEL USUARIO.
-@app.route("/logout", methods=["POST"])
+@api.route("/logout", methods=["POST"])
 @jwt_required()
 def logout():
     # Access the identity of the current user with get_jwt_identity
     jti = get_jwt()["jti"] #PARA OBTENER Y ALMACENAR EL IDENTIFICADOR DEL TOKEN DEL USUARIO AL MOMENTO QUE HACE LOGOUT, ESTO REDUCE EL ESPACIO REQUERIDO PARA ALMACENAMIENTO DE LOS MISMOS
-    now = datetime.now(timezone.utc)
+    now = datetime.now(timezone.utc).replace(tzinfo=None) #UTC SIN ZONA, COMO expires_at (LO USA LA SINCRONIZACIÓN DE revocation.py)
     
     #identificando al usuario:
-    current_user = get_jwt_identity()
-    user = User.query.get(current_user)
+    current_user = get_jwt_identity() #ES EL id DEL USUARIO, NO HACE FALTA CONSULTARLO.
 
-    token_bloked = TokenBlokedList(token=jti, create_at=now, email=user.email)
+    #SE GUARDA HASTA CUÁNDO VALE EL TOKEN: DESPUÉS DE ESO LA FILA SE PUEDE BORRAR (flask purge-revoked-tokens).
+    exp = get_jwt().get("exp")
+    token_bloked = TokenBlokedList(token=jti, create_at=now, expires_at=expiry_datetime(exp), user_id=current_user)
     
     #FORMA ALTERNA DE ASGINAR VALORES A PROPIEDADES DE LA CLASE TokenBlokedList
     # token_bloked = TokenBlokedList()
     # token_bloked.token = jti
     # token_bloked.create_at = now
-    # token_bloked.email=user.email
+    # token_bloked.user_id=current_user
 
     #Guardamos la información en base de datos.
     db.session.add(token_bloked)
     db.session.commit()
+
+    #EL WORKER QUE ATIENDE EL LOGOUT LO VE BLOQUEADO DE INMEDIATO; LOS DEMÁS EN LA SIGUIENTE SINCRONIZACIÓN.
+    revocation_cache.add(jti, exp)
     return jsonify({"message":"logout successfully"}), 200
 
 
 if __name__ == '__main__':
     PORT = int(os.environ.get('PORT', 3000))
-    app.run(host='0.0.0.0', port=PORT, debug=False)
+    create_app().run(host='0.0.0.0', port=PORT, debug=False)
@@ -0,0 +1,221 @@
+"""Entrada ASGI opcional: las lecturas del catálogo y de favoritos con SQLAlchemy async.
+
+    pipenv install --categories "packages asgi"
+    uvicorn asgi:app --app-dir src --port 3000
+
+Estas rutas se atienden en el event loop con sesiones async (AsyncSession sobre
+los mismos modelos de models.py), así un solo proceso puede tener miles de
+clientes lentos esperando sin ocupar un worker por cada uno:
+
+- GET /people, /planets, /vehicles (?limit=&after=&fields= y los filtros)
+- GET /people/<uid>, /planets/<uid>, /vehicles/<uid>
+- POST /favorites
+- GET /favorites/top/<tipo>
+
+Responden lo mismo que la app de Flask (mismos ETag, 304 y errores). Todo lo
+demás (escrituras, login, /<tipo>/all, /search, /metrics, admin) pasa a la app
+de Flask, que corre en un pool de ASGI_WSGI_THREADS hilos.
+
+ASYNC_DATABASE_URL cambia la base de las lecturas async (por ejemplo una
+réplica); por defecto es DATABASE_URL con el driver async (ver engine.py). La
+cookie de consistencia de replicas.py no aplica aquí.
+"""
+import os
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag, unquote_etag
+
+from app import create_app
+from compress import response_compressor
+from engine import async_engine_options, async_url, configure_engine
+from metrics import metrics
+from favorites import FAVORITE_LISTS, FavoritesPayload, favorites_query
+from models import User, People, Planets, Vehicles
+from popularity import top_query, top_rows
+from serializers import serializer_for
+from utils import APIException, keyset_query, keyset_rows, read_page_args
+from versions import args_hash, row_version_query, version_query
+
+#OPCIONALES (CATEGORÍA [asgi] DEL Pipfile): LA APP WSGI NO LAS NECESITA.
+INSTALL_HINT = 'instala las dependencias de asgi.py con: pipenv install --categories "packages asgi"'
+try:
+    from a2wsgi import WSGIMiddleware
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Mount, Route
+except ImportError as error:
+    raise ImportError("%s (%s)" % (error, INSTALL_HINT)) from error
+
+CATALOG = {"people": People, "planets": Planets, "vehicles": Vehicles}
+NOT_FOUND = {"people": "Personaje no encontrado", "planets": "Planeta no encontrado", "vehicles": "Vehículo no encontrado"}
+
+flask_app = create_app()
+config = flask_app.config
+database_url = os.getenv("ASYNC_DATABASE_URL") or config["SQLALCHEMY_DATABASE_URI"]
+try:
+    #create_async_engine importa el driver async (asyncpg, aiomysql o aiosqlite).
+    engine = create_async_engine(async_url(database_url), **async_engine_options(database_url, config["DATABASE_PROFILE"]))
+except ImportError as error:
+    raise ImportError("%s (%s)" % (error, INSTALL_HINT)) from error
+configure_engine(engine.sync_engine, "async", config["DATABASE_PROFILE"])
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+class FlaskJSONResponse(JSONResponse):
+    #Los mismos bytes que jsonify() (llaves ordenadas, sin espacios y "\n" al final): si no, el mismo ETag
+    #fuerte tendría dos cuerpos distintos según qué app respondió.
+    def render(self, content):
+        provider = flask_app.json
+        if (provider.compact is None and flask_app.debug) or provider.compact is False:
+            text = provider.dumps(content, indent=2)
+        else:
+            text = provider.dumps(content, separators=(",", ":"))
+        return (text + "\n").encode("utf-8")
+
+
+#RESPUESTAS CONDICIONALES (LOS MISMOS ETAG QUE versions.py)
+async def _version(session, table_name, uid=0):
+    query = row_version_query(table_name, uid) if uid else version_query(table_name)
+    return (await session.execute(query)).scalar() or 0
+
+def _etag(request, *parts):
+    return "-".join(str(part) for part in parts) + "-" + args_hash(request.query_params.multi_items())
+
+def _cacheable(response, etag):
+    response.headers["ETag"] = quote_etag(etag)
+    response.headers["Cache-Control"] = "public, max-age=%d, must-revalidate" % config["CATALOG_MAX_AGE"]
+    return response
+
+def _not_modified(request, etag):
+    #La variante que tiene el cliente (también "...-gzip", ver compress.py) o None.
+    return response_compressor.matching_etag(parse_etags(request.headers.get("if-none-match")), etag)
+
+
+#COMPRESIÓN: LO MISMO QUE response_compressor HACE EN FLASK DESPUÉS DE CADA REQUEST.
+def _compress(request, response):
+    if response.status_code == 304 or response.media_type in response_compressor.mimetypes:
+        response.headers.add_vary_header("Accept-Encoding")
+    if response.status_code != 200:
+        return response
+    accept = parse_accept_header(request.headers.get("accept-encoding"))
+    encoding = response_compressor.choose(accept, response.media_type, len(response.body))
+    if encoding is None:
+        return response
+
+    etag = unquote_etag(response.headers.get("etag"))[0]
+    key = (request.url.path + "?" + request.url.query, etag) if etag else None
+    response.body = response_compressor.compress(response.body, encoding, key)
+    response.headers["Content-Length"] = str(len(response.body))
+    response.headers["Content-Encoding"] = encoding
+    if key is not None:
+        response.headers["ETag"] = quote_etag("%s-%s" % (etag, encoding))
+    return response
+
+
+#CATÁLOGO
+async def list_catalog(request, kind):
+    serializer = serializer_for(CATALOG[kind])
+    fields = serializer.parse_fields(request.query_params.get("fields"))
+    limit, after = read_page_args(request.query_params, config["PAGE_SIZE"], config["PAGE_SIZE_MAX"])
+    query = serializer.filter(select(*serializer.columns(fields)), request.query_params)
+
+    async with Session() as session:
+        etag = _etag(request, kind, await _version(session, kind))
+        matched = _not_modified(request, etag)
+        if matched:
+            return _cacheable(Response(status_code=304), matched)
+        rows = (await session.execute(keyset_query(query, serializer.key_column, limit, after))).all()
+
+    rows, next_cursor = keyset_rows(rows, serializer.key_column, limit)
+    body = {"results": [serializer.from_row(row, fields) for row in rows], "next": next_cursor}
+    return _cacheable(FlaskJSONResponse(body), etag)
+
+async def get_entity(request, kind):
+    uid = request.path_params["uid"]
+    serializer = serializer_for(CATALOG[kind])
+    fields = serializer.parse_fields(request.query_params.get("fields"))
+
+    async with Session() as session:
+        etag = _etag(request, kind, uid, await _version(session, kind, uid))
+        matched = _not_modified(request, etag)
+        if matched:
+            return _cacheable(Response(status_code=304), matched)
+        row = (await session.execute(select(*serializer.columns(fields)).where(serializer.key_column == uid))).first()
+
+    if row is None:
+        raise APIException(NOT_FOUND[kind], 404)
+    return _cacheable(FlaskJSONResponse(serializer.from_row(row, fields)), etag)
+
+
+#FAVORITOS
+async def list_favorites(request):
+    try:
+        body = await request.json()
+        user_id = body["user_id"]
+    except (ValueError, TypeError, KeyError):
+        raise APIException({"message":"Necesario user_id"}, status_code=400)
+    if not user_id:
+        raise APIException({"message":"Necesario user_id"}, status_code=404)
+
+    async with Session() as session:
+        if (await session.execute(select(User.id).where(User.id == user_id))).first() is None:
+            raise APIException("Usuario no encontrado", 404)
+
+        #LAS MISMAS CONSULTAS QUE LA APP DE FLASK (VER FavoritesPayload EN favorites.py).
+        payload = FavoritesPayload(request.query_params)
+        for model, column in FAVORITE_LISTS:
+            for favorite in (await session.execute(favorites_query(model, column, user_id))).mappings():
+                payload.add(dict(favorite))
+        for kind, query in payload.queries():
+            payload.include(kind, await session.execute(query))
+
+    return FlaskJSONResponse(payload.body())
+
+async def favorites_leaderboard(request, kind):
+    limit, _ = read_page_args(request.query_params, 10, config["PAGE_SIZE_MAX"])
+    async with Session() as session:
+        rows = (await session.execute(top_query(kind, limit))).all()
+    return FlaskJSONResponse({"results": top_rows(rows)})
+
+
+async def handle_api_exception(request, error):
+    return FlaskJSONResponse(error.to_dict(), status_code=error.status_code)
+
+
+#Cada ruta registra las mismas métricas que los requests de Flask, con la regla escrita como en Flask.
+def route(path, rule, endpoint, method="GET", **params):
+    async def wrapper(request):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = _compress(request, await endpoint(request, **params))
+            status = response.status_code
+            return response
+        except APIException as error:
+            status = error.status_code
+            raise
+        finally:
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - start, endpoint=rule, method=request.method)
+            metrics.inc("http_requests_total", endpoint=rule, method=request.method, status=status)
+            metrics.flush_if_due()
+    return Route(path, wrapper, methods=[method])
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+routes = []
+for kind in CATALOG:
+    routes.append(route("/" + kind, "/" + kind, list_catalog, kind=kind))
+    routes.append(route("/%s/{uid:int}" % kind, "/%s/<int:uid>" % kind, get_entity, kind=kind))
+    routes.append(route("/favorites/top/" + kind, "/favorites/top/<any(people, planets, vehicles):kind>", favorites_leaderboard, kind=kind))
+routes.append(route("/favorites", "/favorites", list_favorites, "POST"))
+routes.append(Mount("/", app=WSGIMiddleware(flask_app, workers=int(os.getenv("ASGI_WSGI_THREADS", 10)))))
+
+app = Starlette(routes=routes, exception_handlers={APIException: handle_api_exception}, lifespan=lifespan)
@@ -0,0 +1,208 @@
+"""Cache de lectura (read-through) para los endpoints de detalle.
+
+Guarda el dict serializado de cada entidad bajo "<tabla>:<uid>". Los uid que
+no existen también se guardan (cache negativo, con un TTL más corto) para que
+buscar ids inexistentes sea igual de barato.
+
+Backends:
+- "memory": LRU con TTL dentro de cada worker (por defecto).
+- "sqlite": archivo local compartido por todos los workers de la máquina.
+- "none": sin cache.
+
+Las escrituras del catálogo invalidan al hacer commit (bump_versions registra
+los uid en la sesión) y las de usuarios llaman a invalidate() directamente.
+invalidate() solo llega a lo que ve este proceso: con "memory" borra la entrada
+de este worker y con "sqlite" la de todos los workers de la máquina.
+
+Por eso una entrada solo se usa si se puede validar:
+- Catálogo (people, planets, vehicles): el request trae la versión de la fila
+  (ETag, ver versions.py) y una entrada con otra versión se trata como vencida,
+  así un worker nunca sirve una fila que otro worker ya cambió.
+- Tablas sin versión (user): solo con un backend compartido ("sqlite"), donde
+  la invalidación llega a todos. Con "memory" se consultan siempre a la base.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from metrics import metrics
+
+MISSING = object()
+
+
+class MemoryBackend:
+    shared = False  # cada worker tiene el suyo
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # {llave: (expira, valor)}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] <= time.time():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        evicted = 0
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    shared = True  # todos los workers de la máquina
+
+    def __init__(self, path, maxsize=100000):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        #Una conexión por hilo y por proceso (las conexiones de sqlite3 no sobreviven a un fork).
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS entity_cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute("SELECT value, expires FROM entity_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return MISSING
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        connection = self._connection()
+        connection.execute("INSERT OR REPLACE INTO entity_cache (key, value, expires) VALUES (?, ?, ?)",
+                           (key, json.dumps(value), time.time() + ttl))
+        #Se recorta de vez en cuando: primero lo vencido, luego lo que vence antes.
+        self._writes += 1
+        if self._writes % 100 == 0:
+            connection.execute("DELETE FROM entity_cache WHERE expires <= ?", (time.time(),))
+            cursor = connection.execute(
+                "DELETE FROM entity_cache WHERE key IN (SELECT key FROM entity_cache ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,))
+            return max(cursor.rowcount, 0)
+        return 0
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM entity_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entity_cache")
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM entity_cache").fetchone()[0]
+
+
+class EntityCache:
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.ttl = 60.0
+        self.negative_ttl = 10.0
+
+    def init_app(self, app):
+        kind = app.config.get("ENTITY_CACHE_BACKEND", "memory")
+        size = int(app.config.get("ENTITY_CACHE_SIZE", 10000))
+        if kind == "none":
+            self.backend = None
+        elif kind == "sqlite":
+            path = app.config.get("ENTITY_CACHE_PATH") or os.path.join(tempfile.gettempdir(), "entity-cache.sqlite3")
+            self.backend = SQLiteBackend(path, size)
+        else:
+            self.backend = MemoryBackend(size)
+        self.ttl = float(app.config.get("ENTITY_CACHE_TTL", self.ttl))
+        self.negative_ttl = float(app.config.get("ENTITY_CACHE_NEGATIVE_TTL", self.negative_ttl))
+        app.extensions["entity_cache"] = self
+
+    def get_or_load(self, table_name, uid, load, version=None):
+        """Devuelve el dict de la entidad (o None si no existe), consultando la base solo si hace falta."""
+        if self.backend is None:
+            return load()
+        if version is None and not self.backend.shared:
+            #Sin versión no hay cómo saber si otro worker cambió la fila.
+            metrics.inc("entity_cache_requests_total", kind=table_name, result="bypass")
+            return load()
+
+        key = "%s:%s" % (table_name, uid)
+        entry = self.backend.get(key)
+        if entry is not MISSING:
+            cached_version, value = entry
+            if version is None or cached_version == version:
+                metrics.inc("entity_cache_requests_total", kind=table_name, result="hit" if value is not None else "negative_hit")
+                return value
+            result = "stale"
+        else:
+            result = "miss"
+        metrics.inc("entity_cache_requests_total", kind=table_name, result=result)
+
+        value = load()
+        evicted = self.backend.set(key, [version, value], self.ttl if value is not None else self.negative_ttl)
+        if evicted:
+            metrics.inc("entity_cache_evictions_total", evicted, kind=table_name)
+        return value
+
+    def invalidate(self, table_name, uids):
+        if self.backend is None:
+            return
+        for uid in uids:
+            self.backend.delete("%s:%s" % (table_name, uid))
+        metrics.inc("entity_cache_invalidations_total", len(uids), kind=table_name)
+
+    def invalidate_on_commit(self, session, table_name, uids):
+        #Se invalida DESPUÉS del commit: antes, otro request podría volver a guardar la fila vieja.
+        session.info.setdefault("entity_cache_invalidate", {}).setdefault(table_name, set()).update(uids)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+entity_cache = EntityCache()
+
+metrics.describe("entity_cache_requests_total", "counter", "Lecturas del cache de entidades por resultado (hit, negative_hit, miss, stale, bypass).")
+metrics.describe("entity_cache_evictions_total", "counter", "Entradas sacadas del cache de entidades por falta de espacio.")
+metrics.describe("entity_cache_invalidations_total", "counter", "Entradas invalidadas por escrituras.")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    pending = session.info.pop("entity_cache_invalidate", None)
+    for table_name, uids in (pending or {}).items():
+        entity_cache.invalidate(table_name, uids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("entity_cache_invalidate", None)
@@ -0,0 +1,151 @@
+"""Compresión de las respuestas según Accept-Encoding.
+
+gzip siempre; br (paquete brotli) y zstd (paquete zstandard) solo si están
+instalados (categoría [compression] del Pipfile). Si el cliente acepta varias
+gana la de mayor q y, a igualdad, la primera de COMPRESS_ALGORITHMS. Solo se
+comprimen los tipos de COMPRESS_MIMETYPES con COMPRESS_MIN_SIZE bytes o más; nunca los streams
+(?stream=1), los 304 ni lo que ya viene codificado (/<tipo>/all guarda sus
+propias versiones comprimidas, ver snapshot.py).
+
+Una respuesta con ETag (catálogo y detalles, ver versions.py) tiene siempre
+los mismos bytes para la misma URL y el mismo ETag, así que la versión
+comprimida se guarda en un LRU por (URL con query string, ETag, codificación)
+y una página caliente se comprime una sola vez por worker. El ETag de la
+respuesta comprimida lleva la codificación al final ("people-7-<digest>-gzip"),
+como el de /<tipo>/all; matching_etag() reconoce cualquiera de las variantes
+en If-None-Match.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+from metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # opcional (Pipfile, [compression])
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # opcional (Pipfile, [compression])
+    zstandard = None
+
+#CODIFICACIÓN -> FUNCIÓN (bytes, nivel) -> bytes. mtime=0: EL MISMO CUERPO DA SIEMPRE LOS MISMOS BYTES.
+ENCODERS = {"gzip": lambda body, level: gzip.compress(body, level, mtime=0)}
+if brotli is not None:
+    ENCODERS["br"] = lambda body, level: brotli.compress(body, mode=brotli.MODE_TEXT, quality=level)
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda body, level: zstandard.ZstdCompressor(level=level).compress(body)
+
+#TODAS LAS QUE PUEDEN APARECER EN UN ETAG, AUNQUE ESTE WORKER NO TENGA EL PAQUETE.
+KNOWN_ENCODINGS = ("gzip", "br", "zstd")
+
+
+class ResponseCompressor:
+    def __init__(self):
+        self.enabled = True
+        self.algorithms = tuple(ENCODERS)
+        self.levels = {"gzip": 6, "br": 5, "zstd": 3}
+        self.min_size = 500
+        self.mimetypes = frozenset(("application/json", "text/plain"))
+        self.cache_size = 512
+        self._cache = OrderedDict()  # {(url, etag, codificación): bytes}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get("COMPRESS_ENABLED", self.enabled)
+        algorithms = app.config.get("COMPRESS_ALGORITHMS") or ",".join(self.algorithms)
+        self.algorithms = tuple(name for name in (item.strip() for item in algorithms.split(",")) if name in ENCODERS)
+        self.levels = {
+            "gzip": app.config.get("COMPRESS_GZIP_LEVEL", self.levels["gzip"]),
+            "br": app.config.get("COMPRESS_BR_LEVEL", self.levels["br"]),
+            "zstd": app.config.get("COMPRESS_ZSTD_LEVEL", self.levels["zstd"]),
+        }
+        self.min_size = app.config.get("COMPRESS_MIN_SIZE", self.min_size)
+        mimetypes = app.config.get("COMPRESS_MIMETYPES")
+        if mimetypes:
+            self.mimetypes = frozenset(item.strip() for item in mimetypes.split(",") if item.strip())
+        self.cache_size = app.config.get("COMPRESS_CACHE_SIZE", self.cache_size)
+        with self._lock:
+            self._cache.clear()
+        app.after_request(self._after_request)
+        app.extensions["compress"] = self
+
+    def negotiate(self, accept):
+        """La codificación a usar según el Accept-Encoding ya parseado (werkzeug Accept), o None."""
+        if not self.enabled:
+            return None
+        best, best_quality = None, 0
+        for encoding in self.algorithms:
+            quality = accept.quality(encoding)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def choose(self, accept, mimetype, size):
+        if mimetype not in self.mimetypes or size < self.min_size:
+            return None
+        return self.negotiate(accept)
+
+    def compress(self, body, encoding, key=None):
+        #Con key (url, ETag) el resultado se guarda: la próxima vez no se comprime.
+        if key is None or self.cache_size <= 0:
+            metrics.inc("compressed_responses_total", encoding=encoding, cache="none")
+            return ENCODERS[encoding](body, self.levels[encoding])
+        key = key + (encoding,)
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+        if data is not None:
+            metrics.inc("compressed_responses_total", encoding=encoding, cache="hit")
+            return data
+
+        data = ENCODERS[encoding](body, self.levels[encoding])
+        with self._lock:
+            self._cache[key] = data
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        metrics.inc("compressed_responses_total", encoding=encoding, cache="miss")
+        return data
+
+    def matching_etag(self, if_none_match, etag):
+        """La variante de etag (sin codificar o con "-gzip", "-br", "-zstd") que trae If-None-Match, o None."""
+        for candidate in (etag,) + tuple("%s-%s" % (etag, encoding) for encoding in KNOWN_ENCODINGS):
+            if if_none_match.contains(candidate):
+                return candidate
+        return None
+
+    def _after_request(self, response):
+        if response.status_code == 304:
+            response.vary.add("Accept-Encoding")
+            return response
+        if (response.status_code < 200 or response.status_code == 204 or response.direct_passthrough
+                or response.is_streamed or "Content-Encoding" in response.headers
+                or response.mimetype not in self.mimetypes):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if response.cache_control.no_transform:
+            return response
+        body = response.get_data()
+        encoding = self.choose(request.accept_encodings, response.mimetype, len(body))
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        key = (request.full_path, etag) if etag and not weak else None
+        response.set_data(self.compress(body, encoding, key))
+        response.headers["Content-Encoding"] = encoding
+        if key is not None:
+            response.set_etag("%s-%s" % (etag, encoding))
+        return response
+
+
+response_compressor = ResponseCompressor()
+
+metrics.describe("compressed_responses_total", "counter",
+                 "Respuestas comprimidas por codificación; cache=hit si los bytes ya estaban comprimidos para ese ETag.")
@@ -0,0 +1,202 @@
+"""Perfiles de configuración del engine de SQLAlchemy por tipo de base de datos.
+
+DATABASE_PROFILE elige el perfil ("web" por defecto, "worker" para comandos
+largos como importaciones y reconciliaciones, "dev" para desarrollo local) y
+cualquier valor se puede cambiar con DATABASE_<NOMBRE>, por ejemplo
+DATABASE_POOL_SIZE=20 o DATABASE_STATEMENT_TIMEOUT_MS=2000.
+
+- postgresql: pool_size, max_overflow, pool_timeout, pool_recycle, pre-ping y
+  statement_timeout (por conexión, en connect_args).
+- mysql / mariadb: lo mismo; el límite por sentencia es max_execution_time
+  (mysql) o max_statement_time (mariadb) y se aplica al conectar.
+- sqlite (archivo): WAL, synchronous, busy_timeout, mmap_size y cache_size
+  con PRAGMAs al abrir cada conexión.
+
+async_url() y async_engine_options() dan lo mismo para el engine async de
+asgi.py (asyncpg, aiomysql o aiosqlite), con AsyncAdaptedQueuePool.
+
+El pool registra en /metrics cuántas conexiones se piden, cuánto se espera por
+una, cuántas veces se agota el tiempo de espera y el estado actual del pool.
+"""
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from metrics import metrics
+
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+PROFILES = {
+    #Workers web: pocas conexiones por proceso, esperar poco y cortar consultas largas.
+    "web": {
+        "pool_size": 5, "max_overflow": 10, "pool_timeout": 5, "pool_recycle": 1800, "pool_pre_ping": True,
+        "statement_timeout_ms": 5000,
+        "sqlite_journal_mode": "WAL", "sqlite_synchronous": "NORMAL", "sqlite_busy_timeout_ms": 5000,
+        "sqlite_mmap_size": 256 * 1024 * 1024, "sqlite_cache_size_kb": 64 * 1024,
+    },
+    #Comandos y procesos largos (importación, reconcile-favorites): una o dos conexiones, sin límite por sentencia.
+    "worker": {
+        "pool_size": 2, "max_overflow": 0, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": True,
+        "statement_timeout_ms": 0,
+        "sqlite_journal_mode": "WAL", "sqlite_synchronous": "NORMAL", "sqlite_busy_timeout_ms": 30000,
+        "sqlite_mmap_size": 256 * 1024 * 1024, "sqlite_cache_size_kb": 256 * 1024,
+    },
+    #Desarrollo local: los valores por defecto de SQLAlchemy y sqlite, solo con WAL y busy_timeout.
+    "dev": {
+        "pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": -1, "pool_pre_ping": False,
+        "statement_timeout_ms": 0,
+        "sqlite_journal_mode": "WAL", "sqlite_synchronous": "FULL", "sqlite_busy_timeout_ms": 5000,
+        "sqlite_mmap_size": 0, "sqlite_cache_size_kb": 2000,
+    },
+}
+
+
+def load_profile(name, environ=os.environ):
+    if name not in PROFILES:
+        raise ValueError("DATABASE_PROFILE desconocido: %s (opciones: %s)" % (name, ", ".join(PROFILES)))
+    profile = dict(PROFILES[name])
+    for key, default in profile.items():
+        value = environ.get("DATABASE_" + key.upper())
+        if value is None:
+            continue
+        if isinstance(default, bool):
+            profile[key] = value.lower() in ("1", "true", "yes")
+        elif isinstance(default, int):
+            profile[key] = int(value)
+        else:
+            profile[key] = value
+    profile["name"] = name
+    return profile
+
+
+def _is_memory(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(uri, profile):
+    """Opciones para SQLALCHEMY_ENGINE_OPTIONS según el tipo de base de datos."""
+    url = make_url(uri)
+    if _is_memory(url):
+        #sqlite en memoria usa su propio pool de una conexión.
+        return {}
+
+    options = {"poolclass": InstrumentedQueuePool, "pool_size": profile["pool_size"], "max_overflow": profile["max_overflow"],
+               "pool_timeout": profile["pool_timeout"], "pool_recycle": profile["pool_recycle"],
+               "pool_pre_ping": profile["pool_pre_ping"]}
+    backend = url.get_backend_name()
+    if backend == "postgresql" and profile["statement_timeout_ms"] and url.get_driver_name() in ("psycopg2", "psycopg"):
+        options["connect_args"] = {"options": "-c statement_timeout=%d" % profile["statement_timeout_ms"]}
+    if backend == "sqlite":
+        #Cada conexión de sqlite es barata y no se cae: no hace falta pre-ping ni reciclar.
+        options["pool_pre_ping"] = False
+        options["pool_recycle"] = -1
+    return options
+
+
+#DRIVER ASYNC POR TIPO DE BASE DE DATOS (PARA asgi.py).
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "mysql": "aiomysql", "mariadb": "aiomysql", "sqlite": "aiosqlite"}
+
+
+def async_url(uri):
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError("no hay driver async para %s" % backend)
+    return url.set(drivername="%s+%s" % (backend, ASYNC_DRIVERS[backend]))
+
+
+def async_engine_options(uri, profile):
+    """Como engine_options(), para create_async_engine."""
+    url = make_url(uri)
+    if _is_memory(url):
+        return {}
+    #aiosqlite usaría NullPool (una conexión nueva por sesión): se pide el pool de asyncio para todos.
+    options = {"poolclass": AsyncAdaptedQueuePool}
+    options.update((key, profile[key]) for key in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping"))
+    backend = url.get_backend_name()
+    if backend == "postgresql" and profile["statement_timeout_ms"]:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(profile["statement_timeout_ms"])}}
+    if backend == "sqlite":
+        options["pool_pre_ping"] = False
+        options["pool_recycle"] = -1
+    return options
+
+
+def configure_engine(engine, name, profile):
+    """Aplica lo que no se puede pasar como opción (PRAGMAs, variables de sesión) y registra las métricas del pool.
+    Para un engine async se pasa engine.sync_engine."""
+    backend = engine.dialect.name
+
+    if backend == "sqlite" and not _is_memory(engine.url):
+        pragmas = [
+            "PRAGMA journal_mode=%s" % profile["sqlite_journal_mode"],
+            "PRAGMA synchronous=%s" % profile["sqlite_synchronous"],
+            "PRAGMA busy_timeout=%d" % profile["sqlite_busy_timeout_ms"],
+            "PRAGMA mmap_size=%d" % profile["sqlite_mmap_size"],
+            "PRAGMA cache_size=-%d" % profile["sqlite_cache_size_kb"],
+        ]
+        event.listen(engine, "connect", lambda dbapi_connection, record: _execute_all(dbapi_connection, pragmas))
+
+    if backend in ("mysql", "mariadb") and profile["statement_timeout_ms"]:
+        if getattr(engine.dialect, "is_mariadb", False):
+            statement = "SET SESSION max_statement_time=%.3f" % (profile["statement_timeout_ms"] / 1000.0)
+        else:
+            statement = "SET SESSION max_execution_time=%d" % profile["statement_timeout_ms"]
+        event.listen(engine, "connect", lambda dbapi_connection, record: _execute_all(dbapi_connection, [statement]))
+
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.metrics_name = name
+    if isinstance(pool, QueuePool):
+        metrics.add_collector("db_pool:" + name, lambda: _pool_gauges(engine, name))
+
+
+def _execute_all(dbapi_connection, statements):
+    cursor = dbapi_connection.cursor()
+    for statement in statements:
+        cursor.execute(statement)
+    cursor.close()
+
+
+def _pool_gauges(engine, name):
+    pool = engine.pool  #puede ser otro objeto después de engine.dispose()
+    if isinstance(pool, QueuePool):
+        metrics.set_gauge("db_pool_size", pool.size(), engine=name)
+        metrics.set_gauge("db_pool_checked_out", pool.checkedout(), engine=name)
+        metrics.set_gauge("db_pool_checked_in", pool.checkedin(), engine=name)
+        metrics.set_gauge("db_pool_overflow", max(pool.overflow(), 0), engine=name)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide la espera por una conexión."""
+    metrics_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.inc("db_pool_timeouts_total", engine=self.metrics_name)
+            raise
+        finally:
+            metrics.observe("db_pool_checkout_wait_seconds", time.perf_counter() - start, WAIT_BUCKETS, engine=self.metrics_name)
+        metrics.inc("db_pool_checkouts_total", engine=self.metrics_name)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+metrics.describe("db_pool_checkouts_total", "counter", "Conexiones entregadas por el pool.")
+metrics.describe("db_pool_checkout_wait_seconds", "histogram", "Tiempo esperando una conexión del pool.")
+metrics.describe("db_pool_timeouts_total", "counter", "Veces que se agotó pool_timeout esperando una conexión.")
+metrics.describe("db_pool_size", "gauge", "Tamaño configurado del pool (suma de los workers).")
+metrics.describe("db_pool_checked_out", "gauge", "Conexiones en uso en este momento.")
+metrics.describe("db_pool_checked_in", "gauge", "Conexiones libres dentro del pool.")
+metrics.describe("db_pool_overflow", "gauge", "Conexiones abiertas por encima de pool_size.")
@@ -0,0 +1,278 @@
+"""Alta de favoritos con una sola sentencia.
+
+La unicidad (user_id, <entidad>_uid) la garantiza la base de datos y las
+llaves foráneas validan que existan el usuario y la entidad, así que el camino
+normal es un solo INSERT que ignora duplicados:
+
+- postgresql / sqlite: INSERT ... ON CONFLICT DO NOTHING
+- mysql / mariadb: INSERT IGNORE
+- otros: INSERT normal y el IntegrityError se trata igual.
+
+Solo cuando no se insertó nada se consulta por qué (entidad o usuario
+inexistente -> 404, o el favorito ya existía).
+
+apply_batch() aplica una lista de altas y bajas de los tres tipos en una sola
+transacción: por tipo, una consulta para saber qué existe, un INSERT de varias
+filas y un DELETE ... IN.
+
+Las dos rutas mantienen los contadores de popularity.py en la misma transacción.
+
+FavoritesPayload arma las respuestas de favoritos: cada favorito va solo con
+sus ids y las entidades se piden con ?expand=people,planets,vehicles,user.
+Van una sola vez cada una en "included" ({tipo: {id: entidad}}), con una
+consulta IN (...) por tipo, y ?fields= elige sus columnas: "name" aplica a
+todos los tipos que la tengan y "user.first_name" a uno solo.
+"""
+from sqlalchemy import and_, delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, People, Planets, Vehicles, FavoritePeople, FavoritePlanets, FavoriteVehicles
+from popularity import decrement, increment
+from serializers import serializer_for
+from utils import APIException
+
+
+#TIPO (COMO EN LAS RUTAS /favorite/<tipo>/<id>) -> (TABLA DE FAVORITOS, COLUMNA, ENTIDAD).
+FAVORITE_KINDS = {
+    "people": (FavoritePeople, "people_uid", People),
+    "planet": (FavoritePlanets, "planet_uid", Planets),
+    "vehicle": (FavoriteVehicles, "vehicle_uid", Vehicles),
+}
+
+#(TABLA DE FAVORITOS, COLUMNA), EN EL ORDEN DE LA RESPUESTA DE POST /favorites.
+FAVORITE_LISTS = (
+    (FavoritePeople, "people_uid"),
+    (FavoriteVehicles, "vehicle_uid"),
+    (FavoritePlanets, "planet_uid"),
+)
+
+#TIPO EN ?expand= -> (ENTIDAD, COLUMNA DEL FAVORITO QUE LA REFERENCIA).
+EXPANDABLE = {
+    "people": (People, "people_uid"),
+    "planets": (Planets, "planet_uid"),
+    "vehicles": (Vehicles, "vehicle_uid"),
+    "user": (User, "user_id"),
+}
+
+
+def _insert_ignoring_duplicates(model, values):
+    #"values" es un dict o una lista de dicts (INSERT de varias filas).
+    dialect = db.session.get_bind().dialect.name
+    keys = values[0] if isinstance(values, list) else values
+    columns = [getattr(model, column) for column in keys]
+    if dialect == "postgresql":
+        return postgresql.insert(model).values(values).on_conflict_do_nothing(index_elements=columns)
+    if dialect == "sqlite":
+        return sqlite.insert(model).values(values).on_conflict_do_nothing(index_elements=columns)
+    if dialect in ("mysql", "mariadb"):
+        return insert(model).values(values).prefix_with("IGNORE")
+    return insert(model).values(values)
+
+
+def read_id(body, key):
+    """body[key] como entero (acepta 1 o "1"); cualquier otra cosa es un 400."""
+    value = body.get(key) if isinstance(body, dict) else None
+    if isinstance(value, (int, str)) and not isinstance(value, bool):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise APIException({"message":"%s debe ser un número entero" % key}, status_code=400)
+
+
+def add_favorite(model, column, user_id, uid, parent, messages):
+    """Agrega el favorito y devuelve su id. "messages" tiene los textos de
+    error para "parent", "user" y "duplicate" (todos se responden con 404)."""
+    try:
+        result = db.session.execute(_insert_ignoring_duplicates(model, {"user_id": user_id, column: uid}))
+        inserted = result.rowcount == 1
+    except IntegrityError:
+        db.session.rollback()
+        inserted = False
+
+    if inserted:
+        favorite_id = result.inserted_primary_key[0]
+        increment(parent.__tablename__, [uid])
+        db.session.commit()
+        return favorite_id
+
+    db.session.rollback()
+    #Camino poco frecuente: se averigua qué falló.
+    if db.session.get(parent, uid) is None:
+        raise APIException(messages["parent"], 404)
+    if db.session.get(User, user_id) is None:
+        raise APIException(messages["user"], 404)
+    raise APIException(messages["duplicate"], 404)
+
+
+def _parse_operations(operations, limit):
+    if not isinstance(operations, list) or not operations:
+        raise APIException({"message":"necesitas especificar operations"}, status_code=400)
+    if len(operations) > limit:
+        raise APIException({"message":"máximo %d operaciones por lote" % limit}, status_code=400)
+    parsed = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise APIException({"message":"operación %d inválida" % index}, status_code=400)
+        op, kind, uid = operation.get("op"), operation.get("kind"), operation.get("uid")
+        if op not in ("add", "remove"):
+            raise APIException({"message":"operación %d: op debe ser add o remove" % index}, status_code=400)
+        if kind not in FAVORITE_KINDS:
+            raise APIException({"message":"operación %d: kind debe ser people, planet o vehicle" % index}, status_code=400)
+        if not isinstance(uid, int) or isinstance(uid, bool):
+            raise APIException({"message":"operación %d: uid debe ser un número entero" % index}, status_code=400)
+        parsed.append((op, kind, uid))
+    return parsed
+
+
+def apply_batch(user_id, operations, limit=500):
+    """Aplica las operaciones en orden lógico y devuelve un resultado por operación.
+    Si la misma entidad aparece varias veces, cuenta la última; las anteriores
+    quedan como "superseded"."""
+    parsed = _parse_operations(operations, limit)
+    if db.session.get(User, user_id) is None:
+        raise APIException("Usuario no encontrado", 404)
+
+    last = {(kind, uid): index for index, (op, kind, uid) in enumerate(parsed)}
+    statuses = ["superseded"] * len(parsed)
+
+    try:
+        for kind, (model, column, parent) in FAVORITE_KINDS.items():
+            wanted = {uid: parsed[index][0] for (k, uid), index in last.items() if k == kind}
+            if not wanted:
+                continue
+            favorite_column = getattr(model, column)
+
+            #UNA CONSULTA: QUÉ ENTIDADES EXISTEN Y CUÁLES YA SON FAVORITAS DEL USUARIO.
+            rows = db.session.execute(
+                select(parent.uid, model.id)
+                .outerjoin(model, and_(favorite_column == parent.uid, model.user_id == user_id))
+                .where(parent.uid.in_(list(wanted)))
+            ).all()
+            exists = {uid for uid, _ in rows}
+            favorite = {uid for uid, favorite_id in rows if favorite_id is not None}
+
+            to_add = sorted(uid for uid, op in wanted.items() if op == "add" and uid in exists and uid not in favorite)
+            to_remove = sorted(uid for uid, op in wanted.items() if op == "remove" and uid in favorite)
+            #Con RETURNING se sabe exactamente qué filas cambiaron aunque otro request se adelante;
+            #sin RETURNING (mysql) se asume el resultado esperado y la reconciliación corrige.
+            dialect = db.session.get_bind().dialect
+            added, removed = set(to_add), set(to_remove)
+            if to_add:
+                stmt = _insert_ignoring_duplicates(model, [{"user_id": user_id, column: uid} for uid in to_add])
+                if dialect.insert_returning:
+                    added = set(db.session.execute(stmt.returning(favorite_column)).scalars())
+                else:
+                    db.session.execute(stmt)
+            if to_remove:
+                stmt = delete(model).where(model.user_id == user_id, favorite_column.in_(to_remove))
+                if dialect.delete_returning:
+                    removed = set(db.session.execute(stmt.returning(favorite_column)).scalars())
+                else:
+                    db.session.execute(stmt)
+            increment(parent.__tablename__, added)
+            decrement(parent.__tablename__, removed)
+
+            for uid, op in wanted.items():
+                if uid not in exists:
+                    status = "not_found"
+                elif op == "add":
+                    status = "added" if uid in added else "exists"
+                else:
+                    status = "removed" if uid in removed else "not_favorite"
+                statuses[last[(kind, uid)]] = status
+
+        db.session.commit()
+    except IntegrityError:
+        #Otro request borró una de las entidades mientras tanto.
+        db.session.rollback()
+        raise APIException({"message":"los favoritos cambiaron durante el lote, intenta de nuevo"}, status_code=409)
+
+    return [{"op": op, "kind": kind, "uid": uid, "status": status} for (op, kind, uid), status in zip(parsed, statuses)]
+
+
+def favorites_query(model, column, user_id):
+    #Solo las columnas del favorito; con .mappings() cada fila ya es el dict de la respuesta.
+    return select(model.id, model.user_id, getattr(model, column)).where(model.user_id == user_id).order_by(model.id)
+
+
+def _split(value):
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def parse_expand(args):
+    """?expand= y ?fields= -> {tipo: campos} con los tipos a expandir, en orden."""
+    kinds = list(dict.fromkeys(_split(args.get("expand"))))
+    unknown = [kind for kind in kinds if kind not in EXPANDABLE]
+    if unknown:
+        raise APIException({"message":"expand desconocido: %s, usa people, planets, vehicles o user" % ", ".join(unknown)}, status_code=400)
+
+    requested = _split(args.get("fields"))
+    if requested and not kinds:
+        raise APIException({"message":"fields aplica a las entidades de expand"}, status_code=400)
+
+    fields = {}
+    for kind in kinds:
+        serializer = serializer_for(EXPANDABLE[kind][0])
+        prefix = kind + "."
+        own = [field[len(prefix):] for field in requested if field.startswith(prefix)]
+        own += [field for field in requested if "." not in field and field in serializer.fields]
+        #SIN CAMPOS PARA ESTE TIPO VA COMPLETO.
+        fields[kind] = serializer.parse_fields(",".join(own))
+
+    for field in requested:
+        kind, _, name = field.rpartition(".")
+        if kind and kind not in fields:
+            raise APIException({"message":"%s: %s no está en expand" % (field, kind)}, status_code=400)
+        if not kind and not any(name in serializer_for(EXPANDABLE[k][0]).fields for k in fields):
+            raise APIException({"message":"campos desconocidos: %s" % field}, status_code=400)
+    return fields
+
+
+class FavoritesPayload:
+    def __init__(self, args, chunk_size=500):
+        self.fields = parse_expand(args)
+        self.chunk_size = chunk_size
+        self.results = []
+        self.included = {kind: {} for kind in self.fields}
+        self._ids = {kind: set() for kind in self.fields}
+
+    def add(self, favorite):
+        self.results.append(favorite)
+        for kind, ids in self._ids.items():
+            uid = favorite.get(EXPANDABLE[kind][1])
+            if uid is not None:
+                ids.add(uid)
+
+    def queries(self):
+        #UNA CONSULTA IN (...) POR TIPO EXPANDIDO, EN TROZOS DE chunk_size IDS.
+        for kind, ids in self._ids.items():
+            serializer = serializer_for(EXPANDABLE[kind][0])
+            ids = sorted(ids)
+            for start in range(0, len(ids), self.chunk_size):
+                yield kind, (select(*serializer.columns(self.fields[kind]))
+                             .where(serializer.key_column.in_(ids[start:start + self.chunk_size])))
+
+    def include(self, kind, rows):
+        serializer = serializer_for(EXPANDABLE[kind][0])
+        for row in rows:
+            item = serializer.from_row(row, self.fields[kind])
+            self.included[kind][str(item[serializer.key])] = item
+
+    def load(self, session):
+        for kind, query in self.queries():
+            self.include(kind, session.execute(query))
+
+    def body(self):
+        body = {"results": self.results}
+        if self.fields:
+            body["included"] = self.included
+        return body
+
+    def single(self):
+        #Un solo favorito (las rutas de alta): el mismo dict de siempre, más "included" si se pidió.
+        body = dict(self.results[0])
+        if self.fields:
+            body["included"] = self.included
+        return body
@@ -0,0 +1,241 @@
+"""Importación masiva de People, Planets y Vehicles.
+
+El body (NDJSON o un arreglo JSON) se lee por partes: cada fila se valida contra
+las columnas del modelo al llegar, las válidas se insertan por lotes con un solo
+executemany y se hace commit cada IMPORT_COMMIT_ROWS filas. Las filas con error
+no detienen la importación, se devuelven en el reporte.
+"""
+import codecs
+import json
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from versions import bump_imported
+
+CHUNK_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 1000
+
+_validators = {}
+
+
+class RowError(ValueError):
+    pass
+
+
+def _column_validator(column):
+    python_type = column.type.python_type
+    length = getattr(column.type, "length", None)
+
+    def validate(value):
+        if value is None:
+            if not column.nullable:
+                raise RowError("%s no puede ser null" % column.key)
+            return None
+        if python_type is float:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise RowError("%s debe ser numérico" % column.key)
+            return float(value)
+        if python_type is int:
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise RowError("%s debe ser entero" % column.key)
+            return value
+        if not isinstance(value, python_type):
+            raise RowError("%s debe ser %s" % (column.key, python_type.__name__))
+        if length is not None and len(value) > length:
+            raise RowError("%s excede %d caracteres" % (column.key, length))
+        return value
+
+    return validate
+
+def row_validator(model):
+    #SE ARMA UNA VEZ POR MODELO A PARTIR DE LAS COLUMNAS DE LA TABLA.
+    if model in _validators:
+        return _validators[model]
+
+    columns = {column.key: _column_validator(column) for column in model.__table__.columns}
+    required = [column.key for column in model.__table__.columns if not column.nullable and not column.primary_key]
+
+    def validate(record):
+        if not isinstance(record, dict):
+            raise RowError("cada fila debe ser un objeto JSON")
+        unknown = set(record) - set(columns)
+        if unknown:
+            raise RowError("columnas desconocidas: %s" % ", ".join(sorted(unknown)))
+        missing = [key for key in required if key not in record]
+        if missing:
+            raise RowError("faltan columnas: %s" % ", ".join(missing))
+        return {key: columns[key](value) for key, value in record.items()}
+
+    _validators[model] = validate
+    return validate
+
+
+def iter_ndjson(stream):
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            yield number, RowError("JSON inválido: %s" % error)
+
+def iter_json_array(stream):
+    #Parser incremental: se decodifica elemento por elemento sin cargar todo el arreglo.
+    #El UTF-8 también es incremental: un carácter partido entre dos lecturas se completa con la siguiente.
+    decoder = json.JSONDecoder()
+    decode_utf8 = codecs.getincrementaldecoder("utf-8")().decode
+    buffer = ""
+    position = 0
+    started = False
+    number = 0
+    eof = False
+
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != "[":
+                yield 1, RowError("se esperaba un arreglo JSON")
+                return
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        if position < len(buffer):
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except ValueError as error:
+                if eof:
+                    yield number + 1, RowError("JSON inválido: %s" % error)
+                    return
+            else:
+                number += 1
+                position = end
+                yield number, value
+                continue
+        elif eof:
+            #Un body vacío o cortado antes del "]" final no es un arreglo completo: no se acepta en silencio.
+            if not started:
+                yield 1, RowError("se esperaba un arreglo JSON")
+            else:
+                yield number + 1, RowError("arreglo incompleto: falta el ] final")
+            return
+
+        chunk = stream.read(CHUNK_SIZE)
+        eof = not chunk
+        try:
+            text = decode_utf8(chunk, final=eof)
+        except UnicodeDecodeError as error:
+            yield number + 1, RowError("UTF-8 inválido: %s" % error)
+            return
+        buffer = buffer[position:] + text
+        position = 0
+
+def iter_records(stream, content_type):
+    if content_type and "ndjson" in content_type:
+        return iter_ndjson(stream)
+    return iter_json_array(stream)
+
+
+class BulkImporter:
+    def __init__(self, model, batch_size=1000, commit_rows=50000):
+        self.model = model
+        self.batch_size = batch_size
+        self.commit_rows = commit_rows
+        self.validate = row_validator(model)
+        self.pk = model.__mapper__.primary_key[0].key
+        self.pk_column = getattr(model, self.pk)
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self._uncommitted = 0
+        self._inserted_range = None  # (menor, mayor) uid insertado desde el último commit
+
+    def _error(self, number, error):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": number, "error": str(error)})
+
+    def _insert(self, rows):
+        #Devuelve el menor y el mayor uid insertado, también de los automáticos: el rango se guarda al
+        #hacer commit para que los caches (cache de entidades, incluso un 404 guardado, y snapshots) vean las filas.
+        if db.session.get_bind().dialect.insert_executemany_returning:
+            uids = db.session.execute(insert(self.model).returning(self.pk_column), rows).scalars().all()
+        else:
+            #Sin RETURNING (mysql): el rango de uid que apareció con el INSERT, más los explícitos.
+            last = select(func.coalesce(func.max(self.pk_column), 0))
+            before = db.session.execute(last).scalar()
+            db.session.execute(insert(self.model), rows)
+            after = db.session.execute(last).scalar()
+            uids = [values[self.pk] for values in rows if values.get(self.pk) is not None]
+            if after > before:
+                uids += [before + 1, after]
+        return min(uids), max(uids)
+
+    def _track(self, first_uid, last_uid):
+        if self._inserted_range is not None:
+            first_uid = min(first_uid, self._inserted_range[0])
+            last_uid = max(last_uid, self._inserted_range[1])
+        self._inserted_range = (first_uid, last_uid)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            with db.session.begin_nested():
+                inserted_range = self._insert([values for _, values in batch])
+            self.inserted += len(batch)
+            self._track(*inserted_range)
+        except IntegrityError:
+            #ALGUNA FILA DEL LOTE CHOCÓ (POR EJEMPLO UN uid REPETIDO): SE REINTENTA FILA POR FILA PARA REPORTARLA.
+            for number, values in batch:
+                try:
+                    with db.session.begin_nested():
+                        inserted_range = self._insert([values])
+                    self.inserted += 1
+                    self._track(*inserted_range)
+                except IntegrityError as error:
+                    self._error(number, error.orig)
+        self._uncommitted += len(batch)
+        if self._uncommitted >= self.commit_rows:
+            self._commit()
+
+    def _commit(self):
+        if self._uncommitted:
+            #UNA VERSIÓN Y UN RANGO POR COMMIT, NO UNA FILA DE catalog_version POR ENTIDAD (VER versions.py).
+            if self._inserted_range is not None:
+                bump_imported(self.model.__tablename__, *self._inserted_range)
+                self._inserted_range = None
+            db.session.commit()
+            self._uncommitted = 0
+
+    def run(self, records):
+        batch = []
+        for number, record in records:
+            if isinstance(record, RowError):
+                self._error(number, record)
+                continue
+            try:
+                values = self.validate(record)
+            except RowError as error:
+                self._error(number, error)
+                continue
+            batch.append((number, values))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+        self._commit()
+        return self.report()
+
+    def report(self):
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
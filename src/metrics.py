@@ -0,0 +1,292 @@
+"""Métricas por endpoint (latencia, status, consultas SQL) en formato de texto de Prometheus.
+
+Cada worker acumula sus métricas en memoria y cada METRICS_FLUSH_SECONDS las
+escribe en METRICS_DIR/metrics-<pid>.json. /metrics suma los archivos de todos
+los workers; los de workers que ya murieron se acumulan en un archivo de
+archivo para que los contadores nunca bajen.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HELP = {
+    "http_request_duration_seconds": ("histogram", "Latencia de los requests por endpoint."),
+    "http_requests_total": ("counter", "Requests atendidos por endpoint y status."),
+    "http_request_sql_queries": ("histogram", "Consultas SQL ejecutadas por request."),
+    "http_request_sql_seconds_total": ("counter", "Tiempo total en SQL por endpoint."),
+}
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('%s="%s"' % (key, str(value).replace('"', '\\"')) for key, value in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.directory = None
+        self.flush_interval = 5.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._collectors = {}  # {nombre: función}
+        self._reset()
+
+    def _reset(self):
+        self.histograms = {}  # {(nombre, labels): [buckets, conteos, suma, total]}
+        self.counters = {}  # {(nombre, labels): valor}
+        self.gauges = {}  # {(nombre, labels): valor}, no se suman los de workers muertos
+        self._flushed_at = 0.0
+        self._pid = os.getpid()
+
+    def init_app(self, app):
+        self.directory = app.config.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "api-metrics")
+        self.flush_interval = float(app.config.get("METRICS_FLUSH_SECONDS", self.flush_interval))
+        os.makedirs(self.directory, exist_ok=True)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions["metrics"] = self
+
+        #Escucha todos los engines (también los que se creen después, como réplicas).
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    #API PARA QUE OTROS MÓDULOS (CACHE, POOL DE CONEXIONES...) PUBLIQUEN SUS NÚMEROS.
+    def describe(self, name, kind, text):
+        HELP[name] = (kind, text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._check_fork()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_collector(self, name, collector):
+        #Función que actualiza gauges justo antes de escribir (por ejemplo el estado del pool de conexiones).
+        #Con el mismo nombre reemplaza a la anterior: cada create_app() vuelve a registrar la de su engine.
+        self._collectors[name] = collector
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._check_fork()
+            self.gauges[(name, _labels(labels))] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._check_fork()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [list(buckets), [0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(histogram[0]):
+                if value <= bound:
+                    histogram[1][index] += 1
+                    break
+            histogram[2] += value
+            histogram[3] += 1
+
+    def _check_fork(self):
+        #Un worker recién creado por fork no debe reportar lo que acumuló el proceso padre.
+        if self._pid != os.getpid():
+            self._reset()
+
+    #HOOKS DEL REQUEST
+    def _before_request(self):
+        #Los requests de calentamiento (warmup.py) no se cuentan.
+        if request.environ.get("api.warmup"):
+            return
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+
+    def _record(self, status):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        queries, sql_seconds = g.get("metrics_sql", (0, 0.0))
+
+        self.observe("http_request_duration_seconds", elapsed, endpoint=endpoint, method=request.method)
+        self.inc("http_requests_total", endpoint=endpoint, method=request.method, status=status)
+        self.observe("http_request_sql_queries", queries, SQL_COUNT_BUCKETS, endpoint=endpoint)
+        self.inc("http_request_sql_seconds_total", sql_seconds, endpoint=endpoint)
+
+        self.flush_if_due()
+
+    def _after_request(self, response):
+        self._record(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        #Solo llega aquí sin registrar si hubo una excepción no manejada.
+        if exc is not None:
+            self._record(500)
+
+    #AGREGACIÓN ENTRE WORKERS
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            return {
+                "histograms": [[name, labels, *value] for (name, labels), value in self.histograms.items()],
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "gauges": [[name, labels, value] for (name, labels), value in self.gauges.items()],
+            }
+
+    def _path(self, pid):
+        return os.path.join(self.directory, "metrics-%d.json" % pid)
+
+    def flush(self, wait=True):
+        #Un solo hilo escribe a la vez; los demás no esperan si no hace falta.
+        if not self._flush_lock.acquire(blocking=wait):
+            return
+        try:
+            for collector in list(self._collectors.values()):
+                collector()
+            data = self.snapshot()
+            path = self._path(os.getpid())
+            tmp = path + ".tmp"
+            with open(tmp, "w") as handle:
+                json.dump(data, handle)
+            os.replace(tmp, path)
+            self._flushed_at = time.time()
+        finally:
+            self._flush_lock.release()
+
+    def flush_if_due(self):
+        if time.time() - self._flushed_at >= self.flush_interval:
+            self.flush(wait=False)
+
+    def collect(self):
+        self.flush()
+        archive_path = os.path.join(self.directory, "archive.json")
+        with open(os.path.join(self.directory, "archive.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            archive = _load(archive_path) or {"histograms": [], "counters": [], "gauges": []}
+            live = []
+            archived = False
+            for filename in os.listdir(self.directory):
+                if not (filename.startswith("metrics-") and filename.endswith(".json")):
+                    continue
+                pid = int(filename[len("metrics-"):-len(".json")])
+                data = _load(os.path.join(self.directory, filename))
+                if data is None:
+                    continue
+                if _alive(pid):
+                    live.append(data)
+                else:
+                    data["gauges"] = []
+                    archive = merge([archive, data])
+                    os.remove(os.path.join(self.directory, filename))
+                    archived = True
+            if archived:
+                with open(archive_path + ".tmp", "w") as handle:
+                    json.dump(archive, handle)
+                os.replace(archive_path + ".tmp", archive_path)
+        return merge([archive] + live)
+
+
+def _load(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def merge(snapshots):
+    histograms, counters, gauges = {}, {}, {}
+    for data in snapshots:
+        for name, labels, buckets, counts, total_sum, total in data["histograms"]:
+            current = histograms.get((name, labels))
+            if current is None:
+                histograms[(name, labels)] = [buckets, list(counts), total_sum, total]
+            else:
+                current[1] = [a + b for a, b in zip(current[1], counts)]
+                current[2] += total_sum
+                current[3] += total
+        for name, labels, value in data["counters"]:
+            counters[(name, labels)] = counters.get((name, labels), 0) + value
+        for name, labels, value in data["gauges"]:
+            gauges[(name, labels)] = gauges.get((name, labels), 0) + value
+    return {
+        "histograms": [[name, labels, *value] for (name, labels), value in histograms.items()],
+        "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+        "gauges": [[name, labels, value] for (name, labels), value in gauges.items()],
+    }
+
+def _with_le(labels, bound):
+    le = 'le="%s"' % bound
+    return "{" + le + "}" if not labels else labels[:-1] + "," + le + "}"
+
+def render(data):
+    lines = []
+    declared = set()
+
+    def declare(name, kind):
+        if name not in declared:
+            declared.add(name)
+            help_kind, text = HELP.get(name, (kind, name))
+            lines.append("# HELP %s %s" % (name, text))
+            lines.append("# TYPE %s %s" % (name, help_kind))
+
+    for name, labels, buckets, counts, total_sum, total in sorted(data["histograms"]):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(buckets, counts):
+            cumulative += count
+            lines.append("%s_bucket%s %d" % (name, _with_le(labels, bound), cumulative))
+        lines.append("%s_bucket%s %d" % (name, _with_le(labels, "+Inf"), total))
+        lines.append("%s_sum%s %s" % (name, labels, repr(float(total_sum))))
+        lines.append("%s_count%s %d" % (name, labels, total))
+    for name, labels, value in sorted(data["counters"]):
+        declare(name, "counter")
+        lines.append("%s%s %s" % (name, labels, value))
+    for name, labels, value in sorted(data["gauges"]):
+        declare(name, "gauge")
+        lines.append("%s%s %s" % (name, labels, value))
+    return "\n".join(lines) + "\n"
+
+
+#EVENTOS DE SQLALCHEMY: CUENTAN LAS CONSULTAS Y SU TIEMPO DENTRO DEL REQUEST ACTUAL.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_query_start")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if has_request_context():
+        stats = g.get("metrics_sql")
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+
+
+metrics = Metrics()
@@ -1,7 +1,24 @@
-from flask_sqlalchemy import SQLAlchemy
-
-db = SQLAlchemy()
+import sqlite3
 
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from serializers import serializable, serializer_for
+from replicas import RoutingSession
+
+#LA SESIÓN ELIGE ENTRE LA BASE PRINCIPAL Y LAS RÉPLICAS DE LECTURA (VER replicas.py).
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+#SQLITE NO REVISA LAS LLAVES FORÁNEAS SI NO SE LE PIDE EN CADA CONEXIÓN.
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+#LOS SERIALIZADORES SE ARMAN CON LAS COLUMNAS DE CADA TABLA (VER serializers.py).
+@serializable(exclude=("password", "is_active")) # do not serialize the password, its a security breach
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -20,18 +37,9 @@ class User(db.Model):
         return '<User %r>' % self.first_name
 
     def serialize(self):
-        return {
-            "id": self.id,
-            "email": self.email,
-            "first_name":self.first_name,
-            "last_name":self.last_name,
-            "subscription_date":self.subscription_date,
-            "birth_date":self.birth_date,
-            "country":self.country,
-
-            # do not serialize the password, its a security breach
-        }
+        return serializer_for(User)(self)
 
+@serializable(filters=("gender", "hair_color"), ranges=("height", "mass"))
 class People(db.Model):
     uid = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), unique=False, nullable=False)
@@ -44,22 +52,18 @@ class People(db.Model):
     birth_year = db.Column(db.Float(), nullable=False)
     gender=db.Column(db.String(50), nullable=False)
     favorite_people = db.relationship("FavoritePeople", backref="people", lazy=True) # la propiedad backref, lo que hace es entregarle todas las propiedades de People a FavoritePeople
+    #ÍNDICES PARA LOS FILTROS DE /people; EL uid AL FINAL PERMITE PAGINAR SIN ORDENAR.
+    __table_args__ = (
+        db.Index("ix_people_gender_uid", "gender", "uid"),
+        db.Index("ix_people_hair_color_uid", "hair_color", "uid"),
+        db.Index("ix_people_height_uid", "height", "uid"),
+        db.Index("ix_people_mass_uid", "mass", "uid"),
+    )
 
     def serialize(self):
-        return {
-            "uid": self.uid,
-            "name":self.name,
-            "url":self.url,
-            "height":self.height,
-            "mass": self.mass,
-            "hair_color":self.hair_color,
-            "skin_color":self.skin_color,
-            "skin_color":self.eyes_color,
-            "birth_year":self.birth_year,
-            "gender":self.gender,
-            # do not serialize the password, its a security breach
-        }
+        return serializer_for(People)(self)
 
+@serializable(filters=("climate",), ranges=("population", "diameter"))
 class Planets(db.Model):
     uid = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), unique=False, nullable=False)
@@ -71,23 +75,17 @@ class Planets(db.Model):
     population = db.Column(db.Float(), nullable=False)
     climate = db.Column(db.String, nullable=False)
     favorite_planet = db.relationship("FavoritePlanets", backref="planets", lazy=True)
+    __table_args__ = (
+        db.Index("ix_planets_climate_uid", "climate", "uid"),
+        db.Index("ix_planets_population_uid", "population", "uid"),
+        db.Index("ix_planets_diameter_uid", "diameter", "uid"),
+    )
     
     def serialize(self):
-        return {
-            "uid": self.uid,
-            "name":self.name,
-            "url":self.url,
-            "diameter":self.diameter,
-            "rotation_period": self.rotation_period,
-            "orbital_period":self.orbital_period,
-            "gravity":self.gravity,
-            "Population":self.population,
-            "climate":self.climate,
- 
-            # do not serialize the password, its a security breach
-        }
+        return serializer_for(Planets)(self)
 
 
+@serializable(filters=("vehicle_class", "manufacturer"), ranges=("cost_in_credits",))
 class Vehicles(db.Model):
     uid = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), unique=False, nullable=False)
@@ -99,91 +97,126 @@ class Vehicles(db.Model):
     passengers = db.Column(db.Integer, nullable=False)
     cargo_capacity = db.Column(db.Float(), nullable=False)
     favorite_vehicle = db.relationship("FavoriteVehicles", backref="vehicles", lazy=True)
+    __table_args__ = (
+        db.Index("ix_vehicles_vehicle_class_uid", "vehicle_class", "uid"),
+        db.Index("ix_vehicles_manufacturer_uid", "manufacturer", "uid"),
+        db.Index("ix_vehicles_cost_in_credits_uid", "cost_in_credits", "uid"),
+    )
 
     def serialize(self):
-        return {
-            "uid": self.uid,
-            "name":self.name,
-            "url":self.url,
-            "model":self.model,
-            "vehicle_class": self.vehicle_class,
-            "manufacturer":self.manufacturer,
-            "cost_in_credits":self.cost_in_credits,
-            "passengers":self.passengers,
-            "cargo_capacity":self.cargo_capacity,
- 
-            # do not serialize the password, its a security breach
-        }
+        return serializer_for(Vehicles)(self)
 
 
 class FavoritePeople(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     people_uid = db.Column(db.Integer, db.ForeignKey("people.uid"), nullable=False) 
-    
+
+    #UN USUARIO NO PUEDE TENER DOS VECES EL MISMO FAVORITO (LO VALIDA LA BASE DE DATOS, VER favorites.py).
+    __table_args__ = (db.UniqueConstraint("user_id", "people_uid", name="uq_favorite_people_user_id_people_uid"),)
+
+    #SOLO LOS IDS: EL PERSONAJE Y EL USUARIO SE PIDEN CON ?expand= (VER favorites.py).
     def serialize(self):
         return {
             "id": self.id,
             "user_id":self.user_id,  
             "people_uid":self.people_uid,
-            "people_name": People.query.get(self.people_uid).serialize()["name"],
-            "user_first_name": User.query.get(self.user_id).serialize()["first_name"],
-            "people":People.query.get(self.people_uid).serialize(),
-            "user": User.query.get(self.user_id).serialize(),
-
-            
-            # do not serialize the password, its a security breach
         }
 
 class FavoritePlanets(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     planet_uid = db.Column(db.Integer, db.ForeignKey("planets.uid"), nullable=False) 
-    
+
+    __table_args__ = (db.UniqueConstraint("user_id", "planet_uid", name="uq_favorite_planets_user_id_planet_uid"),)
+
     def serialize(self):
         return {
             "id": self.id,
             "user_id":self.user_id,
             "planet_uid":self.planet_uid,
-            #PARA OBTENER UNA PROPIEDAD ENE ESPECIFICO 
-            # "planet_name": Planets.query.get(self.planet_uid).serialize()["name"],
-            # "user_first_name": User.query.get(self.user_id).serialize()["first_name"],
-            #PARA OBTENER TODAS LAS PROPIEDADES DE UNA TABLA
-            "planets":Planets.query.get(self.planet_uid).serialize(),
-            "user": User.query.get(self.user_id).serialize(),
-            # do not serialize the password, its a security breach
         }
 
 class FavoriteVehicles(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     vehicle_uid = db.Column(db.Integer, db.ForeignKey("vehicles.uid"), nullable=False) 
-    
+
+    __table_args__ = (db.UniqueConstraint("user_id", "vehicle_uid", name="uq_favorite_vehicles_user_id_vehicle_uid"),)
+
     def serialize(self):
         return {
             "id": self.id,
             "user_id":self.user_id,
             "vehicle_uid":self.vehicle_uid, 
-            "vehicles":Vehicles.query.get(self.vehicle_uid).serialize(),
-            "user": User.query.get(self.user_id).serialize(), 
-            
-            # do not serialize the password, its a security breach
         }
 
 #MODELO DE BASE DE DATOS PARA BLOQUEAR EL TOQUEN UNA VEZ EL USUARIO HACE LOGOUT.
+#SOLO GUARDA EL jti (UUID DE 36 CARACTERES) Y HASTA CUÁNDO EL TOKEN PODRÍA SER VÁLIDO: PASADO expires_at
+#LA FILA YA NO SIRVE Y "flask purge-revoked-tokens" LA BORRA (VER revocation.py).
 
 class TokenBlokedList(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    token = db.Column(db.String(250), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=False, nullable=False) #Se recomienda el uso del ID en lugar del email, se hace aquí como práctica. Igual, podría ser un ForengnKey
+    token = db.Column(db.CHAR(36), unique=True, nullable=False) #jti del token
+    user_id = db.Column(db.Integer, nullable=True) #sin llave foránea: borrar al usuario no debe desbloquear sus tokens
     create_at =db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True) #UTC; None = el token no expira
     is_blocked = db.Column(db.Boolean, default=True)
 
     def serialize(self):
         return{
             "id":self.id,
             "token":self.token,
-            "email":self.email,
+            "user_id":self.user_id,
             "create_at":self.create_at,
+            "expires_at":self.expires_at,
             "is_bloqued":self.is_blocked,
-        }
\ No newline at end of file
+        }
+#CONTADORES DE VERSIÓN DEL CATÁLOGO: uid = 0 ES LA VERSIÓN DE LA TABLA COMPLETA, LOS DEMÁS SON
+#LA VERSIÓN DE LA TABLA EN LA QUE CAMBIÓ ESA FILA POR ÚLTIMA VEZ. SE USAN PARA LOS ETAGS.
+
+class CatalogVersion(db.Model):
+    table_name = db.Column(db.String(30), primary_key=True)
+    uid = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def serialize(self):
+        return {
+            "table_name":self.table_name,
+            "uid":self.uid,
+            "version":self.version,
+        }
+
+#IMPORTACIONES MASIVAS (VER importer.py): CADA COMMIT GUARDA EL RANGO DE uid QUE INSERTÓ Y LA VERSIÓN DE LA
+#TABLA EN QUE LO HIZO, EN LUGAR DE UNA FILA DE catalog_version POR ENTIDAD.
+class CatalogImport(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(30), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    first_uid = db.Column(db.Integer, nullable=False)
+    last_uid = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (db.Index("ix_catalog_import_table_name_version", "table_name", "version"),)
+
+    def serialize(self):
+        return {
+            "table_name":self.table_name,
+            "version":self.version,
+            "first_uid":self.first_uid,
+            "last_uid":self.last_uid,
+        }
+
+#CUÁNTOS USUARIOS TIENEN CADA ENTIDAD EN FAVORITOS (kind ES people, planets O vehicles). VER popularity.py.
+class FavoriteCount(db.Model):
+    kind = db.Column(db.String(30), primary_key=True)
+    uid = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index("ix_favorite_count_kind_count_uid", "kind", "count", "uid"),)
+
+    def serialize(self):
+        return {
+            "kind":self.kind,
+            "uid":self.uid,
+            "count":self.count,
+        }
@@ -0,0 +1,169 @@
+"""Hash y verificación de contraseñas con bcrypt fuera del worker que atiende el request.
+
+bcrypt es trabajo de CPU puro; se envía a un pool de procesos acotado. El número
+de operaciones en curso está limitado para TODOS los workers de la máquina
+(PASSWORD_QUEUE_LIMIT, con archivos bloqueados con flock). Si no hay cupo se
+responde 429 de inmediato en vez de dejar al worker esperando, así una ráfaga de
+logins no deja sin workers a los GET del catálogo.
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+try:
+    import fcntl
+except ImportError:  # Windows: el límite queda por proceso
+    fcntl = None
+
+import bcrypt
+
+from utils import APIException
+
+BUSY = {"message":"Demasiadas solicitudes, intenta de nuevo en unos segundos"}
+
+
+#ESTAS FUNCIONES CORREN EN LOS PROCESOS DEL POOL, POR ESO SON DE NIVEL DE MÓDULO.
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+def _check_password(pw_hash, password):
+    return bcrypt.checkpw(password.encode("utf-8"), pw_hash.encode("utf-8"))
+
+
+def rounds_of(pw_hash):
+    #Un hash de bcrypt tiene la forma $2b$<costo>$<salt+hash>
+    try:
+        return int(pw_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class SlotPool:
+    """Cupos compartidos entre procesos: un archivo por cupo, tomado con flock sin bloquear."""
+
+    def __init__(self, size, directory=None):
+        self.size = max(size, 1)
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "password-slots")
+        self._lock = threading.Lock()
+        self._busy = set()
+        self._fds = {}
+        self._pid = None
+
+    def _fd(self, slot):
+        #Los descriptores heredados por fork comparten el lock con el padre, se abren de nuevo.
+        if self._pid != os.getpid():
+            self._fds, self._busy, self._pid = {}, set(), os.getpid()
+        if slot not in self._fds:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, "slot-%d" % slot)
+            self._fds[slot] = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+        return self._fds[slot]
+
+    def acquire(self):
+        with self._lock:
+            for slot in range(self.size):
+                if slot in self._busy and self._pid == os.getpid():
+                    continue
+                fd = self._fd(slot)
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                self._busy.add(slot)
+                return slot
+        return None
+
+    def release(self, slot):
+        with self._lock:
+            if fcntl is not None and slot in self._fds:
+                fcntl.flock(self._fds[slot], fcntl.LOCK_UN)
+            self._busy.discard(slot)
+
+
+class PasswordHasher:
+    def __init__(self, rounds=10, pool_size=2, queue_limit=8, timeout=10):
+        self.configure(rounds, pool_size, queue_limit, timeout)
+        self._executor = None
+        self._pid = None
+
+    def configure(self, rounds, pool_size, queue_limit, timeout, slots_dir=None):
+        self.rounds = rounds
+        self.pool_size = pool_size  # 0 = se calcula en el mismo worker (útil en desarrollo)
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._slots = SlotPool(queue_limit, slots_dir)
+
+    def init_app(self, app):
+        self.configure(
+            int(app.config.get("BCRYPT_LOG_ROUNDS", self.rounds)),
+            int(app.config.get("PASSWORD_POOL_SIZE", self.pool_size)),
+            int(app.config.get("PASSWORD_QUEUE_LIMIT", self.queue_limit)),
+            float(app.config.get("PASSWORD_TIMEOUT", self.timeout)),
+            app.config.get("PASSWORD_SLOTS_DIR"),
+        )
+        app.extensions["password_hasher"] = self
+
+    def _get_executor(self):
+        #El pool se crea en el proceso que lo usa: un pool heredado por fork no sirve.
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ProcessPoolExecutor(max_workers=self.pool_size)
+            self._pid = os.getpid()
+        return self._executor
+
+    def start(self):
+        #Levanta los procesos del pool antes del primer login (ver warmup.py).
+        if self.pool_size > 0:
+            executor = self._get_executor()
+            for future in [executor.submit(os.getpid) for _ in range(self.pool_size)]:
+                future.result()
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    def _run(self, fn, *args):
+        slot = self._slots.acquire()
+        if slot is None:
+            raise APIException(BUSY, status_code=429)
+
+        if self.pool_size <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release(slot)
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release(slot)
+            raise
+        future.add_done_callback(lambda _: self._slots.release(slot))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            #El pool está saturado: se responde igual que sin cupo. Si todavía no empezó, no se calcula.
+            future.cancel()
+            raise APIException(BUSY, status_code=429)
+
+    def hash(self, password):
+        try:
+            return self._run(_hash_password, password, self.rounds)
+        except ValueError:
+            #Contraseña que bcrypt no acepta (por ejemplo, texto que no se puede codificar en UTF-8).
+            raise APIException({"message":"contraseña inválida"}, status_code=400)
+
+    def check(self, pw_hash, password):
+        try:
+            return self._run(_check_password, pw_hash, password)
+        except ValueError:
+            #Hash inválido en la base de datos (por ejemplo, una contraseña guardada en texto plano).
+            return False
+
+    def needs_rehash(self, pw_hash):
+        return rounds_of(pw_hash) != self.rounds
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,117 @@
+"""Contadores de favoritos por entidad y ranking de los más favoritos.
+
+favorite_count guarda (tipo, uid, cantidad). Las altas y bajas de favoritos
+suben o bajan el contador dentro de la misma transacción con una sola sentencia
+atómica (INSERT ... ON CONFLICT DO UPDATE count = count + n / UPDATE count =
+count - 1), así dos requests concurrentes nunca pierden un incremento.
+
+reconcile() vuelve a contar desde las tablas de favoritos y corrige las filas
+que no coincidan (por ejemplo si alguien borró favoritos a mano). Se corre con
+"flask reconcile-favorites" desde un cron o un proceso aparte.
+"""
+from sqlalchemy import and_, exists, func, insert, literal, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from metrics import metrics
+from models import db, FavoriteCount, People, Planets, Vehicles, FavoritePeople, FavoritePlanets, FavoriteVehicles
+
+#TIPO (NOMBRE DE LA TABLA DE LA ENTIDAD) -> (ENTIDAD, TABLA DE FAVORITOS, COLUMNA).
+COUNTED = {
+    "people": (People, FavoritePeople, "people_uid"),
+    "planets": (Planets, FavoritePlanets, "planet_uid"),
+    "vehicles": (Vehicles, FavoriteVehicles, "vehicle_uid"),
+}
+
+
+def increment(kind, uids):
+    #Un uid repetido suma varias veces. Se ordenan para que dos lotes tomen los candados en el mismo orden.
+    counts = {}
+    for uid in uids:
+        counts[uid] = counts.get(uid, 0) + 1
+    if not counts:
+        return
+    values = [{"kind": kind, "uid": uid, "count": counts[uid]} for uid in sorted(counts)]
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        stmt = (postgresql if dialect == "postgresql" else sqlite).insert(FavoriteCount).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FavoriteCount.kind, FavoriteCount.uid],
+            set_={"count": FavoriteCount.count + stmt.excluded["count"]},
+        )
+        db.session.execute(stmt)
+    elif dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(FavoriteCount).values(values)
+        db.session.execute(stmt.on_duplicate_key_update(count=FavoriteCount.count + stmt.inserted["count"]))
+    else:
+        for value in values:
+            result = db.session.execute(
+                update(FavoriteCount)
+                .where(FavoriteCount.kind == kind, FavoriteCount.uid == value["uid"])
+                .values(count=FavoriteCount.count + value["count"])
+            )
+            if result.rowcount == 0:
+                db.session.execute(insert(FavoriteCount).values(value))
+
+
+def decrement(kind, uids):
+    uids = sorted(set(uids))
+    if not uids:
+        return
+    db.session.execute(
+        update(FavoriteCount)
+        .where(FavoriteCount.kind == kind, FavoriteCount.uid.in_(uids), FavoriteCount.count > 0)
+        .values(count=FavoriteCount.count - 1)
+    )
+
+
+def top_query(kind, limit):
+    #Sale del índice (kind, count, uid): no depende de cuántos favoritos haya.
+    entity = COUNTED[kind][0]
+    return (
+        select(FavoriteCount.uid, entity.name, FavoriteCount.count)
+        .join(entity, entity.uid == FavoriteCount.uid)
+        .where(FavoriteCount.kind == kind, FavoriteCount.count > 0)
+        .order_by(FavoriteCount.count.desc(), FavoriteCount.uid.desc())
+        .limit(limit)
+    )
+
+def top_rows(rows):
+    return [{"uid": uid, "name": name, "favorites": count} for uid, name, count in rows]
+
+def top(kind, limit):
+    return top_rows(db.session.execute(top_query(kind, limit)).all())
+
+
+def reconcile():
+    """Corrige los contadores que no coinciden con las tablas de favoritos. Devuelve cuántos arregló."""
+    repaired = 0
+    for kind, (_, favorites, column) in COUNTED.items():
+        favorite_column = getattr(favorites, column)
+        actual = select(func.count()).select_from(favorites).where(favorite_column == FavoriteCount.uid).scalar_subquery()
+
+        #1. Contadores que existen pero no coinciden (incluye los que deberían quedar en 0).
+        result = db.session.execute(
+            update(FavoriteCount)
+            .where(FavoriteCount.kind == kind, FavoriteCount.count != actual)
+            .values(count=actual)
+            .execution_options(synchronize_session=False)
+        )
+        repaired += max(result.rowcount, 0)
+
+        #2. Entidades con favoritos que todavía no tienen contador.
+        missing = (
+            select(literal(kind), favorite_column, func.count())
+            .where(~exists().where(and_(FavoriteCount.kind == kind, FavoriteCount.uid == favorite_column)))
+            .group_by(favorite_column)
+        )
+        result = db.session.execute(insert(FavoriteCount).from_select(["kind", "uid", "count"], missing))
+        repaired += max(result.rowcount, 0)
+
+    db.session.commit()
+    if repaired:
+        metrics.inc("favorite_counters_repaired_total", repaired)
+    return repaired
+
+
+metrics.describe("favorite_counters_repaired_total", "counter", "Contadores de favoritos corregidos por la reconciliación.")
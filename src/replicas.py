@@ -0,0 +1,141 @@
+"""Lecturas en réplicas (DATABASE_REPLICA_URLS) y escrituras en la base principal.
+
+Las vistas marcadas con @replica_read leen de una réplica, elegida una vez por
+request con REPLICA_SELECTION: "round_robin" (por defecto) o
+"least_connections" (la que tenga menos conexiones en uso en este worker).
+Todo lo demás usa la base principal.
+
+Se usa la principal aunque la vista esté marcada cuando:
+- la sentencia es un INSERT/UPDATE/DELETE o la sesión ya escribió algo;
+- el cliente escribió hace menos de REPLICA_PIN_SECONDS (cookie
+  "db_primary_until", que se pone al hacer commit de una escritura) y así
+  siempre lee lo que acaba de escribir;
+- el request trae "X-Read-Consistency: strong".
+
+Para probarlo en local con dos sqlite:
+
+    DATABASE_URL=sqlite:////tmp/primary.db
+    DATABASE_REPLICA_URLS=sqlite:////tmp/replica1.db,sqlite:////tmp/replica2.db
+
+(las "réplicas" son copias del archivo principal: cp /tmp/primary.db /tmp/replica1.db).
+"""
+import itertools
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+
+from engine import configure_engine, engine_options
+from metrics import metrics
+
+PIN_COOKIE = "db_primary_until"
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and replica_set.engines and self._can_use_replica(clause):
+            engine = self.info.get("replica")
+            if engine is None:
+                engine = self.info["replica"] = replica_set.pick()
+            return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _can_use_replica(self, clause):
+        if not has_request_context() or not g.get("replica_read") or g.get("pin_primary"):
+            return False
+        if clause is not None and getattr(clause, "is_dml", False):
+            return False
+        return not (self.info.get("wrote") or self.new or self.dirty or self.deleted)
+
+
+class ReplicaSet:
+    def __init__(self):
+        self.engines = []
+        self._names = {}
+        self.selection = "round_robin"
+        self.pin_seconds = 5
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        urls = [url.strip() for url in (app.config.get("DATABASE_REPLICA_URLS") or "").split(",") if url.strip()]
+        self.selection = app.config.get("REPLICA_SELECTION", self.selection)
+        if self.selection not in ("round_robin", "least_connections"):
+            raise ValueError("REPLICA_SELECTION debe ser round_robin o least_connections")
+        self.pin_seconds = float(app.config.get("REPLICA_PIN_SECONDS", self.pin_seconds))
+        profile = app.config["DATABASE_PROFILE"]
+
+        self.engines, self._names = [], {}
+        for index, url in enumerate(urls):
+            url = url.replace("postgres://", "postgresql://")
+            engine = create_engine(url, **engine_options(url, profile))
+            configure_engine(engine, "replica-%d" % index, profile)
+            self.engines.append(engine)
+            self._names[engine] = "replica-%d" % index
+        self._cycle = itertools.cycle(range(len(self.engines)))
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.extensions["replica_set"] = self
+
+    def pick(self):
+        if self.selection == "least_connections":
+            engine = min(self.engines, key=lambda engine: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0)
+        else:
+            with self._lock:
+                engine = self.engines[next(self._cycle)]
+        metrics.inc("db_replica_reads_total", engine=self._names[engine])
+        return engine
+
+    def _before_request(self):
+        pinned_until = request.cookies.get(PIN_COOKIE)
+        try:
+            pinned = pinned_until is not None and float(pinned_until) > time.time()
+        except ValueError:
+            pinned = False
+        g.pin_primary = pinned or request.headers.get("X-Read-Consistency") == "strong"
+
+    def _after_request(self, response):
+        if g.pop("wrote_primary", False) and self.engines:
+            response.set_cookie(PIN_COOKIE, "%.3f" % (time.time() + self.pin_seconds),
+                                max_age=int(self.pin_seconds) + 1, httponly=True, samesite="Lax")
+        return response
+
+
+replica_set = ReplicaSet()
+
+
+def replica_read(view):
+    """Marca una vista de solo lectura para que pueda leer de una réplica."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.replica_read = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+#UNA SESIÓN QUE ESCRIBIÓ YA NO VUELVE A LA RÉPLICA, Y SU COMMIT FIJA AL CLIENTE EN LA PRINCIPAL UN RATO.
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "before_flush")
+def _mark_flush(session, flush_context, instances):
+    session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_after_commit(session):
+    if session.info.pop("wrote", False) and has_request_context():
+        g.wrote_primary = True
+    session.info.pop("replica", None)
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("wrote", None)
+
+
+metrics.describe("db_replica_reads_total", "counter", "Requests de lectura enviados a cada réplica.")
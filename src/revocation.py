@@ -0,0 +1,135 @@
+"""Cache en memoria (por worker) de los tokens bloqueados con /logout.
+
+verificacionToken() ya no consulta TokenBlokedList en cada request: cada worker
+mantiene un set con los jti bloqueados que todavía no expiran y lo sincroniza
+de forma incremental cada REVOCATION_SYNC_SECONDS. Un jti que no está en el
+set no toca la base de datos.
+
+La sincronización incremental no puede fiarse solo del id: en Postgres el id
+sale de una secuencia al insertar y dos logouts pueden hacer commit en otro
+orden, así que una fila con id menor puede aparecer después de que el worker
+ya vio una mayor. Por eso también se vuelven a leer las filas creadas durante
+los últimos REVOCATION_SYNC_OVERLAP_SECONDS antes de la sincronización
+anterior, y cada REVOCATION_FULL_SYNC_SECONDS se leen todas las que no han
+expirado (la tabla solo tiene sesiones cerradas vigentes).
+
+Cada fila guarda expires_at (el "exp" del token). Un token expirado ya no pasa
+la validación de JWT, así que su fila sobra: el cache la olvida y
+purge_expired() la borra ("flask purge-revoked-tokens", una vez o cada
+--every segundos). La tabla queda del tamaño de las sesiones cerradas que
+todavía no expiran.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, or_, select
+
+from metrics import metrics
+from models import db, TokenBlokedList
+
+
+def expiry_datetime(exp):
+    #"exp" del JWT (segundos desde 1970) -> datetime UTC sin zona, como se guarda expires_at.
+    return None if exp is None else datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RevocationCache:
+    def __init__(self, sync_interval=5, overlap=60, full_sync_interval=300):
+        self.sync_interval = sync_interval
+        self.overlap = overlap
+        self.full_sync_interval = full_sync_interval
+        self._revoked = OrderedDict()  # {jti: timestamp de expiración}, en orden de llegada
+        self._permanent = set()  # jti sin "exp": nunca se purgan y no deben frenar la purga de los demás
+        self._last_id = 0
+        self._synced_at = None
+        self._full_synced_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.sync_interval = float(app.config.get("REVOCATION_SYNC_SECONDS", self.sync_interval))
+        self.overlap = float(app.config.get("REVOCATION_SYNC_OVERLAP_SECONDS", self.overlap))
+        self.full_sync_interval = float(app.config.get("REVOCATION_FULL_SYNC_SECONDS", self.full_sync_interval))
+        app.extensions["revocation_cache"] = self
+
+    def _sync(self, now):
+        #Solo el jti y la expiración de las filas que todavía no expiran.
+        query = select(TokenBlokedList.id, TokenBlokedList.token, TokenBlokedList.expires_at).where(
+            TokenBlokedList.is_blocked == True,
+            or_(TokenBlokedList.expires_at.is_(None), TokenBlokedList.expires_at > expiry_datetime(now)),
+        )
+        full = self._full_synced_at is None or now - self._full_synced_at >= self.full_sync_interval
+        if not full:
+            #Las nuevas por id y, por si alguna hizo commit fuera de orden, las creadas cerca de la última sincronización.
+            query = query.where(or_(TokenBlokedList.id > self._last_id,
+                                    TokenBlokedList.create_at >= expiry_datetime(self._synced_at - self.overlap)))
+        rows = db.session.execute(query.order_by(TokenBlokedList.id)).all()
+        for row_id, jti, expires_at in rows:
+            self._remember(jti, None if expires_at is None else expires_at.replace(tzinfo=timezone.utc).timestamp())
+            self._last_id = max(self._last_id, row_id)
+        self._synced_at = now
+        if full:
+            self._full_synced_at = now
+
+    def _purge(self, now):
+        #Como los jti llegan más o menos en orden, los expirados están al inicio.
+        while self._revoked:
+            jti, expires_at = next(iter(self._revoked.items()))
+            if expires_at > now:
+                break
+            del self._revoked[jti]
+
+    def _remember(self, jti, expires_at):
+        if expires_at is None:
+            self._permanent.add(jti)
+        else:
+            #Un jti que ya estaba se vuelve a asignar igual: no se duplica ni cambia de lugar.
+            self._revoked[jti] = expires_at
+
+    def add(self, jti, expires_at=None):
+        with self._lock:
+            self._remember(jti, expires_at)
+
+    def is_revoked(self, jti):
+        now = time.time()
+        with self._lock:
+            if self._synced_at is None or now - self._synced_at >= self.sync_interval:
+                self._sync(now)
+            self._purge(now)
+            return jti in self._revoked or jti in self._permanent
+
+    def clear(self):
+        with self._lock:
+            self._revoked.clear()
+            self._permanent.clear()
+            self._last_id = 0
+            self._synced_at = self._full_synced_at = None
+
+
+revocation_cache = RevocationCache()
+
+
+def purge_expired(batch_size=1000):
+    """Borra las filas de tokens que ya expiraron, en lotes cortos. Devuelve cuántas borró."""
+    purged = 0
+    while True:
+        ids = db.session.execute(
+            select(TokenBlokedList.id).where(TokenBlokedList.expires_at < _utcnow()).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(TokenBlokedList).where(TokenBlokedList.id.in_(ids)))
+        db.session.commit()
+        purged += len(ids)
+        if len(ids) < batch_size:
+            break
+    if purged:
+        metrics.inc("revoked_tokens_purged_total", purged)
+    return purged
+
+
+metrics.describe("revoked_tokens_purged_total", "counter", "Filas de tokens bloqueados borradas porque el token ya expiró.")
@@ -0,0 +1,234 @@
+"""Índice en memoria para autocompletar nombres de people, planets y vehicles.
+
+Cada worker guarda los nombres en dos listas ordenadas (nombre completo y cada
+palabra desde la segunda) para buscar prefijos con bisect, y un índice de
+trigramas para cuando el texto no es prefijo ("walk" -> "Luke Skywalker").
+
+Orden de los resultados: coincidencia exacta, prefijo del nombre, prefijo de
+otra palabra, subcadena y por último parecido por trigramas. Las búsquedas por
+prefijo solo recorren las primeras "limit" entradas que coinciden y las de
+trigramas empiezan por la lista más corta y revisan como máximo
+SEARCH_MAX_CANDIDATES entradas, así que el costo casi no depende del tamaño
+del catálogo.
+
+Se mantiene al día con las versiones del catálogo (versions.py): una escritura
+hecha en este worker marca el índice como vencido al hacer commit, y las de
+otros workers se ven al sincronizar cada SEARCH_SYNC_SECONDS. Al sincronizar
+solo se vuelven a leer las filas que cambiaron y los rangos de uid importados.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nsmallest
+from itertools import islice
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import db, CatalogVersion, People, Planets, Vehicles
+from versions import changed_since, imported_since
+
+KINDS = {model.__tablename__: model for model in (People, Planets, Vehicles)}
+
+
+def _trigrams(text, pad_end=True):
+    text = " " + text + (" " if pad_end else "")
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class NameIndex:
+    def __init__(self):
+        self.sync_interval = 2.0
+        self.min_similarity = 0.5
+        self.max_candidates = 1000
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._names = {}  # {(tipo, uid): nombre}
+        self._order = {}  # {(tipo, uid): (largo, nombre en minúsculas)}, para ordenar sin recalcular
+        self._full = []  # [(nombre en minúsculas, tipo, uid)]
+        self._words = []  # [(nombre desde la palabra i, tipo, uid)]
+        self._trigram_postings = {}  # {trigrama: {(tipo, uid)}}
+        self._versions = {}
+        self._synced_at = 0.0
+        self._stale = True
+
+    def init_app(self, app):
+        self.sync_interval = float(app.config.get("SEARCH_SYNC_SECONDS", self.sync_interval))
+        self.min_similarity = float(app.config.get("SEARCH_MIN_SIMILARITY", self.min_similarity))
+        self.max_candidates = int(app.config.get("SEARCH_MAX_CANDIDATES", self.max_candidates))
+        app.extensions["name_index"] = self
+        #SE ARMA EN LA PRIMERA BÚSQUEDA (O EN EL CALENTAMIENTO DE warmup.py), NO AL CREAR LA APP.
+        self._reset()
+
+    #MANTENIMIENTO DEL ÍNDICE
+    def _keys(self, kind, uid, name):
+        lowered = name.lower()
+        words = lowered.split()
+        suffixes = [" ".join(words[i:]) for i in range(1, len(words))]
+        return lowered, suffixes
+
+    def _add(self, kind, uid, name):
+        entry = (kind, uid)
+        lowered, suffixes = self._keys(kind, uid, name)
+        self._names[entry] = name
+        self._order[entry] = (len(lowered), lowered)
+        insort(self._full, (lowered, kind, uid))
+        for suffix in suffixes:
+            insort(self._words, (suffix, kind, uid))
+        for trigram in _trigrams(lowered):
+            self._trigram_postings.setdefault(trigram, set()).add(entry)
+
+    def _remove(self, kind, uid):
+        name = self._names.pop((kind, uid), None)
+        if name is None:
+            return
+        del self._order[(kind, uid)]
+        lowered, suffixes = self._keys(kind, uid, name)
+        _discard(self._full, (lowered, kind, uid))
+        for suffix in suffixes:
+            _discard(self._words, (suffix, kind, uid))
+        for trigram in _trigrams(lowered):
+            postings = self._trigram_postings.get(trigram)
+            if postings is not None:
+                postings.discard((kind, uid))
+                if not postings:
+                    del self._trigram_postings[trigram]
+
+    def _put(self, kind, uid, name):
+        if self._names.get((kind, uid)) == name:
+            return
+        self._remove(kind, uid)
+        if name:
+            self._add(kind, uid, name)
+
+    def sync(self):
+        #UNA CONSULTA PARA LAS TRES VERSIONES; SOLO SE LEEN FILAS DE LAS TABLAS QUE CAMBIARON.
+        versions = dict(db.session.execute(
+            select(CatalogVersion.table_name, CatalogVersion.version)
+            .where(CatalogVersion.uid == 0, CatalogVersion.table_name.in_(list(KINDS)))
+        ).all())
+        with self._lock:
+            for kind, model in KINDS.items():
+                version = versions.get(kind, 0)
+                if kind in self._versions and self._versions[kind] == version:
+                    continue
+                query = select(model.uid, model.name)
+                if kind not in self._versions:
+                    for uid, name in db.session.execute(query):
+                        self._put(kind, uid, name)
+                else:
+                    changed = list(changed_since(kind, self._versions[kind]))
+                    found = set()
+                    for start in range(0, len(changed), 500):
+                        for uid, name in db.session.execute(query.where(model.uid.in_(changed[start:start + 500]))):
+                            found.add(uid)
+                            self._put(kind, uid, name)
+                    for uid in set(changed) - found:
+                        self._remove(kind, uid)
+                    #Importaciones masivas: el rango de uid de cada commit (no tienen versión por fila).
+                    for first_uid, last_uid in imported_since(kind, self._versions[kind]):
+                        for uid, name in db.session.execute(query.where(model.uid.between(first_uid, last_uid))):
+                            self._put(kind, uid, name)
+                self._versions[kind] = version
+            self._synced_at = time.time()
+            self._stale = False
+
+    def mark_stale(self):
+        self._stale = True
+
+    #BÚSQUEDA
+    def _prefix(self, entries, text, kinds, limit, seen, results, rank):
+        index = bisect_left(entries, (text,))
+        while index < len(entries) and len(results) < limit:
+            key, kind, uid = entries[index]
+            if not key.startswith(text):
+                break
+            index += 1
+            if (kind, uid) in seen or (kinds and kind not in kinds):
+                continue
+            seen.add((kind, uid))
+            results.append((0 if key == text and rank == 1 else rank, kind, uid))
+
+    def _trigram_search(self, text, kinds, limit, seen, results):
+        #Las listas de trigramas se recorren de la más corta a la más larga y
+        #nunca se revisan más de SEARCH_MAX_CANDIDATES entradas por grupo.
+        wanted = sorted(_trigrams(text, pad_end=False), key=lambda trigram: len(self._trigram_postings.get(trigram, ())))
+        postings = [self._trigram_postings.get(trigram, EMPTY) for trigram in wanted]
+
+        def allowed(entries):
+            entries = entries - seen
+            return {entry for entry in entries if entry[0] in kinds} if kinds else entries
+
+        #Subcadena: todos los trigramas (menos el de inicio de palabra) están en el nombre.
+        inner = [entries for trigram, entries in zip(wanted, postings) if not trigram.startswith(" ")]
+        if inner:
+            found = set(islice(inner[0], self.max_candidates))
+            for entries in inner[1:]:
+                found &= entries
+            for entry in nsmallest(limit - len(results), allowed(found), key=self._order.__getitem__):
+                seen.add(entry)
+                results.append((3,) + entry)
+
+        #Parecido: al menos SEARCH_MIN_SIMILARITY de los trigramas. Un candidato así tiene que
+        #estar en alguna de las (n - mínimo + 1) listas más cortas.
+        minimum = max(1, int(self.min_similarity * len(wanted) + 0.999))
+        seeds = postings[:len(wanted) - minimum + 1]
+        if len(results) < limit and sum(len(entries) for entries in seeds) <= self.max_candidates:
+            candidates = allowed(set().union(*seeds))
+            hits = Counter()
+            for entries in postings:
+                hits.update(entries & candidates)
+            best = nsmallest(limit - len(results), (entry for entry, count in hits.items() if count >= minimum),
+                             key=lambda entry: (-hits[entry], self._order[entry]))
+            for entry in best:
+                results.append((4,) + entry)
+
+    def search(self, text, limit=10, kinds=None):
+        if self._stale or time.time() - self._synced_at >= self.sync_interval:
+            self.sync()
+
+        text = " ".join(text.lower().split())
+        if not text:
+            return []
+        kinds = set(kinds or ())
+        with self._lock:
+            seen, results = set(), []
+            self._prefix(self._full, text, kinds, limit, seen, results, 1)
+            self._prefix(self._words, text, kinds, limit, seen, results, 2)
+
+            if len(results) < limit and len(text) >= 3:
+                self._trigram_search(text, kinds, limit, seen, results)
+
+            #Dentro de cada grupo (exacto / prefijo / palabra) primero los nombres más cortos.
+            results.sort(key=lambda item: (item[0], self._order[item[1:]][0] if item[0] < 3 else 0))
+            return [
+                {"kind": kind, "uid": uid, "name": self._names[(kind, uid)], "match": MATCHES[rank]}
+                for rank, kind, uid in results
+            ]
+
+
+MATCHES = ("exact", "prefix", "word", "substring", "fuzzy")
+EMPTY = frozenset()
+
+
+def _discard(entries, item):
+    index = bisect_left(entries, item)
+    if index < len(entries) and entries[index] == item:
+        del entries[index]
+
+
+name_index = NameIndex()
+
+
+#Una escritura del catálogo (bump_versions) deja el índice vencido en cuanto se hace commit.
+@event.listens_for(Session, "after_commit")
+def _mark_stale_after_commit(session):
+    if session.info.pop("catalog_changed", None):
+        name_index.mark_stale()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("catalog_changed", None)
@@ -0,0 +1,123 @@
+"""Catálogo completo pre-codificado (y pre-comprimido) para /<tipo>/all.
+
+Cada worker guarda un fragmento JSON ya codificado por fila. Cuando cambia la
+versión de la tabla (ver versions.py) solo se vuelven a consultar y codificar
+las filas que cambiaron (changed_since) y los rangos de uid de las
+importaciones masivas (imported_since); el resto del catálogo no se toca. El blob completo se arma uniendo
+los fragmentos y, como sus versiones comprimidas (una por codificación, ver
+compress.py), se guarda hasta el siguiente cambio.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from flask import current_app, request
+
+from compress import response_compressor
+from models import db, People, Planets, Vehicles
+from serializers import serializer_for
+from versions import changed_since, imported_since, table_version
+
+IN_CHUNK = 500
+
+
+class CatalogSnapshot:
+    def __init__(self, model):
+        self.model = model
+        self.table_name = model.__tablename__
+        self.serializer = serializer_for(model)
+        self.version = None
+        self._fragments = {}  # {uid: bytes}
+        self._uids = []  # ordenados
+        self._body = None
+        self._encoded = {}  # {codificación: bytes}
+        self._lock = threading.Lock()
+
+    def _encode(self, row):
+        return current_app.json.dumps(self.serializer.from_row(row)).encode("utf-8")
+
+    def _put(self, row):
+        uid = getattr(row, self.serializer.key)
+        if uid not in self._fragments:
+            insort(self._uids, uid)
+        self._fragments[uid] = self._encode(row)
+
+    def _drop(self, uid):
+        if self._fragments.pop(uid, None) is not None:
+            del self._uids[bisect_left(self._uids, uid)]
+
+    def _rows(self, query):
+        return query.order_by(self.serializer.key_column).yield_per(1000)
+
+    def _full_build(self, version):
+        self._fragments, self._uids = {}, []
+        for row in self._rows(self.serializer.query(db.session)):
+            self._put(row)
+        self.version = version
+
+    def _incremental(self, version):
+        key_column = self.serializer.key_column
+        changed = list(changed_since(self.table_name, self.version))
+        found = set()
+        for start in range(0, len(changed), IN_CHUNK):
+            chunk = changed[start:start + IN_CHUNK]
+            for row in self._rows(self.serializer.query(db.session).filter(key_column.in_(chunk))):
+                found.add(getattr(row, self.serializer.key))
+                self._put(row)
+        #Las que cambiaron y ya no están fueron eliminadas.
+        for uid in set(changed) - found:
+            self._drop(uid)
+        #Las importaciones masivas no tienen versión por fila: se lee el rango de uid de cada commit.
+        for first_uid, last_uid in imported_since(self.table_name, self.version):
+            for row in self._rows(self.serializer.query(db.session).filter(key_column.between(first_uid, last_uid))):
+                self._put(row)
+        self.version = version
+
+    def refresh(self):
+        version = table_version(self.table_name)
+        if version == self.version:
+            return version
+        with self._lock:
+            if version != self.version:
+                if self.version is None:
+                    self._full_build(version)
+                else:
+                    self._incremental(version)
+                self._body, self._encoded = None, {}
+        return version
+
+    def body(self):
+        with self._lock:
+            if self._body is None:
+                self._body = b"[" + b",".join(self._fragments[uid] for uid in self._uids) + b"]"
+            return self._body
+
+    def encoded_body(self, encoding):
+        body = self.body()
+        with self._lock:
+            if encoding not in self._encoded:
+                self._encoded[encoding] = response_compressor.compress(body, encoding)
+            return self._encoded[encoding]
+
+    def response(self):
+        version = self.refresh()
+        etag = "%s-all-%d" % (self.table_name, version)
+        encoding = response_compressor.choose(request.accept_encodings, "application/json", len(self.body()))
+        if encoding:
+            etag += "-" + encoding
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            body = self.encoded_body(encoding) if encoding else self.body()
+            response = current_app.response_class(body, mimetype="application/json")
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+
+        response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = "public, max-age=%d, must-revalidate" % current_app.config.get("CATALOG_MAX_AGE", 0)
+        return response
+
+
+#UN SNAPSHOT POR TABLA DEL CATÁLOGO, POR WORKER.
+catalog_snapshots = {model.__tablename__: CatalogSnapshot(model) for model in (People, Planets, Vehicles)}
@@ -0,0 +1,36 @@
+"""Respuestas JSON en streaming para leer una colección completa.
+
+Las filas se recorren con yield_per (cursor del lado del servidor en los drivers
+que lo soportan) y se codifican una por una, así la memoria no depende del
+tamaño de la tabla.
+"""
+from flask import current_app, stream_with_context
+
+from models import db
+
+STREAM_BATCH_SIZE = 1000
+
+
+def iter_json_array(rows, encode):
+    yield b"["
+    first = True
+    for row in rows:
+        if not first:
+            yield b","
+        first = False
+        yield encode(row)
+    yield b"]"
+
+def stream_collection(query, key_column, serialize, batch_size=STREAM_BATCH_SIZE):
+    dumps = current_app.json.dumps
+
+    def encode(row):
+        return dumps(serialize(row)).encode("utf-8")
+
+    def generate():
+        rows = query.order_by(key_column).yield_per(batch_size)
+        yield from iter_json_array(rows, encode)
+        #La sesión se suelta apenas termina el stream, no al cerrar la respuesta.
+        db.session.remove()
+
+    return current_app.response_class(stream_with_context(generate()), mimetype="application/json")
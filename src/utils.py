@@ -21,7 +21,14 @@ def has_no_empty_params(rule):
     return len(defaults) >= len(arguments)
 
 def generate_sitemap(app):
-    links = ['/admin/']
+    #EL HTML SOLO DEPENDE DE LAS RUTAS REGISTRADAS: SE ARMA UNA VEZ POR APP.
+    html = app.extensions.get("sitemap")
+    if html is None:
+        html = app.extensions["sitemap"] = _build_sitemap(app)
+    return html
+
+def _build_sitemap(app):
+    links = ['/admin/'] if "admin" in app.extensions else []
     for rule in app.url_map.iter_rules():
         # Filter out rules we can't navigate to in a browser
         # and rules that require parameters
@@ -39,3 +46,36 @@ def generate_sitemap(app):
         <p>Start working on your proyect by following the <a href="https://start.4geeksacademy.com/starters/flask" target="_blank">Quick Start</a></p>
         <p>Remember to specify a real endpoint path like: </p>
         <ul style="text-align: left;">"""+links_html+"</ul></div>"
+
+#PAGINACIÓN POR CURSOR (KEYSET): SIEMPRE SE FILTRA POR "key > after" Y SE ORDENA POR LA LLAVE,
+#ASÍ CADA PÁGINA CUESTA LO MISMO SIN IMPORTAR QUÉ TAN GRANDE SEA LA TABLA.
+def read_page_args(args, default_size, max_size):
+    try:
+        limit = int(args.get("limit", default_size))
+        after = args.get("after")
+        after = int(after) if after not in (None, "") else None
+    except ValueError:
+        raise APIException({"message":"limit y after deben ser números enteros"}, status_code=400)
+
+    if limit < 1:
+        raise APIException({"message":"limit debe ser mayor que cero"}, status_code=400)
+
+    return min(limit, max_size), after
+
+def keyset_query(query, key_column, limit, after=None):
+    if after is not None:
+        query = query.filter(key_column > after)
+
+    #Se pide un registro de más para saber si existe una página siguiente.
+    return query.order_by(key_column).limit(limit + 1)
+
+def keyset_rows(rows, key_column, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = getattr(rows[-1], key_column.key)
+
+    return rows, next_cursor
+
+def keyset_page(query, key_column, limit, after=None):
+    return keyset_rows(keyset_query(query, key_column, limit, after).all(), key_column, limit)
@@ -0,0 +1,149 @@
+"""Versiones del catálogo y GET condicionales (ETag / If-None-Match).
+
+Cada escritura del catálogo llama a bump_version() dentro de su transacción. Con
+eso el ETag de una colección o de un detalle se arma con una sola consulta por
+llave primaria a catalog_version, y si el cliente ya tiene esa versión se
+responde 304 sin consultar ni serializar filas.
+
+Las importaciones masivas (importer.py) no escriben una versión por fila: cada
+commit sube la versión de la tabla una vez y guarda su rango de uid en
+catalog_import (bump_imported). La versión de una fila es la mayor entre la
+suya propia y la de la última importación cuyo rango la incluye.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, g, make_response, request
+from sqlalchemy import func, select, union_all, update
+
+from models import db, CatalogImport, CatalogVersion
+from cache import entity_cache
+from compress import response_compressor
+
+
+def bump_versions(table_name, uids):
+    #SUBE LA VERSIÓN DE LA TABLA UNA VEZ Y MARCA CADA FILA CON ESA VERSIÓN. NO HACE COMMIT.
+    session = db.session
+    result = session.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.table_name == table_name, CatalogVersion.uid == 0)
+        .values(version=CatalogVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        session.add(CatalogVersion(table_name=table_name, uid=0, version=1))
+        session.flush()
+    version = table_version(table_name)
+    #Los índices en memoria (search.py) se enteran al hacer commit.
+    session.info.setdefault("catalog_changed", set()).add(table_name)
+
+    uids = set(uids)
+    if uids:
+        existing = set(session.execute(
+            select(CatalogVersion.uid).where(CatalogVersion.table_name == table_name, CatalogVersion.uid.in_(uids))
+        ).scalars())
+        if existing:
+            session.execute(
+                update(CatalogVersion)
+                .where(CatalogVersion.table_name == table_name, CatalogVersion.uid.in_(existing))
+                .values(version=version)
+                .execution_options(synchronize_session=False)
+            )
+        session.add_all([CatalogVersion(table_name=table_name, uid=uid, version=version) for uid in uids - existing])
+        session.flush()
+        entity_cache.invalidate_on_commit(session, table_name, uids)
+    return version
+
+def bump_version(table_name, uid):
+    return bump_versions(table_name, [uid])
+
+def bump_imported(table_name, first_uid, last_uid):
+    #UNA IMPORTACIÓN: SUBE LA VERSIÓN DE LA TABLA Y GUARDA EL RANGO, SIN TOCAR catalog_version POR FILA. NO HACE COMMIT.
+    version = bump_versions(table_name, ())
+    db.session.add(CatalogImport(table_name=table_name, version=version, first_uid=first_uid, last_uid=last_uid))
+    db.session.flush()
+    return version
+
+def version_query(table_name, uid=0):
+    #uid=0 es la versión de la tabla completa.
+    return select(CatalogVersion.version).where(CatalogVersion.table_name == table_name, CatalogVersion.uid == uid)
+
+def row_version_query(table_name, uid):
+    #La versión propia de la fila o la de la última importación que la incluyó, la mayor.
+    imported = (
+        select(func.max(CatalogImport.version).label("version"))
+        .where(CatalogImport.table_name == table_name, CatalogImport.first_uid <= uid, CatalogImport.last_uid >= uid)
+    )
+    versions = union_all(version_query(table_name, uid), imported).subquery()
+    return select(func.max(versions.c.version))
+
+def table_version(table_name):
+    return db.session.execute(version_query(table_name)).scalar() or 0
+
+def row_version(table_name, uid):
+    return db.session.execute(row_version_query(table_name, uid)).scalar() or 0
+
+def changed_since(table_name, version):
+    #Filas que cambiaron después de "version": {uid: versión}. Sirve para actualizar caches de forma incremental.
+    #Las filas importadas no aparecen aquí sino en imported_since().
+    return dict(db.session.execute(
+        select(CatalogVersion.uid, CatalogVersion.version)
+        .where(CatalogVersion.table_name == table_name, CatalogVersion.uid > 0, CatalogVersion.version > version)
+    ).all())
+
+def imported_since(table_name, version):
+    #Rangos (primer uid, último uid) importados después de "version".
+    return db.session.execute(
+        select(CatalogImport.first_uid, CatalogImport.last_uid)
+        .where(CatalogImport.table_name == table_name, CatalogImport.version > version)
+        .order_by(CatalogImport.version)
+    ).all()
+
+
+def args_hash(items):
+    #La misma versión con otros parámetros (?limit=, ?after=, ?fields=) es otra respuesta. Los parámetros
+    #van escapados (urlencode) y con un digest de 128 bits: dos consultas distintas no comparten ETag.
+    args = urlencode(sorted(items))
+    return hashlib.blake2b(args.encode("utf-8"), digest_size=16).hexdigest()
+
+def _args_hash():
+    return args_hash(request.args.items(multi=True))
+
+def collection_etag(table_name):
+    return "%s-%d-%s" % (table_name, table_version(table_name), _args_hash())
+
+def entity_etag(table_name, uid, version=None):
+    if version is None:
+        version = row_version(table_name, uid)
+    return "%s-%d-%d-%s" % (table_name, uid, version, _args_hash())
+
+
+def conditional(table_name):
+    """Agrega ETag y Cache-Control a una ruta del catálogo y responde 304 si el cliente ya tiene la versión."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            uid = kwargs.get("uid")
+            if uid is None:
+                etag = collection_etag(table_name)
+            else:
+                #La vista puede usar la versión de la fila para validar su cache sin otra consulta.
+                g.row_version = row_version(table_name, uid)
+                etag = entity_etag(table_name, uid, g.row_version)
+
+            #EL CLIENTE PUEDE TENER LA VARIANTE COMPRIMIDA DEL ETAG ("...-gzip", VER compress.py).
+            matched = response_compressor.matching_etag(request.if_none_match, etag)
+            if matched:
+                response = current_app.response_class(status=304)
+                etag = matched
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "public, max-age=%d, must-revalidate" % current_app.config.get("CATALOG_MAX_AGE", 0)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,74 @@
+"""Calentamiento antes de recibir tráfico y manejo de los engines alrededor del fork.
+
+Con gunicorn.conf.py la app se importa una sola vez en el master (preload_app)
+y warm_up() pasa un request por cada ruta de lectura: quedan armados el
+snapshot de /<tipo>/all (también comprimido), el índice de /search, el cache de
+tokens bloqueados, el cache de entidades y el cache de sentencias compiladas
+de SQLAlchemy. Los workers heredan todo eso por fork.
+
+Lo único que no se puede heredar son las conexiones: el master las cierra
+después de calentar y cada worker descarta las que hubiera heredado
+(dispose_engines(close=False)) y abre las suyas en warm_worker().
+Los requests de calentamiento no cuentan en /metrics.
+"""
+import time
+
+from sqlalchemy import text
+
+from compress import ENCODERS
+from models import db
+from passwords import password_hasher
+from replicas import replica_set
+from revocation import revocation_cache
+
+WARMUP_ENVIRON = "api.warmup"
+
+#RUTAS DE LECTURA CON LAS VARIANTES QUE SE SIRVEN MÁS (PÁGINA POR DEFECTO, DETALLE, SNAPSHOT SIN COMPRIMIR Y EN CADA CODIFICACIÓN).
+WARMUP_REQUESTS = [
+    ("/", {}),
+    ("/search?q=a", {}),
+    ("/user", {}),
+] + [
+    request
+    for kind in ("people", "planets", "vehicles")
+    for request in (
+        ("/" + kind, {}),
+        ("/%s/1" % kind, {}),
+        ("/%s/all" % kind, {}),
+        ("/favorites/top/" + kind, {}),
+    )
+] + [("/%s/all" % kind, {"Accept-Encoding": encoding}) for kind in ("people", "planets", "vehicles") for encoding in ENCODERS]
+
+
+def engines(app):
+    with app.app_context():
+        return list(db.engines.values()) + list(replica_set.engines)
+
+
+def dispose_engines(app, close=True):
+    #close=False en el hijo: solo olvida las conexiones del padre, sin cerrarlas por debajo del master.
+    for engine in engines(app):
+        engine.dispose(close=close)
+
+
+def warm_up(app):
+    """Pasa un request por cada ruta de lectura. Devuelve {ruta: status} y los segundos que tardó."""
+    start = time.perf_counter()
+    client = app.test_client()
+    statuses = {}
+    for path, headers in WARMUP_REQUESTS:
+        response = client.get(path, headers=headers, environ_base={WARMUP_ENVIRON: True})
+        response.close()
+        statuses[path] = response.status_code
+    with app.app_context():
+        revocation_cache.is_revoked("")
+        db.session.remove()
+    return statuses, time.perf_counter() - start
+
+
+def warm_worker(app):
+    #Ya en el worker: una conexión por engine (con sus PRAGMAs / variables de sesión) y el pool de bcrypt.
+    for engine in engines(app):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    password_hasher.start()
@@ -0,0 +1,76 @@
+"""Fixtures comunes: una app nueva por prueba sobre una base SQLite temporal.
+
+    python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+#COLUMNAS OBLIGATORIAS DE CADA TIPO DEL CATÁLOGO, PARA SEMBRAR CON /import/<tipo>.
+ROWS = {
+    "people": {"url": "u", "height": 1, "mass": 1, "hair_color": "x", "skin_color": "x", "eyes_color": "x",
+               "birth_year": 1, "gender": "x"},
+    "planets": {"url": "u", "diameter": 1, "rotation_period": 1, "orbital_period": 1, "gravity": 1, "population": 1,
+                "climate": "arid"},
+    "vehicles": {"url": "u", "model": "x", "vehicle_class": "x", "manufacturer": "x", "cost_in_credits": 1,
+                 "passengers": 1, "cargo_capacity": 1},
+}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///%s" % (tmp_path / "test.db"))
+    monkeypatch.setenv("FLASK_APP_KEY", "test")
+    monkeypatch.setenv("METRICS_DIR", str(tmp_path / "metrics"))
+    monkeypatch.setenv("BCRYPT_LOG_ROUNDS", "4")
+    monkeypatch.delenv("FLASK_RUN_FROM_CLI", raising=False)
+
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    from models import db, User
+
+    with app.app_context():
+        user = User(email="luke@rebels.org", password="x", is_active=True, first_name="Luke", last_name="Skywalker",
+                    subscription_date="2023-01-01")
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def auth(app, user):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        return {"Authorization": "Bearer " + create_access_token(identity=user)}
+
+
+@pytest.fixture
+def seed(client, auth):
+    def seed(kind, *rows):
+        #Cada fila es un nombre o un dict con las columnas que cambian respecto de ROWS.
+        rows = [dict(ROWS[kind], **(row if isinstance(row, dict) else {"name": row})) for row in rows]
+        response = client.post("/import/%s" % kind, json=rows, headers=auth)
+        assert response.get_json()["failed"] == 0
+    return seed
@@ -0,0 +1,40 @@
+import sys
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+
+
+@pytest.fixture
+def asgi_client(app):
+    #asgi.py arma su app de Flask y su engine al importarse: se importa de nuevo con la base de esta prueba.
+    sys.modules.pop("asgi", None)
+    asgi = pytest.importorskip("asgi")
+    from starlette.testclient import TestClient
+
+    with TestClient(asgi.app, headers={"Accept-Encoding": "identity"}) as client:
+        yield client
+
+
+@pytest.mark.parametrize("path", ["/people", "/people?fields=name,gender&limit=1", "/people/2", "/favorites/top/people"])
+def test_same_body_and_etag_as_flask(client, asgi_client, seed, path):
+    seed("people", {"name": "Luke", "gender": "male"}, {"name": "Padmé Amidala", "hair_color": "brown"})
+
+    flask_response = client.get(path)
+    asgi_response = asgi_client.get(path)
+    assert asgi_response.status_code == flask_response.status_code == 200
+    assert asgi_response.content == flask_response.data
+    assert asgi_response.headers.get("ETag") == flask_response.headers.get("ETag")
+
+    if flask_response.headers.get("ETag"):
+        response = asgi_client.get(path, headers={"If-None-Match": flask_response.headers["ETag"]})
+        assert response.status_code == 304
+
+
+def test_same_error_body_as_flask(client, asgi_client):
+    for path in ("/planets/9", "/planets?fields=lightsaber"):
+        flask_response = client.get(path)
+        asgi_response = asgi_client.get(path)
+        assert asgi_response.status_code == flask_response.status_code
+        assert asgi_response.content == flask_response.data
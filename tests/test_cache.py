@@ -0,0 +1,105 @@
+import json
+
+from cache import MISSING, MemoryBackend, entity_cache
+
+PLANET = {"url": "u", "diameter": 1, "rotation_period": 1, "orbital_period": 1, "gravity": 1, "population": 1, "climate": "arid"}
+
+
+def import_planets(client, auth, *names):
+    body = json.dumps([dict(PLANET, name=name) for name in names])
+    response = client.post("/import/planets", data=body, content_type="application/json", headers=auth)
+    assert response.get_json()["inserted"] == len(names)
+
+
+def test_cached_404_is_dropped_after_import_with_automatic_uid(client, auth):
+    assert client.get("/planets/1").status_code == 404
+    assert client.get("/planets/1").status_code == 404  # negative_hit
+
+    import_planets(client, auth, "Tatooine")
+
+    response = client.get("/planets/1")
+    assert response.status_code == 200
+    assert response.get_json()["name"] == "Tatooine"
+
+
+def test_cached_404_is_dropped_when_another_worker_imports(app, client, auth):
+    assert client.get("/planets/1").status_code == 404
+    #Otro worker no ve la invalidación local: solo cambia la versión de la fila.
+    entry = entity_cache.backend.get("planets:1")
+    import_planets(client, auth, "Tatooine")
+    entity_cache.backend.set("planets:1", entry, 60)
+
+    assert client.get("/planets/1").status_code == 200
+
+
+def test_detail_is_reloaded_after_update(client, auth):
+    import_planets(client, auth, "Tatooine")
+    assert client.get("/planets/1").get_json()["climate"] == "arid"
+
+    body = dict(PLANET, uid=1, name="Tatooine", climate="desert")
+    assert client.put("/update/planet", json=body, headers=auth).status_code == 201
+    assert client.get("/planets/1").get_json()["climate"] == "desert"
+
+
+def test_detail_is_dropped_after_delete(client, auth):
+    import_planets(client, auth, "Tatooine")
+    assert client.get("/planets/1").status_code == 200
+
+    assert client.delete("/delete/planet", json={"uid": 1}, headers=auth).status_code == 200
+    assert entity_cache.backend.get("planets:1") is MISSING
+    assert client.get("/planets/1").status_code == 404
+
+
+def test_memory_backend_lru_and_ttl(monkeypatch):
+    backend = MemoryBackend(maxsize=2)
+    backend.set("a", 1, 60)
+    backend.set("b", 2, 60)
+    assert backend.get("a") == 1
+    assert backend.set("c", 3, 60) == 1  # sale "b", el menos usado
+    assert backend.get("b") is MISSING
+
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.time", lambda: now[0])
+    backend.set("d", 4, 10)
+    now[0] += 11
+    assert backend.get("d") is MISSING
+
+
+def test_import_without_returning_bumps_the_new_uid_range(app, client, auth, monkeypatch):
+    from models import db
+
+    assert client.get("/planets/2").status_code == 404
+    with app.app_context():
+        monkeypatch.setattr(type(db.engine.dialect), "insert_executemany_returning", False)
+    import_planets(client, auth, "Tatooine", "Hoth")
+
+    assert client.get("/planets/2").get_json()["name"] == "Hoth"
+
+
+def rename_user(app, user_id, first_name):
+    #Como si la escritura la hubiera hecho otro worker: sin invalidar este cache.
+    from models import db, User
+
+    with app.app_context():
+        db.session.get(User, user_id).first_name = first_name
+        db.session.commit()
+
+
+def test_memory_backend_does_not_cache_unversioned_users(app, client, user):
+    assert client.get("/user/%d" % user).get_json()["first_name"] == "Luke"
+    rename_user(app, user, "Anakin")
+    assert client.get("/user/%d" % user).get_json()["first_name"] == "Anakin"
+
+
+def test_sqlite_backend_invalidation_reaches_other_workers(app, client, user, tmp_path):
+    from cache import SQLiteBackend
+
+    app.config["ENTITY_CACHE_BACKEND"] = "sqlite"
+    app.config["ENTITY_CACHE_PATH"] = str(tmp_path / "entity-cache.sqlite3")
+    entity_cache.init_app(app)
+    other_worker = SQLiteBackend(app.config["ENTITY_CACHE_PATH"])
+
+    assert client.get("/user/%d" % user).status_code == 200
+    assert other_worker.get("user:%d" % user) is not MISSING
+    entity_cache.invalidate("user", [user])
+    assert other_worker.get("user:%d" % user) is MISSING
@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import pytest
+
+import versions
+from compress import ENCODERS, response_compressor
+from models import db, People
+from versions import args_hash, bump_versions
+
+
+@pytest.fixture
+def people(app):
+    with app.app_context():
+        db.session.add_all([People(name="Person %d" % i, url="u", height=170, mass=70, hair_color="b", skin_color="f",
+                                   eyes_color="blue", birth_year=19, gender="male") for i in range(60)])
+        db.session.flush()
+        bump_versions("people", [])
+        db.session.commit()
+
+
+def body(response):
+    data = response.data
+    if response.headers.get("Content-Encoding") == "gzip":
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+def test_gzip_negotiation_and_etag_variant(client, people):
+    plain = client.get("/people?limit=30")
+    assert plain.headers.get("Content-Encoding") is None
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    compressed = client.get("/people?limit=30", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    assert body(compressed) == plain.get_json()
+    assert len(compressed.data) < len(plain.data)
+
+
+def test_if_none_match_accepts_compressed_variant(client, people):
+    etag = client.get("/people?limit=30", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    response = client.get("/people?limit=30", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_quality_and_identity(client, people):
+    response = client.get("/people?limit=30", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert response.headers.get("Content-Encoding") is None
+    if "br" in ENCODERS:
+        response = client.get("/people?limit=30", headers={"Accept-Encoding": "gzip;q=1, br;q=0.5"})
+        assert response.headers["Content-Encoding"] == "gzip"
+
+
+def test_small_and_streamed_responses_are_not_compressed(client, people):
+    assert client.get("/people/1", headers={"Accept-Encoding": "gzip"}).headers.get("Content-Encoding") is None
+    streamed = client.get("/people?stream=1", headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers.get("Content-Encoding") is None
+    assert len(json.loads(streamed.data)) == 60
+
+
+def test_hash_collision_does_not_share_compressed_bodies(client, people, monkeypatch):
+    #Dos consultas distintas con el mismo ETag (como con el crc32 de antes) no deben compartir bytes.
+    monkeypatch.setattr(versions, "_args_hash", lambda: "collision")
+    first = client.get("/people?limit=10", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/people?limit=20", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert len(body(first)["results"]) == 10
+    assert len(body(second)["results"]) == 20
+
+
+def test_args_hash_escapes_values():
+    assert args_hash([("a", "1&b=2")]) != args_hash([("a", "1"), ("b", "2")])
+    assert args_hash([("b", "2"), ("a", "1")]) == args_hash([("a", "1"), ("b", "2")])
+
+
+def test_compressed_bytes_are_cached_per_etag(client, people):
+    response_compressor._cache.clear()
+    client.get("/people?limit=30", headers={"Accept-Encoding": "gzip"})
+    assert len(response_compressor._cache) == 1
+    client.get("/people?limit=30", headers={"Accept-Encoding": "gzip"})
+    assert len(response_compressor._cache) == 1
+
+
+def test_snapshot_keeps_one_body_per_encoding(client, people):
+    plain = client.get("/people/all")
+    compressed = client.get("/people/all", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"].endswith('-gzip"')
+    assert body(compressed) == plain.get_json()
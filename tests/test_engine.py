@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from engine import InstrumentedQueuePool, async_engine_options, async_url, configure_engine, engine_options, load_profile
+from metrics import metrics
+
+
+def test_profile_values_can_be_overridden_from_the_environment():
+    profile = load_profile("worker", {"DATABASE_POOL_SIZE": "20", "DATABASE_POOL_PRE_PING": "false",
+                                      "DATABASE_SQLITE_SYNCHRONOUS": "FULL"})
+    assert profile["name"] == "worker"
+    assert profile["pool_size"] == 20
+    assert profile["pool_pre_ping"] is False
+    assert profile["sqlite_synchronous"] == "FULL"
+    assert profile["max_overflow"] == 0
+
+    with pytest.raises(ValueError):
+        load_profile("batch", {})
+
+
+def test_engine_options_by_backend():
+    profile = load_profile("web", {})
+
+    options = engine_options("postgresql://u:p@db/swapi", profile)
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_pre_ping"]) == (5, 10, True)
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    assert "connect_args" not in engine_options("mysql://u:p@db/swapi", profile)
+
+    options = engine_options("sqlite:////tmp/swapi.db", profile)
+    assert (options["pool_pre_ping"], options["pool_recycle"]) == (False, -1)
+    assert engine_options("sqlite://", profile) == {}
+
+
+def test_async_url_and_options():
+    assert str(async_url("postgresql://u:p@db/swapi")) == "postgresql+asyncpg://u:***@db/swapi"
+    assert async_url("mysql+mysqldb://db/swapi").drivername == "mysql+aiomysql"
+    assert async_url("sqlite:////tmp/swapi.db").drivername == "sqlite+aiosqlite"
+    with pytest.raises(ValueError):
+        async_url("oracle://db/swapi")
+
+    options = async_engine_options("postgresql://u:p@db/swapi", load_profile("web", {}))
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+
+
+def test_sqlite_pragmas_are_applied_on_connect(tmp_path):
+    profile = load_profile("web", {})
+    uri = "sqlite:///%s" % (tmp_path / "swapi.db")
+    engine = create_engine(uri, **engine_options(uri, profile))
+    configure_engine(engine, "test", profile)
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_each_engine_registers_one_pool_collector(app):
+    #Otra app (o la misma configurada de nuevo) reemplaza el collector del engine con ese nombre.
+    from app import create_app
+
+    collectors = dict(metrics._collectors)
+    assert "db_pool:primary" in collectors
+    create_app()
+    create_app()
+    assert metrics._collectors.keys() == collectors.keys()
+    assert metrics._collectors["db_pool:primary"] is not collectors["db_pool:primary"]
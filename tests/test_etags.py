@@ -0,0 +1,48 @@
+from conftest import ROWS
+
+
+def test_collection_etag_and_304(client, seed, monkeypatch):
+    seed("planets", "Tatooine", "Hoth")
+    response = client.get("/planets?limit=1")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert "must-revalidate" in response.headers["Cache-Control"]
+
+    #El 304 sale solo de la versión: la vista no se ejecuta.
+    monkeypatch.setattr("app.paginated_response", lambda model: 1 / 0)
+    response = client.get("/planets?limit=1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.get_data() == b""
+
+
+def test_collection_etag_depends_on_args_and_writes(client, auth, seed):
+    seed("planets", "Tatooine", "Hoth")
+    etag = client.get("/planets?limit=1").headers["ETag"]
+    assert client.get("/planets?limit=2").headers["ETag"] != etag
+    assert client.get("/planets?limit=1", headers={"If-None-Match": etag}).status_code == 304
+
+    body = dict(ROWS["planets"], uid=2, name="Hoth", climate="frozen")
+    assert client.put("/update/planet", json=body, headers=auth).status_code == 201
+    response = client.get("/planets?limit=1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_detail_etag_only_changes_with_its_row(client, auth, seed):
+    seed("planets", "Tatooine", "Hoth")
+    first = client.get("/planets/1").headers["ETag"]
+    second = client.get("/planets/2").headers["ETag"]
+
+    body = dict(ROWS["planets"], uid=2, name="Hoth", climate="frozen")
+    assert client.put("/update/planet", json=body, headers=auth).status_code == 201
+    assert client.get("/planets/1", headers={"If-None-Match": first}).status_code == 304
+    response = client.get("/planets/2", headers={"If-None-Match": second})
+    assert response.status_code == 200
+    assert response.get_json()["climate"] == "frozen"
+
+
+def test_not_found_has_no_etag(client):
+    response = client.get("/people/1")
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
@@ -0,0 +1,57 @@
+import pytest
+
+
+@pytest.fixture
+def favorites(client, user, seed):
+    seed("planets", "Tatooine", "Hoth")
+    seed("vehicles", "X-wing")
+    operations = [{"op": "add", "kind": kind, "uid": uid} for kind, uid in (("planet", 1), ("planet", 2), ("vehicle", 1))]
+    assert client.post("/favorites/batch", json={"user_id": user, "operations": operations}).status_code == 200
+
+
+def favorites_of(client, user, **args):
+    return client.post("/favorites", query_string=args, json={"user_id": user})
+
+
+def test_without_expand_only_ids(client, user, favorites):
+    body = favorites_of(client, user).get_json()
+    assert body == {"results": [{"id": 1, "user_id": user, "vehicle_uid": 1},
+                                {"id": 1, "user_id": user, "planet_uid": 1},
+                                {"id": 2, "user_id": user, "planet_uid": 2}]}
+
+
+def test_expand_includes_each_entity_once(client, user, favorites):
+    body = favorites_of(client, user, expand="planets,user,planets").get_json()
+    assert list(body["included"]) == ["planets", "user"]
+    assert sorted(body["included"]["planets"]) == ["1", "2"]
+    assert body["included"]["planets"]["2"]["name"] == "Hoth"
+    assert list(body["included"]["user"]) == [str(user)]
+    assert "password" not in body["included"]["user"][str(user)]
+
+
+def test_fields_apply_by_kind(client, user, favorites):
+    #Un nombre suelto aplica a los tipos que lo tienen; "tipo.campo" solo a ese tipo. La llave siempre va.
+    body = favorites_of(client, user, expand="planets,vehicles", fields="name,planets.climate").get_json()
+    assert body["included"]["planets"]["1"] == {"uid": 1, "name": "Tatooine", "climate": "arid"}
+    assert body["included"]["vehicles"]["1"] == {"uid": 1, "name": "X-wing"}
+
+
+@pytest.mark.parametrize("args, message", [
+    ({"expand": "planets,droids"}, "expand desconocido: droids, usa people, planets, vehicles o user"),
+    ({"fields": "name"}, "fields aplica a las entidades de expand"),
+    ({"expand": "planets", "fields": "people.name"}, "people.name: people no está en expand"),
+    ({"expand": "planets", "fields": "lightsaber"}, "campos desconocidos: lightsaber"),
+    ({"expand": "planets", "fields": "planets.lightsaber"}, "campos desconocidos: lightsaber"),
+])
+def test_invalid_expand_or_fields(client, user, favorites, args, message):
+    response = favorites_of(client, user, **args)
+    assert response.status_code == 400
+    assert response.get_json()["message"] == {"message": message}
+
+
+def test_single_add_supports_expand(client, user, seed):
+    seed("planets", "Tatooine")
+    response = client.post("/favorite/planet/1?expand=planets&fields=name", json={"user_id": user})
+    assert response.status_code == 200
+    assert response.get_json()["included"] == {"planets": {"1": {"uid": 1, "name": "Tatooine"}}}
+    assert client.post("/favorite/planet/1?expand=droids", json={"user_id": user}).status_code == 400
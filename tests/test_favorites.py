@@ -0,0 +1,135 @@
+import json
+
+import pytest
+
+ROWS = {
+    "people": {"url": "u", "height": 1, "mass": 1, "hair_color": "x", "skin_color": "x", "eyes_color": "x",
+               "birth_year": 1, "gender": "x"},
+    "planets": {"url": "u", "diameter": 1, "rotation_period": 1, "orbital_period": 1, "gravity": 1, "population": 1,
+                "climate": "arid"},
+    "vehicles": {"url": "u", "model": "x", "vehicle_class": "x", "manufacturer": "x", "cost_in_credits": 1,
+                 "passengers": 1, "cargo_capacity": 1},
+}
+
+
+@pytest.fixture
+def catalog(client, auth):
+    for kind, names in (("people", ["Luke", "Leia"]), ("planets", ["Tatooine", "Hoth"]), ("vehicles", ["X-wing"])):
+        body = json.dumps([dict(ROWS[kind], name=name) for name in names])
+        response = client.post("/import/%s" % kind, data=body, content_type="application/json", headers=auth)
+        assert response.get_json()["inserted"] == len(names)
+
+
+def batch(client, user, *operations):
+    operations = [{"op": op, "kind": kind, "uid": uid} for op, kind, uid in operations]
+    return client.post("/favorites/batch", json={"user_id": user, "operations": operations})
+
+
+def statuses(response):
+    assert response.status_code == 200
+    return [item["status"] for item in response.get_json()["results"]]
+
+
+def top(client, kind):
+    return {item["uid"]: item["favorites"] for item in client.get("/favorites/top/%s" % kind).get_json()["results"]}
+
+
+def favorite_uids(app, user):
+    from models import db, FavoritePeople, FavoritePlanets, FavoriteVehicles
+
+    with app.app_context():
+        return {
+            "people": sorted(f.people_uid for f in db.session.query(FavoritePeople).filter_by(user_id=user)),
+            "planet": sorted(f.planet_uid for f in db.session.query(FavoritePlanets).filter_by(user_id=user)),
+            "vehicle": sorted(f.vehicle_uid for f in db.session.query(FavoriteVehicles).filter_by(user_id=user)),
+        }
+
+
+def test_batch_adds_and_removes_across_kinds(app, client, user, catalog):
+    response = batch(client, user, ("add", "people", 1), ("add", "people", 2), ("add", "planet", 1),
+                     ("add", "vehicle", 1))
+    assert statuses(response) == ["added", "added", "added", "added"]
+    assert favorite_uids(app, user) == {"people": [1, 2], "planet": [1], "vehicle": [1]}
+
+    response = batch(client, user, ("remove", "people", 1), ("add", "planet", 2), ("remove", "vehicle", 1))
+    assert statuses(response) == ["removed", "added", "removed"]
+    assert favorite_uids(app, user) == {"people": [2], "planet": [1, 2], "vehicle": []}
+
+
+def test_batch_statuses(app, client, user, catalog):
+    statuses(batch(client, user, ("add", "planet", 1)))
+
+    response = batch(client, user,
+                     ("add", "planet", 1),  # ya era favorito
+                     ("remove", "planet", 2),  # no era favorito
+                     ("add", "people", 99),  # no existe
+                     ("add", "people", 1), ("remove", "people", 1))  # cuenta la última
+    assert statuses(response) == ["exists", "not_favorite", "not_found", "superseded", "not_favorite"]
+    assert favorite_uids(app, user) == {"people": [], "planet": [1], "vehicle": []}
+
+
+def test_batch_rejects_invalid_operations(client, user, catalog):
+    assert client.post("/favorites/batch", json={"operations": []}).status_code == 400
+    assert batch(client, user).status_code == 400
+    assert client.post("/favorites/batch", json={"user_id": user, "operations": [{"op": "toggle", "kind": "planet",
+                                                                                  "uid": 1}]}).status_code == 400
+    assert batch(client, user, ("add", "droid", 1)).status_code == 400
+    assert batch(client, user, ("add", "planet", "1")).status_code == 400
+    assert batch(client, 99, ("add", "planet", 1)).status_code == 404
+
+
+def test_batch_updates_popularity_counters(app, client, user, catalog):
+    from models import db, User
+
+    with app.app_context():
+        other = User(email="leia@rebels.org", password="x", is_active=True, first_name="Leia", last_name="Organa",
+                     subscription_date="2023-01-01")
+        db.session.add(other)
+        db.session.commit()
+        other = other.id
+
+    statuses(batch(client, user, ("add", "planet", 1), ("add", "planet", 2), ("add", "people", 1)))
+    statuses(batch(client, other, ("add", "planet", 1)))
+    assert top(client, "planets") == {1: 2, 2: 1}
+    assert top(client, "people") == {1: 1}
+
+    #Las operaciones que no cambian nada (exists, not_favorite, superseded) no mueven los contadores.
+    statuses(batch(client, user, ("add", "planet", 1), ("remove", "planet", 2), ("remove", "people", 2),
+                   ("add", "people", 1), ("remove", "people", 1)))
+    assert top(client, "planets") == {1: 2}
+    assert top(client, "people") == {}
+
+    from popularity import reconcile
+    with app.app_context():
+        assert reconcile() == 0
+
+
+def test_single_add_counts_once_and_rejects_duplicates(client, user, catalog):
+    assert client.post("/favorite/planet/1", json={"user_id": user}).status_code == 200
+    assert client.post("/favorite/planet/1", json={"user_id": user}).status_code == 404
+    assert client.post("/favorite/planet/99", json={"user_id": user}).status_code == 404
+    assert top(client, "planets") == {1: 1}
+
+
+def test_single_add_coerces_user_id(app, client, user, catalog):
+    response = client.post("/favorite/people/1", json={"user_id": str(user)})
+    assert response.status_code == 200
+    assert response.get_json()["user_id"] == user
+    assert client.post("/add-favorite/people", json={"user_id": str(user), "people_uid": "2"}).status_code == 200
+    assert client.post("/favorite/vehicle/1", json={"user_id": user}).status_code == 200
+    assert favorite_uids(app, user) == {"people": [1, 2], "planet": [], "vehicle": [1]}
+
+    for body in ({}, {"user_id": None}, {"user_id": "luke"}, {"user_id": True}, {"user_id": 1.5}):
+        response = client.post("/favorite/vehicle/1", json=body)
+        assert response.status_code == 400
+        assert response.get_json()["message"] == {"message": "user_id debe ser un número entero"}
+    assert client.post("/favorite/planet/1", data="user_id=1").status_code == 400
+    assert client.post("/add-favorite/people", json={"user_id": user, "people_uid": "uno"}).status_code == 400
+
+
+def test_single_add_not_found_messages(client, user, catalog):
+    assert client.post("/favorite/people/99", json={"user_id": user}).get_json()["message"] == "Personaje no encontrado"
+    assert client.post("/favorite/people/1", json={"user_id": 99}).get_json()["message"] == "Usuario no encontrado"
+    assert client.post("/favorite/people/1", json={"user_id": user}).status_code == 200
+    response = client.post("/favorite/people/1", json={"user_id": user})
+    assert response.get_json()["message"] == "El usuario ya ha agregado este personaje como favorito"
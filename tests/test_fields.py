@@ -0,0 +1,27 @@
+def test_collection_projection_always_keeps_the_key(client, seed):
+    seed("people", {"name": "Luke", "gender": "male"}, "Leia")
+    response = client.get("/people?fields=name,gender&limit=1")
+    assert response.get_json() == {"results": [{"uid": 1, "name": "Luke", "gender": "male"}], "next": 1}
+
+    #La llave repetida o pedida primero no se duplica, y el cursor sigue funcionando.
+    response = client.get("/people?fields=uid,name,uid&after=1")
+    assert response.get_json()["results"] == [{"uid": 2, "name": "Leia"}]
+
+
+def test_detail_projection_uses_the_cached_row(client, seed):
+    seed("planets", "Tatooine")
+    assert client.get("/planets/1").get_json()["climate"] == "arid"  # guarda la fila completa en el cache
+    assert client.get("/planets/1?fields=name").get_json() == {"uid": 1, "name": "Tatooine"}
+
+
+def test_excluded_columns_are_not_fields(client, user):
+    item = client.get("/user/%d" % user).get_json()
+    assert "password" not in item and "is_active" not in item
+    assert client.get("/user?fields=password").status_code == 400
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get("/people?fields=name,lightsaber")
+    assert response.status_code == 400
+    assert response.get_json()["message"] == {"message": "campos desconocidos: lightsaber"}
+    assert client.get("/people/1?fields=lightsaber").status_code == 400
@@ -0,0 +1,36 @@
+def uids(client, path, **args):
+    response = client.get(path, query_string=args)
+    assert response.status_code == 200
+    return [item["uid"] for item in response.get_json()["results"]]
+
+
+def test_equality_filters_and_repeated_values(client, seed):
+    seed("planets", {"name": "Tatooine", "climate": "arid"}, {"name": "Hoth", "climate": "frozen"},
+         {"name": "Endor", "climate": "temperate"}, {"name": "Geonosis", "climate": "arid"})
+
+    assert uids(client, "/planets", climate="arid") == [1, 4]
+    assert uids(client, "/planets", climate=["arid", "frozen"]) == [1, 2, 4]
+    assert uids(client, "/planets", climate="murky") == []
+
+
+def test_ranges_are_inclusive_and_combine_with_filters(client, seed):
+    seed("people", {"name": "Yoda", "height": 66, "gender": "male"}, {"name": "Leia", "height": 150, "gender": "female"},
+         {"name": "Luke", "height": 172, "gender": "male"}, {"name": "Chewbacca", "height": 228, "gender": "male"})
+
+    assert uids(client, "/people", height_min=150, height_max=228) == [2, 3, 4]
+    assert uids(client, "/people", height_max="1.5e2") == [1, 2]
+    assert uids(client, "/people", height_min=100, gender="male") == [3, 4]
+    #Los filtros no rompen el cursor.
+    assert uids(client, "/people", gender="male", limit=1, after=1) == [3]
+
+
+def test_filters_only_apply_to_declared_columns(client, seed):
+    seed("vehicles", {"name": "X-wing", "manufacturer": "Incom"}, {"name": "TIE", "manufacturer": "Sienar"})
+    assert uids(client, "/vehicles", manufacturer="Incom") == [1]
+    assert uids(client, "/vehicles", name="TIE") == [1, 2]  # name no es filtro
+
+
+def test_range_values_must_be_numbers(client):
+    response = client.get("/planets?population_min=many")
+    assert response.status_code == 400
+    assert response.get_json()["message"] == {"message": "population_min debe ser un número"}
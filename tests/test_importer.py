@@ -0,0 +1,144 @@
+import io
+
+import pytest
+
+import importer
+from importer import RowError, iter_json_array, iter_ndjson
+
+
+def parse(data):
+    return list(iter_json_array(io.BytesIO(data)))
+
+
+def test_json_array_yields_each_element_in_order():
+    assert parse(b'[{"name": "a"}, {"name": "b"} ,\n{"name": "c"}]') == [
+        (1, {"name": "a"}), (2, {"name": "b"}), (3, {"name": "c"}),
+    ]
+
+
+def test_json_array_with_tiny_chunks(monkeypatch):
+    monkeypatch.setattr(importer, "CHUNK_SIZE", 3)
+    records = parse(b'[{"name": "Tatooine", "diameter": 10465}, {"name": "Hoth"}]')
+    assert [value for _, value in records] == [{"name": "Tatooine", "diameter": 10465}, {"name": "Hoth"}]
+
+
+def test_multibyte_character_split_between_chunks():
+    #El primer byte de "ñ" (0xc3) queda justo al final de la primera lectura.
+    prefix = b'[{"name": "'
+    padding = b"a" * (importer.CHUNK_SIZE - 1 - len(prefix))
+    data = prefix + padding + "ñ".encode("utf-8") + b'"}]'
+    assert data[importer.CHUNK_SIZE - 1] == 0xc3
+
+    [(number, value)] = parse(data)
+    assert number == 1
+    assert value["name"].endswith("ñ")
+
+
+def test_invalid_utf8_is_a_row_error():
+    [(number, error)] = parse(b'[{"name": "\xff"}]')
+    assert number == 1
+    assert isinstance(error, RowError)
+
+
+def test_not_an_array():
+    [(_, error)] = parse(b'{"name": "a"}')
+    assert isinstance(error, RowError)
+
+
+def test_truncated_array_reports_invalid_json():
+    records = parse(b'[{"name": "a"}, {"name": ')
+    assert records[0] == (1, {"name": "a"})
+    assert isinstance(records[1][1], RowError)
+
+
+@pytest.mark.parametrize("data", [b'[{"name": "a"}, {"name": "b"}', b'[{"name": "a"}, {"name": "b"},\n'])
+def test_array_without_closing_bracket_is_an_error(data):
+    records = parse(data)
+    assert records[:2] == [(1, {"name": "a"}), (2, {"name": "b"})]
+    [(number, error)] = records[2:]
+    assert number == 3
+    assert isinstance(error, RowError)
+
+
+@pytest.mark.parametrize("data", [b"", b"  \n "])
+def test_empty_body_is_an_error(data):
+    [(number, error)] = parse(data)
+    assert number == 1
+    assert isinstance(error, RowError)
+
+
+def test_empty_array_is_not_an_error():
+    assert parse(b" [ ] ") == []
+
+
+def test_truncated_upload_is_reported_by_the_endpoint(client, auth):
+    data = b'[{"name": "Hoth", ' + PLANET + b'}'
+    report = client.post("/import/planets", data=data, content_type="application/json", headers=auth).get_json()
+    assert report["inserted"] == 1
+    assert report["failed"] == 1
+    assert "incompleto" in report["errors"][0]["error"]
+    assert client.post("/import/planets", data=b"", content_type="application/json", headers=auth).get_json()["failed"] == 1
+
+
+def test_ndjson_skips_blank_lines_and_reports_bad_ones():
+    records = list(iter_ndjson(io.BytesIO('{"name": "a"}\n\n{oops\n{"name": "ñ"}\n'.encode("utf-8"))))
+    assert records[0] == (1, {"name": "a"})
+    assert isinstance(records[1][1], RowError) and records[1][0] == 3
+    assert records[2] == (4, {"name": "ñ"})
+
+
+PLANET = b'"url": "u", "diameter": 1, "rotation_period": 1, "orbital_period": 1, "gravity": 1, "population": 1, "climate": "arid"'
+
+
+def test_import_endpoint_with_character_on_chunk_boundary(client, auth):
+    #El relleno va entre elementos porque name tiene un máximo de 120 caracteres.
+    head = b'[{"name": "Hoth", ' + PLANET + b'},'
+    prefix = b'{"name": "Endor'
+    padding = b" " * (importer.CHUNK_SIZE - 1 - len(head) - len(prefix))
+    data = head + padding + prefix + "ñ".encode("utf-8") + b'", ' + PLANET + b'}]'
+    assert data[importer.CHUNK_SIZE - 1] == 0xc3
+
+    response = client.post("/import/planets", data=data, content_type="application/json", headers=auth)
+    assert response.status_code == 200
+    assert response.get_json()["errors"] == []
+    assert response.get_json()["inserted"] == 2
+    assert response.get_json()["failed"] == 0
+
+
+def import_planets(client, auth, *rows, **args):
+    data = "[%s]" % ",".join("{%s, %s}" % (row, PLANET.decode()) for row in rows)
+    response = client.post("/import/planets", data=data, content_type="application/json", headers=auth, query_string=args)
+    assert response.get_json()["failed"] == 0
+    return response.get_json()
+
+
+def test_import_writes_one_range_per_commit_not_one_version_per_row(app, client, auth):
+    from models import db, CatalogImport, CatalogVersion
+
+    app.config["IMPORT_COMMIT_ROWS"] = 2
+    import_planets(client, auth, '"name": "Hoth"', '"name": "Endor"', '"name": "Naboo"', batch_size=1)
+
+    with app.app_context():
+        assert db.session.query(CatalogVersion).filter(CatalogVersion.uid > 0).count() == 0
+        ranges = [(r.first_uid, r.last_uid) for r in db.session.query(CatalogImport).order_by(CatalogImport.version)]
+    assert ranges == [(1, 2), (3, 3)]
+
+
+def test_reimported_uid_replaces_a_cached_404(client, auth):
+    import_planets(client, auth, '"name": "Alderaan"')
+    assert client.delete("/delete/planet", json={"uid": 1}, headers=auth).status_code == 200
+    assert client.get("/planets/1").status_code == 404
+
+    #El uid tiene su propia versión (la del borrado); la de la importación es mayor.
+    import_planets(client, auth, '"uid": 1, "name": "Alderaan"')
+    assert client.get("/planets/1").get_json()["name"] == "Alderaan"
+
+
+def test_snapshot_and_search_see_imported_uids_below_the_last_one(client, auth):
+    import_planets(client, auth, '"uid": 5, "name": "Hoth"')
+    assert [planet["name"] for planet in client.get("/planets/all").get_json()] == ["Hoth"]
+    assert client.get("/search?q=endor").get_json()["results"] == []
+
+    import_planets(client, auth, '"uid": 2, "name": "Endor"')
+    assert [planet["name"] for planet in client.get("/planets/all").get_json()] == ["Endor", "Hoth"]
+    assert [item["uid"] for item in client.get("/search?q=endor").get_json()["results"]] == [2]
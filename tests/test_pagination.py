@@ -0,0 +1,47 @@
+import pytest
+
+
+def page(client, path, **args):
+    response = client.get(path, query_string=args)
+    assert response.status_code == 200
+    body = response.get_json()
+    return [item["uid"] for item in body["results"]], body["next"]
+
+
+def test_cursor_walks_the_whole_collection(client, seed):
+    seed("people", *("Person %d" % i for i in range(5)))
+
+    assert page(client, "/people", limit=2) == ([1, 2], 2)
+    assert page(client, "/people", limit=2, after=2) == ([3, 4], 4)
+    assert page(client, "/people", limit=2, after=4) == ([5], None)
+    #Una página exacta no deja un cursor a una página vacía.
+    assert page(client, "/people", limit=5) == ([1, 2, 3, 4, 5], None)
+
+
+def test_cursor_is_stable_while_rows_change(client, auth, seed):
+    seed("planets", "Tatooine", "Hoth", "Endor", "Naboo")
+    first, cursor = page(client, "/planets", limit=2)
+
+    #Borrar una fila ya vista y agregar otra al final no repite ni salta filas.
+    assert client.delete("/delete/planet", json={"uid": 1}, headers=auth).status_code == 200
+    seed("planets", "Dagobah")
+    rest, cursor = page(client, "/planets", limit=10, after=cursor)
+    assert first + rest == [1, 2, 3, 4, 5]
+    assert cursor is None
+
+
+def test_limit_is_capped(app, client, seed):
+    app.config["PAGE_SIZE_MAX"] = 2
+    seed("vehicles", "X-wing", "Y-wing", "A-wing")
+    assert page(client, "/vehicles", limit=100) == ([1, 2], 2)
+
+
+def test_users_are_paginated_by_id(client, user):
+    response = client.get("/user", query_string={"limit": 1})
+    assert [item["id"] for item in response.get_json()["results"]] == [user]
+    assert response.get_json()["next"] is None
+
+
+@pytest.mark.parametrize("args", [{"limit": 0}, {"limit": "diez"}, {"after": "uno"}])
+def test_invalid_page_arguments(client, args):
+    assert client.get("/people", query_string=args).status_code == 400
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from passwords import PasswordHasher
+from utils import APIException
+
+
+@pytest.fixture
+def hasher(tmp_path):
+    hasher = PasswordHasher()
+    hasher.configure(rounds=4, pool_size=0, queue_limit=1, timeout=10, slots_dir=str(tmp_path / "slots"))
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_check(hasher):
+    pw_hash = hasher.hash("usa la fuerza")
+    assert hasher.check(pw_hash, "usa la fuerza")
+    assert not hasher.check(pw_hash, "otra")
+    assert not hasher.check("texto plano", "usa la fuerza")
+    assert not hasher.needs_rehash(pw_hash)
+
+
+def test_no_free_slot_is_429(hasher):
+    slot = hasher._slots.acquire()
+    with pytest.raises(APIException) as error:
+        hasher.hash("usa la fuerza")
+    assert error.value.status_code == 429
+    hasher._slots.release(slot)
+    assert hasher.hash("usa la fuerza")
+
+
+def test_pool_timeout_is_429_and_frees_the_slot(hasher):
+    hasher.pool_size, hasher.timeout = 1, 0.05
+    with pytest.raises(APIException) as error:
+        hasher._run(time.sleep, 0.5)
+    assert error.value.status_code == 429
+
+    #El cupo se libera cuando el proceso termina el trabajo que ya había empezado.
+    time.sleep(1)
+    hasher.timeout = 10
+    assert hasher.check(hasher.hash("usa la fuerza"), "usa la fuerza")
+
+
+def test_password_bcrypt_rejects_is_400(hasher, client):
+    with pytest.raises(APIException) as error:
+        hasher.hash("\ud800")  # no se puede codificar en UTF-8
+    assert error.value.status_code == 400
+
+    body = {"email": "han@rebels.org", "first_name": "Han", "last_name": "Solo", "password": "\ud800",
+            "is_active": True, "subscription_date": "2023-01-01", "birth_date": 1990, "country": "CR"}
+    response = client.post("/register", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["message"] == {"message": "contraseña inválida"}
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine, insert
+
+from conftest import ROWS
+
+
+@pytest.fixture(autouse=True)
+def replica_url(tmp_path, monkeypatch):
+    #Antes que el fixture app: create_app() lee DATABASE_REPLICA_URLS.
+    url = "sqlite:///%s" % (tmp_path / "replica.db")
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", url)
+    return url
+
+
+@pytest.fixture
+def databases(app, replica_url):
+    #La principal y la réplica tienen planetas distintos para saber de dónde leyó cada request.
+    from models import db, Planets
+
+    engine = create_engine(replica_url)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Planets), [dict(ROWS["planets"], name="Replica")])
+    engine.dispose()
+    with app.app_context():
+        db.session.add(Planets(**dict(ROWS["planets"], name="Primary")))
+        db.session.commit()
+
+
+def names(client, **headers):
+    response = client.get("/planets", headers=headers)
+    assert response.status_code == 200
+    return [planet["name"] for planet in response.get_json()["results"]]
+
+
+def test_marked_views_read_from_the_replica(client, databases):
+    assert names(client) == ["Replica"]
+    assert client.get("/planets/1").get_json()["name"] == "Replica"
+
+
+def test_strong_consistency_header_reads_the_primary(client, databases):
+    assert names(client, **{"X-Read-Consistency": "strong"}) == ["Primary"]
+    assert names(client, **{"X-Read-Consistency": "eventual"}) == ["Replica"]
+
+
+def test_a_write_pins_the_client_to_the_primary(client, auth, databases, monkeypatch):
+    body = dict(ROWS["planets"], name="Hoth")
+    response = client.post("/add/planet", json=body, headers=auth)
+    assert response.status_code == 201
+    assert "db_primary_until=" in response.headers["Set-Cookie"]
+
+    #El cliente lee lo que acaba de escribir mientras dura la cookie.
+    assert names(client) == ["Primary", "Hoth"]
+
+    import replicas
+    later = replicas.time.time() + replicas.replica_set.pin_seconds + 1
+    monkeypatch.setattr(replicas.time, "time", lambda: later)
+    assert names(client) == ["Replica"]
+
+
+def test_reads_do_not_pin_and_bad_cookies_are_ignored(app, databases):
+    client = app.test_client()
+    response = client.get("/planets")
+    assert "Set-Cookie" not in response.headers
+    assert names(client, Cookie="db_primary_until=mañana") == ["Replica"]
@@ -0,0 +1,114 @@
+import time
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from models import db, TokenBlokedList
+from metrics import metrics
+from revocation import RevocationCache, _utcnow, purge_expired, revocation_cache
+
+
+def block(row_id=None, created=None, expires_in=timedelta(minutes=15)):
+    now = _utcnow()
+    expires_at = None if expires_in is None else now + expires_in
+    row = TokenBlokedList(id=row_id, token=str(uuid.uuid4()), create_at=created or now, expires_at=expires_at)
+    db.session.add(row)
+    db.session.commit()
+    return row.token
+
+
+@pytest.fixture
+def ctx(app):
+    with app.app_context():
+        yield
+
+
+def test_row_committed_out_of_id_order_is_seen(ctx):
+    cache = RevocationCache(sync_interval=0, overlap=60, full_sync_interval=3600)
+    #La fila 2 hace commit primero; la 1 (id reservado antes) llega después de que el worker ya vio la 2.
+    second = block(row_id=2)
+    assert cache.is_revoked(second)
+    first = block(row_id=1)
+    assert cache.is_revoked(first)
+
+
+def test_full_sync_picks_up_rows_outside_the_overlap(ctx):
+    cache = RevocationCache(sync_interval=0, overlap=0, full_sync_interval=3600)
+    assert cache.is_revoked(block(row_id=2))
+    late = block(row_id=1, created=_utcnow() - timedelta(hours=1))
+    assert not cache.is_revoked(late)
+
+    cache.full_sync_interval = 0
+    assert cache.is_revoked(late)
+
+
+def test_sync_waits_for_the_interval(ctx):
+    cache = RevocationCache(sync_interval=3600)
+    assert not cache.is_revoked("nada")
+    token = block()
+    assert not cache.is_revoked(token)
+    cache.add(token)
+    assert cache.is_revoked(token)
+
+
+def test_expired_rows_are_ignored_and_purged(ctx):
+    cache = RevocationCache(sync_interval=0)
+    expired = block(expires_in=timedelta(minutes=-1))
+    live = block()
+    assert not cache.is_revoked(expired)
+    assert cache.is_revoked(live)
+
+    assert purge_expired(batch_size=1) == 1
+    assert [row.token for row in TokenBlokedList.query.all()] == [live]
+
+
+def test_tokens_without_exp_do_not_block_the_purge(ctx, monkeypatch):
+    import revocation
+
+    cache = RevocationCache(sync_interval=3600)
+    now = time.time()
+    cache.add("sin-exp")
+    cache.add("vence-pronto", now + 1)
+    cache.add("vence-despues", now + 3600)
+    assert cache.is_revoked("vence-pronto")
+
+    monkeypatch.setattr(revocation.time, "time", lambda: now + 2)
+    assert not cache.is_revoked("vence-pronto")
+    assert list(cache._revoked) == ["vence-despues"]
+    assert cache.is_revoked("sin-exp") and cache.is_revoked("vence-despues")
+
+
+def purged_total():
+    return sum(value for name, _, value in metrics.snapshot()["counters"] if name == "revoked_tokens_purged_total")
+
+
+def test_purge_expired_deletes_in_batches_and_keeps_live_rows(ctx):
+    for _ in range(5):
+        block(expires_in=timedelta(minutes=-1))
+    live = {block(), block(expires_in=None)}  # la segunda no tiene "exp"
+    before = purged_total()
+
+    assert purge_expired(batch_size=2) == 5
+    assert {row.token for row in TokenBlokedList.query.all()} == live
+    assert purged_total() - before == 5
+    assert purge_expired(batch_size=2) == 0
+
+
+def test_purge_revoked_tokens_command(app, ctx):
+    block(expires_in=timedelta(minutes=-1))
+    live = block()
+
+    result = app.test_cli_runner().invoke(args=["purge-revoked-tokens"])
+    assert result.exit_code == 0, result.output
+    assert result.output == "tokens expirados borrados: 1\n"
+    assert [row.token for row in TokenBlokedList.query.all()] == [live]
+
+
+def test_logout_blocks_the_token(app, client, auth):
+    revocation_cache.clear()
+    body = {"name": "Hoth", "url": "u", "diameter": 1, "rotation_period": 1, "orbital_period": 1, "gravity": 1,
+            "population": 1, "climate": "frozen"}
+    assert client.post("/add/planet", json=body, headers=auth).status_code == 201
+    assert client.post("/logout", headers=auth).status_code == 200
+    assert client.post("/add/planet", json=body, headers=auth).status_code == 400
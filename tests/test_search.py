@@ -0,0 +1,115 @@
+import json
+
+from search import name_index
+
+ROWS = {
+    "people": {"url": "u", "height": 1, "mass": 1, "hair_color": "x", "skin_color": "x", "eyes_color": "x",
+               "birth_year": 1, "gender": "x"},
+    "planets": {"url": "u", "diameter": 1, "rotation_period": 1, "orbital_period": 1, "gravity": 1, "population": 1,
+                "climate": "arid"},
+}
+
+
+def import_rows(client, auth, kind, *names):
+    body = json.dumps([dict(ROWS[kind], name=name) for name in names])
+    response = client.post("/import/%s" % kind, data=body, content_type="application/json", headers=auth)
+    assert response.get_json()["inserted"] == len(names)
+
+
+def search(client, q, **args):
+    response = client.get("/search", query_string=dict(args, q=q))
+    assert response.status_code == 200
+    return [(item["kind"], item["name"], item["match"]) for item in response.get_json()["results"]]
+
+
+def test_ranking_exact_prefix_word_substring_fuzzy(client, auth):
+    import_rows(client, auth, "people", "Luke Skywalker", "Anakin Skywalker", "Luke", "Leia Organa")
+    import_rows(client, auth, "planets", "Skywalker Ranch")
+
+    assert search(client, "luke") == [
+        ("people", "Luke", "exact"),
+        ("people", "Luke Skywalker", "prefix"),
+    ]
+    #Prefijo del nombre antes que prefijo de otra palabra; dentro de cada grupo, el nombre más corto.
+    assert search(client, "sky") == [
+        ("planets", "Skywalker Ranch", "prefix"),
+        ("people", "Luke Skywalker", "word"),
+        ("people", "Anakin Skywalker", "word"),
+    ]
+    assert search(client, "walk") == [
+        ("people", "Luke Skywalker", "substring"),
+        ("planets", "Skywalker Ranch", "substring"),
+        ("people", "Anakin Skywalker", "substring"),
+    ]
+    assert search(client, "organs")[0] == ("people", "Leia Organa", "fuzzy")
+    assert search(client, "sky", kind="people", limit=1) == [("people", "Luke Skywalker", "word")]
+
+
+def test_search_requires_text_and_known_kinds(client):
+    assert client.get("/search?q=%20").status_code == 400
+    assert client.get("/search?q=luke&kind=droids").status_code == 400
+
+
+def test_local_writes_mark_the_index_stale(client, auth):
+    assert search(client, "tatooine") == []
+
+    import_rows(client, auth, "planets", "Tatooine")
+    assert search(client, "tatooine") == [("planets", "Tatooine", "exact")]
+
+    body = dict(ROWS["planets"], uid=1, name="Hoth")
+    assert client.put("/update/planet", json=body, headers=auth).status_code == 201
+    assert search(client, "tatooine") == []
+    assert search(client, "hoth") == [("planets", "Hoth", "exact")]
+
+
+def test_index_syncs_writes_from_other_workers(app, client, auth, monkeypatch):
+    from models import db, Planets
+    from versions import bump_version
+
+    import_rows(client, auth, "planets", "Tatooine")
+    assert search(client, "tatooine") == [("planets", "Tatooine", "exact")]
+
+    #Como si la escritura la hubiera hecho otro worker: el commit no marca este índice como vencido.
+    monkeypatch.setattr(name_index, "mark_stale", lambda: None)
+    with app.app_context():
+        db.session.get(Planets, 1).name = "Dagobah"
+        bump_version("planets", 1)
+        db.session.commit()
+
+    #Todavía dentro de SEARCH_SYNC_SECONDS: el índice no volvió a consultar.
+    name_index._synced_at = float("inf")
+    assert search(client, "tatooine") == [("planets", "Tatooine", "exact")]
+
+    name_index._synced_at = 0.0
+    assert search(client, "tatooine") == []
+    assert search(client, "dagobah") == [("planets", "Dagobah", "exact")]
+
+
+def test_deleted_rows_leave_the_index(app, client, auth):
+    import_rows(client, auth, "planets", "Tatooine", "Alderaan")
+    assert search(client, "tatooine") == [("planets", "Tatooine", "exact")]
+
+    assert client.delete("/delete/planet", json={"uid": 1}, headers=auth).status_code == 200
+    assert search(client, "tatooine") == []
+    assert search(client, "too") == []  # tampoco por trigramas
+    assert ("planets", 1) not in name_index._names
+    assert not any(("planets", 1) in entries for entries in name_index._trigram_postings.values())
+    assert [uid for _, kind, uid in name_index._full if kind == "planets"] == [2]
+
+
+def test_rows_deleted_by_other_workers_leave_the_index(app, client, auth, monkeypatch):
+    from models import db, Planets
+    from versions import bump_version
+
+    import_rows(client, auth, "planets", "Tatooine", "Alderaan")
+    assert search(client, "tatooine") == [("planets", "Tatooine", "exact")]
+
+    monkeypatch.setattr(name_index, "mark_stale", lambda: None)
+    with app.app_context():
+        db.session.delete(db.session.get(Planets, 1))
+        bump_version("planets", 1)
+        db.session.commit()
+
+    name_index._synced_at = 0.0
+    assert search(client, "tatooine") == []
+    assert search(client, "alderaan") == [("planets", "Alderaan", "exact")]